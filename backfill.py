@@ -0,0 +1,235 @@
+# backfill.py — fetch older 1m history into the candle store (concurrent, rate-limited, resumable)
+#
+#   python backfill.py LTC --start 2025-01-01 [--end 2025-03-01] [--workers 4]
+#   python backfill.py LTC --days 30
+#   python backfill.py LTC --verify [--start ...]          continuity report only
+#   python backfill.py LTC --days 30 --window-bars 1000 --weight-per-min 6000   smaller windows / own rate limit
+#
+# The range is split into API-sized windows (BACKFILL_WINDOW_BARS) that are fetched concurrently
+# through transport.py with BACKFILL_WEIGHT_SHARE of the rate limit. Windows are appended in order
+# to a staging store next to the real one (saves/logs/ltc_1m.bin.backfill), with a checkpoint after
+# each: an interrupted run resumes at the first window that wasn't written. At the end staging and
+# the existing file are merged (bars the bot collected itself win on overlap), the other
+# timeframes are rebuilt from 1m, and the result is checked for gaps.
+# Hyperliquid only serves the most recent 5000 candles per interval; older windows come back
+# empty and are reported as a gap.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from config import (BASE_URL, API_WEIGHT_PER_MIN, API_WEIGHT_BURST, BACKFILL_WINDOW_BARS, BACKFILL_WORKERS,
+                    BACKFILL_WEIGHT_SHARE)
+from candle_buffer import INTERVAL_MS
+from candle_store import CandleStore
+from candles import Candles
+from persist import atomic_write_json, load_json
+import data_collector
+
+STEP = INTERVAL_MS["1m"]
+
+def windows(start_ms, end_ms, bars=BACKFILL_WINDOW_BARS, step=STEP):
+    """[(start, end)) slices of at most `bars` bars covering start..end"""
+    span = bars * step
+    return [(t, min(t + span, end_ms)) for t in range(start_ms, end_ms, span)]
+
+def api_fetcher(base_url=BASE_URL, transport=None):
+    """fetch(symbol, start_ms, end_ms) → Candles, one candleSnapshot per call"""
+    from hyperliquid.api import API
+    from transport import Transport, attach
+    transport = transport or Transport(weight_per_min=API_WEIGHT_PER_MIN * BACKFILL_WEIGHT_SHARE,
+                                       burst=API_WEIGHT_BURST * BACKFILL_WEIGHT_SHARE)
+    api = attach(API(base_url), transport)
+
+    def fetch(symbol, start_ms, end_ms):
+        req = {"coin": symbol, "interval": "1m", "startTime": start_ms, "endTime": end_ms - 1}
+        return Candles.from_raw(api.post("/info", {"type": "candleSnapshot", "req": req}))
+    return fetch
+
+
+class Backfill:
+    def __init__(self, symbol, start_ms, end_ms, workers=BACKFILL_WORKERS, fetch=None, window_bars=BACKFILL_WINDOW_BARS):
+        self.symbol = symbol
+        self.start_ms = start_ms - start_ms % STEP
+        self.end_ms = end_ms - end_ms % STEP                # closed bars only
+        self.workers = workers
+        self.fetch = fetch or api_fetcher()
+        self.windows = windows(self.start_ms, self.end_ms, window_bars)
+        self.path = os.path.join(data_collector.LOGS_DIR, data_collector.candle_file(symbol, "1m"))
+        self.staging_path = self.path + ".backfill"
+        self.checkpoint_path = self.path + ".backfill.json"
+
+    # === CHECKPOINT ===
+    def checkpoint(self, fresh=False):
+        cp, _ = load_json(self.checkpoint_path)
+        key = {"symbol": self.symbol, "start": self.start_ms, "end": self.end_ms, "windows": len(self.windows)}
+        if cp is None or fresh:
+            if os.path.exists(self.staging_path):
+                os.remove(self.staging_path)
+            return dict(key, done=0, bars=0, empty=[])
+        if {k: cp.get(k) for k in key} != key:
+            raise SystemExit(f"another backfill is in progress ({_day(cp['start'])} → {_day(cp['end'])}, "
+                             f"{cp['done']}/{cp['windows']} windows) — rerun that range or pass --fresh")
+        return cp
+
+    # === FETCH ===
+    def run(self, fresh=False, progress=print):
+        """Fetch every window not written yet; returns the checkpoint. An ApiError stops the run
+        (everything before the failed window is kept)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        cp = self.checkpoint(fresh)
+        staging = CandleStore(self.staging_path)
+        todo = iter(range(cp["done"], len(self.windows)))
+        pending = {}
+        t0 = time.perf_counter()
+
+        def submit():
+            i = next(todo, None)
+            if i is not None:
+                pending[i] = pool.submit(self.fetch, self.symbol, *self.windows[i])
+
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="backfill")
+        try:
+            for _ in range(2 * self.workers):          # bounded read-ahead: at most this many windows in memory
+                submit()
+            while cp["done"] in pending:
+                i = cp["done"]
+                bars = pending.pop(i).result()
+                written = staging.upsert(bars.records())   # in order: appends only
+                if not len(bars):
+                    cp["empty"].append(i)
+                cp["done"], cp["bars"] = i + 1, cp["bars"] + written
+                atomic_write_json(self.checkpoint_path, cp)
+                submit()
+                if progress:
+                    rate = cp["bars"] / max(time.perf_counter() - t0, 1e-9)
+                    progress(f"  {self.symbol} window {i + 1}/{len(self.windows)} ({_day(self.windows[i][0])}) "
+                             f"+{written} bars │ {cp['bars']} total │ {rate:,.0f} bars/s")
+        finally:
+            for f in pending.values():
+                f.cancel()
+            pool.shutdown(wait=True)
+        return cp
+
+    # === MERGE INTO THE REAL STORE ===
+    def splice(self):
+        """Merge staging into the symbol's 1m file (existing bars win), rebuild the other timeframes"""
+        staged = CandleStore(self.staging_path).read()
+        live = CandleStore(self.path).read()
+        merged = np.concatenate([live, staged])
+        _, first = np.unique(merged['t'], return_index=True)       # sorted by t; live copy kept on overlap
+        merged = merged[first]
+        _replace(self.path, merged)
+        for tf in data_collector.ALL_TIMEFRAMES[1:]:
+            path = os.path.join(data_collector.LOGS_DIR, data_collector.candle_file(self.symbol, tf))
+            _replace(path, data_collector.aggregate_bars(merged, INTERVAL_MS[tf]))
+        for path in (self.staging_path, self.checkpoint_path, self.checkpoint_path + ".bak"):
+            if os.path.exists(path):
+                os.remove(path)
+        return len(merged) - len(live)
+
+def _replace(path, rec):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(rec.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)          # a running bot's CandleStore notices the new size and reloads
+
+
+# === CONTINUITY ===
+def verify(store, start_ms=None, end_ms=None, step=STEP):
+    """Gaps / ordering / alignment / OHLC sanity of the stored bars in [start, end)"""
+    rec = store.read(start_ms, None if end_ms is None else end_ms - 1)
+    t = rec['t']
+    d = np.diff(t)
+    gap_at = np.flatnonzero(d > step)
+    gaps = [(int(t[i]) + step, int(t[i + 1]), int(d[i] // step) - 1) for i in gap_at]
+    if len(t) and start_ms is not None and t[0] > start_ms:
+        gaps.insert(0, (start_ms, int(t[0]), int((t[0] - start_ms) // step)))
+    if len(t) and end_ms is not None and t[-1] + step < end_ms:
+        gaps.append((int(t[-1]) + step, end_ms, int((end_ms - t[-1]) // step) - 1))
+    body_hi = np.maximum(rec['open'], rec['close'])
+    body_lo = np.minimum(rec['open'], rec['close'])
+    return {
+        "bars": len(t),
+        "first": int(t[0]) if len(t) else None,
+        "last": int(t[-1]) if len(t) else None,
+        "gaps": gaps,
+        "missing": sum(g[2] for g in gaps),
+        "unordered": int(np.count_nonzero(d <= 0)),
+        "misaligned": int(np.count_nonzero(t % step)),
+        "bad_ohlc": int(np.count_nonzero((rec['high'] < body_hi) | (rec['low'] > body_lo))),
+    }
+
+def report_ok(r):
+    return not (r["gaps"] or r["unordered"] or r["misaligned"] or r["bad_ohlc"])
+
+def print_report(r, limit=10):
+    if not r["bars"]:
+        print("no bars stored")
+        return
+    print(f"{r['bars']} bars {_day(r['first'], True)} → {_day(r['last'], True)} │ {len(r['gaps'])} gaps "
+          f"({r['missing']} bars missing) │ {r['unordered']} out of order │ {r['misaligned']} misaligned │ "
+          f"{r['bad_ohlc']} bad OHLC")
+    for start, end, n in r["gaps"][:limit]:
+        print(f"  gap {_day(start, True)} → {_day(end, True)} ({n} bars)")
+    if len(r["gaps"]) > limit:
+        print(f"  … {len(r['gaps']) - limit} more")
+
+def _day(ms, minutes=False):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M" if minutes else "%Y-%m-%d")
+
+def _parse_day(s):
+    return int(datetime.fromisoformat(s).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill 1m candle history into saves/logs/")
+    parser.add_argument("symbol")
+    parser.add_argument("--start", help="YYYY-MM-DD[THH:MM] (UTC)")
+    parser.add_argument("--end", help="YYYY-MM-DD[THH:MM] (UTC), default now")
+    parser.add_argument("--days", type=float, help="instead of --start: this many days back from --end")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--fresh", action="store_true", help="discard an unfinished backfill and start over")
+    parser.add_argument("--verify", action="store_true", help="only report the continuity of what's stored")
+    parser.add_argument("--window-bars", type=int, default=BACKFILL_WINDOW_BARS, help="bars per request")
+    parser.add_argument("--weight-per-min", type=float,
+                        help="request weight / minute for this run (default BACKFILL_WEIGHT_SHARE of API_WEIGHT_PER_MIN)")
+    parser.add_argument("--burst", type=float, help="with --weight-per-min: weight that may go out at once")
+    args = parser.parse_args()
+
+    end = _parse_day(args.end) if args.end else int(time.time() * 1000)
+    start = _parse_day(args.start) if args.start else end - int(args.days * 86_400_000) if args.days else None
+    symbol = args.symbol.upper()
+    if args.verify:
+        path = os.path.join(data_collector.LOGS_DIR, data_collector.candle_file(symbol, "1m"))
+        report = verify(CandleStore(path), start, end if args.end else None)
+        print_report(report)
+        sys.exit(0 if report_ok(report) else 1)
+    if start is None:
+        parser.error("--start or --days is required")
+
+    fetch = None
+    if args.weight_per_min:
+        from transport import Transport
+        fetch = api_fetcher(transport=Transport(weight_per_min=args.weight_per_min,
+                                                burst=args.burst or args.weight_per_min / 60))
+    job = Backfill(symbol, start, end, workers=args.workers, fetch=fetch, window_bars=args.window_bars)
+    print(f"Backfill {symbol} 1m {_day(job.start_ms, True)} → {_day(job.end_ms, True)}: {len(job.windows)} windows, "
+          f"{args.workers} workers")
+    from transport import ApiError
+    try:
+        cp = job.run(fresh=args.fresh)
+    except (ApiError, KeyboardInterrupt) as e:
+        print(f"Stopped ({type(e).__name__}: {e}) — run the same command again to resume")
+        sys.exit(2)
+    if cp["empty"]:
+        print(f"{len(cp['empty'])} windows came back empty (older than the API serves, or before the listing)")
+    added = job.splice()
+    print(f"Merged into {job.path}: +{added} bars; rebuilt {', '.join(data_collector.ALL_TIMEFRAMES[1:]) or 'no other timeframes'}")
+    report = verify(CandleStore(job.path), job.start_ms, job.end_ms)
+    print_report(report)
+    sys.exit(0 if report_ok(report) else 1)
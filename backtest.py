@@ -0,0 +1,266 @@
+# backtest.py — vectorized backtest of the detect_cross strategy over stored candles
+#
+#   python backtest.py                         # saves/logs/<symbol>_1m.bin, config.py parameters
+#   python backtest.py --csv saves/logs/ltc_1m.csv --start 2025-01-01
+#   python backtest.py --parity 20000          # replay the last 20k bars through detect_cross and compare
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from config import (SYMBOL, MA_SHORT, MA_LONG, TREND_LOOKBACK, RSI_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD,
+                    ALLOW_SHORTS, FEE_BUFFER_PCT, TRADE_USDT, TRAILING_STOP_ENABLED, TRAILING_STOP_PCT,
+                    PROFIT_RATCHET_ENABLED, MIN_PROFIT_TO_ACTIVATE, PROFIT_PROTECTION_RATIO,
+                    TRAILING_PNL_ENABLED, TRAILING_PNL_PCT)
+from candle_store import CandleStore, records_to_df
+
+BACKTEST_DIR = "saves/backtests"
+BUY, SHORT = 1, -1
+
+# ====================== INDICATORS (whole history at once) ======================
+def sma(close, window):
+    """Same values as Series.rolling(window).mean(); NaN until the window is full"""
+    out = np.full(len(close), np.nan)
+    if len(close) >= window:
+        c = np.cumsum(np.r_[0.0, close])
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+def rsi(close, period):
+    """Same definition as indicators.rsi (simple rolling means of gains/losses)"""
+    delta = np.r_[0.0, np.diff(close)]
+    gain_sum = sma(np.where(delta > 0, delta, 0.0), period)
+    loss_sum = sma(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain_sum / loss_sum))
+
+def uptrend(sma_long, lookback):
+    up = np.zeros(len(sma_long), dtype=bool)
+    up[lookback:] = sma_long[lookback:] > sma_long[:-lookback]
+    return up
+
+def compute_signals(sma_short, sma_long, rsi_arr, trend_lookback=TREND_LOOKBACK, rsi_overbought=RSI_OVERBOUGHT,
+                    rsi_oversold=RSI_OVERSOLD, allow_shorts=ALLOW_SHORTS):
+    """+1 buy / -1 short / 0 per bar — the detect_cross rules evaluated on every bar at once"""
+    prev_s = np.r_[np.nan, sma_short[:-1]]
+    prev_l = np.r_[np.nan, sma_long[:-1]]
+    golden = (sma_short > sma_long) & (prev_s <= prev_l)
+    death = (sma_short < sma_long) & (prev_s >= prev_l)
+    up = uptrend(sma_long, trend_lookback)
+
+    sig = np.zeros(len(sma_short), dtype=np.int8)
+    sig[golden & up & (rsi_arr < rsi_overbought)] = BUY
+    if allow_shorts:
+        sig[death & ~up & (rsi_arr > rsi_oversold)] = SHORT
+    return sig
+
+def strategy_signals(close, ma_short=MA_SHORT, ma_long=MA_LONG, rsi_period=RSI_PERIOD, **kwargs):
+    return compute_signals(sma(close, ma_short), sma(close, ma_long), rsi(close, rsi_period), **kwargs)
+
+
+# ====================== EXECUTION ======================
+def stop_exit(close, entry, end, side, qty, leverage=1.0,
+              trailing_stop_enabled=TRAILING_STOP_ENABLED, trailing_stop_pct=TRAILING_STOP_PCT,
+              profit_ratchet_enabled=PROFIT_RATCHET_ENABLED, min_profit_to_activate=MIN_PROFIT_TO_ACTIVATE,
+              profit_protection_ratio=PROFIT_PROTECTION_RATIO,
+              trailing_pnl_enabled=TRAILING_PNL_ENABLED, trailing_pnl_pct=TRAILING_PNL_PCT):
+    """First bar in (entry, end] where a risk.py stop fires on the close → (bar, rule), else None.
+    Same rules, order and peaks as PositionRisk: best price starts at the entry price, best
+    PnL $ / % at 0 (risk.opened), and each bar's close updates the peaks before the checks."""
+    if end <= entry:
+        return None
+    entry_px = close[entry]
+    path = close[entry + 1:end + 1]
+    move = (path - entry_px) * side
+    fired = {}
+    if trailing_stop_enabled:
+        if side == BUY:
+            peak = np.maximum.accumulate(np.r_[entry_px, path])[1:]
+            fired["trailing_stop"] = path <= peak * (1 - trailing_stop_pct / 100)
+        else:
+            peak = np.minimum.accumulate(np.r_[entry_px, path])[1:]
+            fired["trailing_stop"] = path >= peak * (1 + trailing_stop_pct / 100)
+    if profit_ratchet_enabled:
+        usd = move * qty
+        peak = np.maximum.accumulate(np.r_[0.0, usd])[1:]
+        fired["profit_ratchet"] = (peak >= min_profit_to_activate) & (usd < peak * profit_protection_ratio)
+    if trailing_pnl_enabled:
+        pct = move / entry_px * leverage * 100
+        peak = np.maximum.accumulate(np.r_[0.0, pct])[1:]
+        fired["trailing_pnl"] = pct <= peak + trailing_pnl_pct
+    best = None
+    for rule, hits in fired.items():                # dict order = risk.py's rule priority on a tie
+        hit = np.flatnonzero(hits)
+        if len(hit) and (best is None or hit[0] < best[0]):
+            best = (int(hit[0]), rule)
+    return None if best is None else (entry + 1 + best[0], best[1])
+
+def simulate(close, sig, trade_usdt=TRADE_USDT, fee_pct=FEE_BUFFER_PCT, leverage=1.0, **stops):
+    """Walk signals the way run_bot() does: the risk.py stops (stop_exit, on bar closes — live
+    also checks every mid in between), then close on the opposite signal, then open on a signal
+    while flat. Only the bars between signals of an open trade are touched (vectorized), so
+    cost scales with trades, not bars. `stops` = stop_exit's rule toggles / thresholds.
+
+    Returns a dict of per-trade arrays (bar indices, side, prices, qty, pnl, reason).
+    """
+    sig_idx = np.flatnonzero(sig)
+    entries, exits, sides, reasons = [], [], [], []
+    k = 0
+    n = len(close)
+    while k < len(sig_idx):
+        entry = sig_idx[k]
+        side = int(sig[entry])
+        # next opposite signal after entry
+        later = sig_idx[k + 1:]
+        opp = later[sig[later] == -side]
+        exit_i = int(opp[0]) if len(opp) else n - 1
+        reason = "signal" if len(opp) else "end"
+
+        stop = stop_exit(close, entry, exit_i, side, trade_usdt / close[entry], leverage, **stops)
+        if stop is not None:
+            exit_i, reason = stop
+
+        entries.append(entry)
+        exits.append(exit_i)
+        sides.append(side)
+        reasons.append(reason)
+
+        if reason == "end":
+            break
+        # A signal on the exit bar re-opens right away (close-then-open in the same tick)
+        k = int(np.searchsorted(sig_idx, exit_i, side='left'))
+
+    entries = np.asarray(entries, dtype=np.int64)
+    exits = np.asarray(exits, dtype=np.int64)
+    sides = np.asarray(sides, dtype=np.int8)
+    entry_px = close[entries]
+    exit_px = close[exits]
+    qty = trade_usdt / entry_px if len(entries) else np.empty(0)
+    fees = (entry_px + exit_px) * qty * fee_pct
+    pnl = (exit_px - entry_px) * qty * sides - fees
+    return {
+        "entry": entries, "exit": exits, "side": sides, "entry_px": entry_px, "exit_px": exit_px,
+        "qty": qty, "fees": fees, "pnl": pnl, "reason": np.asarray(reasons),
+    }
+
+def equity_curve(close, trades, start_equity=0.0):
+    """Realised + mark-to-market PnL per bar"""
+    eq = np.zeros(len(close))
+    realised = np.zeros(len(close))
+    for e, x, side, px, q, pnl in zip(trades["entry"], trades["exit"], trades["side"],
+                                      trades["entry_px"], trades["qty"], trades["pnl"]):
+        eq[e:x] += (close[e:x] - px) * q * side
+        realised[x] += pnl
+    return start_equity + np.cumsum(realised) + eq
+
+def summarize(trades, equity):
+    pnl = trades["pnl"]
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl <= 0]
+    drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity if len(equity) else np.zeros(1)
+    return {
+        "trades": int(len(pnl)),
+        "total_pnl": float(pnl.sum()),
+        "win_rate": float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+        "avg_pnl": float(pnl.mean()) if len(pnl) else 0.0,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float("inf") if len(wins) else 0.0,
+        "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+        "fees": float(trades["fees"].sum()),
+    }
+
+def run_backtest(df: pd.DataFrame, **params):
+    """Full backtest on an OHLCV frame → (trades DataFrame, equity Series, stats dict)"""
+    sim_keys = ("trade_usdt", "fee_pct", "leverage", "trailing_stop_enabled", "trailing_stop_pct",
+                "profit_ratchet_enabled", "min_profit_to_activate", "profit_protection_ratio",
+                "trailing_pnl_enabled", "trailing_pnl_pct")
+    sim_params = {k: params.pop(k) for k in sim_keys if k in params}
+    close = df['close'].to_numpy(dtype=np.float64)
+    ts = df['timestamp'].reset_index(drop=True)
+
+    sig = strategy_signals(close, **params)
+    trades = simulate(close, sig, **sim_params)
+    equity = equity_curve(close, trades)
+
+    trades_df = pd.DataFrame({
+        "entry_time": ts.iloc[trades["entry"]].values,
+        "exit_time": ts.iloc[trades["exit"]].values,
+        "side": np.where(trades["side"] == BUY, "long", "short"),
+        "entry_px": trades["entry_px"], "exit_px": trades["exit_px"],
+        "qty": trades["qty"], "fees": trades["fees"], "pnl": trades["pnl"], "reason": trades["reason"],
+    })
+    return trades_df, pd.Series(equity, index=ts, name="equity"), summarize(trades, equity)
+
+
+# ====================== PARITY ======================
+def replay_signals(df: pd.DataFrame):
+    """Bar-by-bar replay through the live detect_cross (streaming engine, same rules)"""
+    import indicators
+    from state import SymbolState
+    engine = indicators.StreamingIndicators()
+    scratch = SymbolState(SYMBOL)                  # in-memory only, never touches saves/
+    log_print = indicators.log_print
+    indicators.log_print = lambda *a, **k: None
+    sig = np.zeros(len(df), dtype=np.int8)
+    try:
+        for i in range(1, len(df)):
+            s, _, _ = indicators.detect_cross(df.iloc[i - 1:i + 1], scratch, engine)
+            sig[i] = BUY if s == "buy" else SHORT if s == "short" else 0
+    finally:
+        indicators.log_print = log_print
+    return sig
+
+def check_parity(df: pd.DataFrame):
+    close = df['close'].to_numpy(dtype=np.float64)
+    want = replay_signals(df)
+    got = strategy_signals(close)
+    # The replay engine can't see bar 0 as a closed bar; skip it
+    mismatch = np.flatnonzero(want[1:] != got[1:]) + 1
+    return len(mismatch) == 0, mismatch, int(np.count_nonzero(want))
+
+
+# ====================== CLI ======================
+def load_candles(path=None, csv=None, start=None, end=None):
+    if csv:
+        df = pd.read_csv(csv, parse_dates=['timestamp'])
+        if start:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+    path = path or os.path.join("saves/logs", f"{SYMBOL.lower()}_1m.bin")
+    to_ms = lambda s: int(pd.Timestamp(s).value // 1_000_000) if s else None
+    return records_to_df(CandleStore(path).read(to_ms(start), to_ms(end)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the SMA cross strategy on stored candles")
+    parser.add_argument("--file", help="binary candle store (default saves/logs/<symbol>_1m.bin)")
+    parser.add_argument("--csv", help="read a CSV export instead")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--leverage", type=float, default=1.0)
+    parser.add_argument("--parity", type=int, metavar="BARS", help="also replay the last BARS bars through detect_cross")
+    args = parser.parse_args()
+
+    df = load_candles(args.file, args.csv, args.start, args.end)
+    if len(df) < MA_LONG + TREND_LOOKBACK:
+        print(f"Not enough candles ({len(df)})")
+        raise SystemExit(1)
+
+    t0 = time.perf_counter()
+    trades_df, equity, stats = run_backtest(df, leverage=args.leverage)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{len(df)} bars {df['timestamp'].iloc[0]} → {df['timestamp'].iloc[-1]} in {elapsed * 1000:.1f} ms")
+    for k, v in stats.items():
+        print(f"  {k:14s} {v:.4f}" if isinstance(v, float) else f"  {k:14s} {v}")
+
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    trades_df.to_csv(os.path.join(BACKTEST_DIR, "trades.csv"), index=False)
+    equity.to_csv(os.path.join(BACKTEST_DIR, "equity.csv"))
+    print(f"Saved trades and equity curve to {BACKTEST_DIR}/")
+
+    if args.parity:
+        ok, mismatch, n = check_parity(df.tail(args.parity).reset_index(drop=True))
+        print(f"Parity vs detect_cross: {'OK' if ok else 'MISMATCH at ' + str(mismatch[:10])} ({n} signals)")
+        if not ok:
+            raise SystemExit(1)
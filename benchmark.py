@@ -0,0 +1,2224 @@
+# benchmark.py — offline equivalence checks and microbenchmarks (no network, no keys)
+#
+#   python benchmark.py indicators
+#   python benchmark.py candles
+#   python benchmark.py symbols
+#   python benchmark.py logging
+#   python benchmark.py dashboard
+#   python benchmark.py journal
+#   python benchmark.py persistence
+#   python benchmark.py metrics
+#   python benchmark.py replay
+#   python benchmark.py paper
+#   python benchmark.py startup
+#   python benchmark.py transport
+#   python benchmark.py backfill
+#   python benchmark.py stream
+#   python benchmark.py parity
+#   python benchmark.py risk
+#   python benchmark.py tick [--save-baseline]     (fixtures: python benchmark.py fixtures [--live])
+import argparse
+import contextlib
+import json
+import math
+import os
+import time
+import numpy as np
+import pandas as pd
+
+def synthetic_candles(n, start="2025-01-01", seed=7):
+    """Random-walk 1m candles with the same columns fetch_ohlcv returns"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.15, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.05, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=n, freq='1min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 50, n),
+    })
+
+def _timeit(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+# ====================== INDICATORS ======================
+def check_indicator_equivalence(n=3000, window=1440, tol=1e-9):
+    """Stream bars (with several live-bar revisions each) and compare against the pandas path on every tick"""
+    from indicators import StreamingIndicators, pandas_values
+
+    df = synthetic_candles(n)
+    rng = np.random.default_rng(1)
+    engine = StreamingIndicators()
+    checked = 0
+    for i in range(window, n):
+        view = df.iloc[i - window:i + 1].copy()
+        for _ in range(2):     # forming bar ticks around before it closes
+            view.iloc[-1, view.columns.get_loc('close')] += rng.normal(0, 0.05)
+            engine.sync(view)
+            want, got = pandas_values(view), engine.values()
+            for key, w in want.items():
+                g = got[key]
+                if isinstance(w, (bool, np.bool_)):
+                    assert bool(w) == bool(g), f"bar {i} {key}: {g} != {w}"
+                elif not (math.isnan(w) and math.isnan(g)):
+                    assert abs(w - g) <= tol * max(1.0, abs(w)), f"bar {i} {key}: {g} != {w}"
+            checked += 1
+        df.iloc[i, df.columns.get_loc('close')] = view['close'].iloc[-1]
+    print(f"indicator equivalence: OK ({checked} ticks compared)")
+
+def bench_indicators(window=1440, repeat=2000):
+    from indicators import StreamingIndicators, pandas_values
+
+    df = synthetic_candles(window + repeat + 1)
+    view = df.iloc[:window]
+    pandas_us = _timeit(lambda: pandas_values(view), 200) * 1e6
+
+    engine = StreamingIndicators()
+    engine.sync(view)
+    closes = df['close'].values
+    ts = df['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+    t0 = time.perf_counter()
+    for i in range(window, window + repeat):
+        engine.update(int(ts[i]), float(closes[i]))
+        engine.values()
+    stream_us = (time.perf_counter() - t0) / repeat * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        engine.update(int(ts[window + repeat - 1]), float(closes[-1]))
+        engine.values()
+    live_us = (time.perf_counter() - t0) / repeat * 1e6
+
+    print(f"pandas full recompute ({window} bars): {pandas_us:8.1f} µs/tick")
+    print(f"streaming, bar close:                {stream_us:8.2f} µs/update")
+    print(f"streaming, live bar change:          {live_us:8.2f} µs/update")
+
+
+# ====================== CANDLE ARRAYS ======================
+def _raw_rows(df):
+    ts = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+    return [{'t': int(t), 'o': f"{o:.4f}", 'h': f"{h:.4f}", 'l': f"{l:.4f}", 'c': f"{c:.4f}", 'v': f"{v:.2f}"}
+            for t, o, h, l, c, v in zip(ts, df['open'], df['high'], df['low'], df['close'], df['volume'])]
+
+def _legacy_to_df(raw):
+    """The DataFrame path the bot used before candles.py (reference for the checks below)"""
+    df = pd.DataFrame(raw).rename(columns={'t': 'timestamp', 'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'})
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+
+def _legacy_merge(df, new, max_bars):
+    kept = df[df['timestamp'] < new['timestamp'].iloc[0]]
+    return pd.concat([kept, new], ignore_index=True).tail(max_bars).reset_index(drop=True)
+
+def check_candles(rounds=3000, capacity=200, seed=5):
+    """CandleArray.merge against the old pandas merge: random overlapping / gapped / oversized updates.
+    Views handed out earlier keep their bars (only ones revised by a later merge change),
+    also across the arrays being reallocated."""
+    from candles import Candles, CandleArray
+
+    rng = np.random.default_rng(seed)
+    rows = _raw_rows(synthetic_candles(rounds * 3 + capacity * 3, seed=seed))
+    arr, df = CandleArray(capacity), _legacy_to_df(rows[:10])
+    arr.replace(Candles.from_raw(rows[:10]))
+    pos, held = 10, []
+    for r in range(rounds):
+        start = max(0, pos - int(rng.integers(0, 3)))          # revise the forming bar (or two)
+        n = int(rng.choice([1, 2, 3, 5, capacity + 7], p=[0.4, 0.3, 0.15, 0.14, 0.01]))
+        batch = [dict(row, c=f"{float(row['c']) + rng.normal():.4f}") for row in rows[start:start + n]]
+        pos = start + n
+        for h in held:
+            h[2] = min(h[2], batch[0]['t'])                     # bars from here on may be revised in place
+        arr.merge(Candles.from_raw(batch))
+        df = _legacy_merge(df, _legacy_to_df(batch), capacity)
+        view = arr.view()
+        want = Candles.from_df(df)
+        assert np.array_equal(view.t, want.t) and np.array_equal(view.ohlcv, want.ohlcv), f"round {r}"
+        if r % 97 == 0:
+            held.append([view, want.ohlcv.copy(), np.iinfo(np.int64).max])
+    for view, then, revised_from in held:
+        final = view.t < revised_from
+        assert np.array_equal(view.ohlcv[:, final], then[:, final]), "a held view changed under its reader"
+
+    # reseeds (replace, and merge with a batch ≥ capacity) must not write into arrays a reader holds
+    reseeds = [lambda bars: arr.replace(bars), lambda bars: arr.merge(bars)]
+    for i, reseed in enumerate(reseeds):
+        view = arr.view()
+        then_t, then_v = view.t.copy(), view.ohlcv.copy()
+        other = _raw_rows(synthetic_candles(capacity + 7, start="2024-01-01", seed=seed + 1 + i))
+        reseed(Candles.from_raw(other))
+        assert np.array_equal(view.t, then_t) and np.array_equal(view.ohlcv, then_v), "reseed rewrote a held view"
+        assert np.array_equal(arr.view().t, Candles.from_raw(other[-capacity:]).t)
+    print(f"candle array: OK ({rounds} merges vs the pandas path, {len(held)} held views intact, "
+          f"{len(reseeds)} reseeds left held views alone)")
+
+def bench_candles(history=1440, ticks=2000):
+    """Per-tick cost of the candle hot path (parse → merge into the buffer → hand to the trader →
+    persist new bars → indicators → last price): old DataFrame path vs Candles views"""
+    import tempfile
+    import tracemalloc
+    from candle_store import CandleStore
+    from candles import Candles, CandleArray
+    from indicators import StreamingIndicators
+
+    rows = _raw_rows(synthetic_candles(history + ticks + 1))
+    updates = [rows[i - 1:i + 1] for i in range(history + 1, history + ticks + 1)]   # closed + forming bar
+
+    def legacy(store, engine):
+        state = {"df": _legacy_to_df(rows[:history + 1])}
+        ts = state["df"]['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+        for t, c in zip(ts, state["df"]['close'].values):
+            engine.update(int(t), float(c))
+
+        def tick(raw):
+            state["df"] = _legacy_merge(state["df"], _legacy_to_df(raw), history + 1)
+            df = state["df"].copy()                                     # CandleBuffer.snapshot()
+            store.upsert_df(df)                                         # collect_all_candles
+            ts = df['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+            closes = df['close'].values                                 # StreamingIndicators.sync
+            for i in range(int(np.searchsorted(ts, engine.live_ts, side='left')), len(ts)):
+                engine.update(int(ts[i]), float(closes[i]))
+            engine.values()
+            return df['close'].iloc[-1], df['timestamp'].iloc[-1]
+        return tick
+
+    def arrays(store, engine):
+        arr = CandleArray(history + 1)
+        arr.replace(Candles.from_raw(rows[:history + 1]))
+        engine.sync(arr.view())
+
+        def tick(raw):
+            arr.merge(Candles.from_raw(raw))
+            bars = arr.view()
+            store.upsert(bars.records(since=store.last_t))
+            engine.sync(bars)
+            engine.values()
+            return float(bars.close[-1]), int(bars.t[-1])
+        return tick
+
+    print(f"{history}-bar buffer, {ticks} ticks (closed + forming bar each)")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make in (("DataFrame", legacy), ("Candles", arrays)):
+            store = CandleStore(os.path.join(tmp, f"{name}.bin"))
+            store.upsert(Candles.from_raw(rows[:history + 1]).records())
+            engine = StreamingIndicators()
+            tick = make(store, engine)
+            half = ticks // 2
+            t0, c0 = time.perf_counter(), time.process_time()
+            for raw in updates[:half]:
+                tick(raw)
+            wall_us = (time.perf_counter() - t0) / half * 1e6
+            cpu_us = (time.process_time() - c0) / half * 1e6
+            tracemalloc.start()
+            peaks = []
+            for raw in updates[half:]:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                tick(raw)
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            tracemalloc.stop()
+            results[name] = (store.read(), engine.values())
+            print(f"  {name:<10} {cpu_us:7.1f} µs CPU/tick ({wall_us:7.1f} wall) │ "
+                  f"peak alloc p50 {np.median(peaks) / 1024:6.1f} KiB/tick, max {max(peaks) / 1024:6.1f} KiB")
+    (rec_a, val_a), (rec_b, val_b) = results["DataFrame"], results["Candles"]
+    assert np.array_equal(rec_a, rec_b), "stored bars differ"
+    assert val_a == val_b or all(math.isclose(val_a[k], val_b[k], rel_tol=1e-12) for k in val_a), (val_a, val_b)
+    print("  same stored bars and indicator values on both paths")
+
+
+# ====================== MULTI-SYMBOL TICK ======================
+class FakeInfo:
+    """candles_snapshot / all_mids / user_state served from memory with a fixed per-request latency"""
+
+    def __init__(self, symbols, bars=1500, latency=0.05):
+        self.latency = latency
+        self.requests = 0
+        self.candles = {}
+        now_ms = int(time.time() * 1000)
+        start = pd.Timestamp(now_ms - now_ms % 60_000 - (bars - 1) * 60_000, unit='ms')
+        for i, sym in enumerate(symbols):
+            df = synthetic_candles(bars, start=start, seed=i)     # last bar = the current minute
+            ts = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+            self.candles[sym] = [
+                {'t': int(t), 'o': str(o), 'h': str(h), 'l': str(l), 'c': str(c), 'v': str(v)}
+                for t, o, h, l, c, v in zip(ts, df['open'], df['high'], df['low'], df['close'], df['volume'])
+            ]
+
+    def candles_snapshot(self, name, interval, startTime, endTime):
+        self.requests += 1
+        time.sleep(self.latency)
+        return [c for c in self.candles[name] if startTime <= c['t'] <= endTime]
+
+    def all_mids(self):
+        self.requests += 1
+        time.sleep(self.latency)
+        return {sym: rows[-1]['c'] for sym, rows in self.candles.items()}
+
+    def user_state(self, address):
+        self.requests += 1
+        time.sleep(self.latency)
+        return {"withdrawable": "100.0", "assetPositions": []}
+
+def bench_symbols(counts=(1, 10, 50), latency=0.05, ticks=5):
+    """Tick = concurrent candle refresh for every symbol + indicators/detect_cross per symbol"""
+    from candle_buffer import CandleBuffer, update_many
+    from indicators import StreamingIndicators, detect_cross
+    from state import SymbolState
+    import indicators
+    indicators.log_print = lambda *a, **k: None
+
+    print(f"fake exchange latency {latency * 1000:.0f} ms/request")
+    for n in counts:
+        symbols = [f"SYM{i}" for i in range(n)]
+        info = FakeInfo(symbols, latency=latency)
+        buffers = {sym: CandleBuffer(info, sym) for sym in symbols}
+        update_many(buffers.values())           # seed
+        states = {sym: SymbolState(sym) for sym in symbols}
+        engines = {sym: StreamingIndicators() for sym in symbols}
+
+        samples = []
+        for _ in range(ticks):
+            t0 = time.perf_counter()
+            frames = update_many(buffers.values())
+            for sym, df in frames.items():
+                detect_cross(df, states[sym], engines[sym])
+            samples.append(time.perf_counter() - t0)
+        best = min(samples) * 1000
+        print(f"  {n:3d} symbols: {best:7.1f} ms/tick  ({best / n:6.2f} ms per symbol)")
+
+
+# ====================== LOGGING ======================
+def bench_logging(calls=20000):
+    """Per-call cost of log_print on the trading thread: old synchronous handlers
+    (logged twice, like before) vs the queued pipeline. Sinks write to a temp dir / devnull."""
+    import logging
+    import queue
+    import tempfile
+    from logging.handlers import RotatingFileHandler, QueueListener
+    import logger as botlog
+
+    fields = dict(event="price", symbol="LTC", price=81.234, rsi=55.1, balance=100.0, position=0.2,
+                  position_open=True, pnl_pct=1.5, pnl_usd=0.3, trend="Uptrend")
+    msg = "LTC Price $81.234 │ RSI 55.1 │ Balance: $100.00 │ Pos: 0.2000 LTC │ PnL: +1.5% │ Uptrend"
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        def sinks(name):
+            fh = RotatingFileHandler(os.path.join(tmp, name), maxBytes=10*1024*1024, backupCount=1)
+            fh.setFormatter(botlog.file_formatter)
+            ch = logging.StreamHandler(devnull)
+            ch.setLevel(logging.INFO)
+            ch.addFilter(botlog.ConfigurableFilter())
+            ch.setFormatter(botlog.console_formatter)
+            jh = RotatingFileHandler(os.path.join(tmp, name + ".jsonl"), maxBytes=10*1024*1024, backupCount=1)
+            jh.setFormatter(botlog.JsonLinesFormatter())
+            return [fh, jh, ch]
+
+        def make_logger(name, handlers):
+            lg = logging.getLogger(f"bench.{name}")
+            lg.propagate = False
+            lg.setLevel(logging.DEBUG)
+            lg.handlers[:] = handlers
+            return lg
+
+        sync = make_logger("sync", sinks("sync.log"))
+        def sync_call():
+            sync.log(logging.INFO, msg, extra={"fields": fields})
+            sync.log(logging.INFO, msg, extra={"fields": fields})
+
+        q = queue.SimpleQueue()
+        queued = make_logger("queued", [botlog._QueueHandler(q)])
+        listener = QueueListener(q, *sinks("queued.log"), respect_handler_level=True)
+        listener.start()
+        def queued_call():
+            queued.log(logging.INFO, msg, extra={"fields": fields})
+
+        sync_us = _timeit(sync_call, calls) * 1e6
+        queued_us = _timeit(queued_call, calls) * 1e6
+        t0 = time.perf_counter()
+        listener.stop()                     # drain what the writer thread hasn't caught up on
+        drain_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"synchronous, logged twice (old): {sync_us:7.2f} µs/call on the trading thread")
+    print(f"queued, background writer:       {queued_us:7.2f} µs/call on the trading thread")
+    print(f"  writer backlog after {calls} calls drained in {drain_ms:.0f} ms")
+
+
+# ====================== DASHBOARD ======================
+def bench_dashboard(viewers=(0, 100, 300), seconds=5.0, tick=0.1, pollers=4):
+    """A fake bot loop publishes a snapshot every `tick` s while N browsers hold /api/stream
+    open and a few pollers hammer /api/snapshot. Reports loop timing next to the load."""
+    import http.client
+    import logging
+    import threading
+    from werkzeug.serving import make_server
+    import state
+    import snapshot
+    from dashboard import app
+    from snapshot import hub
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    state.load_all()                    # symbol states load on first use (main.setup() does this live)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def viewer(stop, received):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("GET", "/api/stream")
+        resp = conn.getresponse()
+        while not stop.is_set():
+            line = resp.fp.readline()
+            if not line:
+                break
+            if line.startswith(b"event: delta"):
+                received.append(1)
+        conn.close()
+
+    def poller(stop, served):
+        while not stop.is_set():
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)   # dev server closes after each response
+            conn.request("GET", "/api/snapshot")
+            conn.getresponse().read()
+            conn.close()
+            served.append(1)
+
+    rng = np.random.default_rng(3)
+    print(f"publish every {tick * 1000:.0f} ms for {seconds:.0f}s, {pollers} /api/snapshot pollers")
+    for n in viewers:
+        stop = threading.Event()
+        received, served = [], []
+        threads = [threading.Thread(target=viewer, args=(stop, received), daemon=True) for _ in range(n)]
+        threads += [threading.Thread(target=poller, args=(stop, served), daemon=True) for _ in range(pollers if n else 0)]
+        for t in threads:
+            t.start()
+            time.sleep(0.002)           # stay under the listen backlog while hundreds connect
+        time.sleep(0.5)
+
+        publish_ms, lag_ms = [], []
+        ticks = int(seconds / tick)
+        start = time.perf_counter()
+        for i in range(ticks):
+            due = start + i * tick
+            while (now := time.perf_counter()) < due:
+                time.sleep(due - now)
+            lag_ms.append((time.perf_counter() - due) * 1000)
+            for sym in state.symbols.values():
+                sym.dashboard_data["price"] = float(100 + rng.normal())
+            t0 = time.perf_counter()
+            hub.publish(snapshot.build())
+            publish_ms.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.5)
+        stop.set()
+
+        pct = lambda xs, q: sorted(xs)[min(len(xs) - 1, int(len(xs) * q))]
+        line = (f"  {n:3d} viewers: publish p50 {pct(publish_ms, 0.5):.2f} / p99 {pct(publish_ms, 0.99):.2f} ms │ "
+                f"loop wake lag p50 {pct(lag_ms, 0.5):.2f} / p99 {pct(lag_ms, 0.99):.2f} ms")
+        if n:
+            line += (f" │ deltas delivered {len(received) / (n * ticks) * 100:.0f}% │ "
+                     f"/api/snapshot {len(served) / seconds:.0f} req/s")
+        print(line)
+    server.shutdown()
+
+
+# ====================== TRADE JOURNAL ======================
+def bench_journal(n=100_000, days=365):
+    """Append cost and query cost with a year of trades on disk"""
+    import tempfile
+    from journal import TradeJournal
+
+    rng = np.random.default_rng(5)
+    start_ms = int(pd.Timestamp("2025-01-01").value // 1_000_000)
+    ts = np.sort(rng.integers(start_ms, start_ms + days * 86_400_000, n))
+    symbols = np.array(["LTC", "BTC", "ETH"])[rng.integers(0, 3, n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = TradeJournal(os.path.join(tmp, "trades.db"))
+        t0 = time.perf_counter()
+        for i in range(n):
+            if i % 2:
+                journal.record("close", 0.2, 100.0, str(symbols[i]), float(rng.normal(0, 0.5)), ts=int(ts[i]))
+            else:
+                journal.record("buy", 0.2, 100.0, str(symbols[i]), ts=int(ts[i]))
+        append_us = (time.perf_counter() - t0) / n * 1e6
+
+        mid = start_ms + days // 2 * 86_400_000
+        day_ms = _timeit(lambda: journal.query("LTC", start=mid, end=mid + 86_400_000), 200) * 1000
+        daily_ms = _timeit(lambda: journal.daily_pnl("LTC"), 20) * 1000
+        stats_ms = _timeit(lambda: journal.stats(start=mid, end=mid + 30 * 86_400_000), 50) * 1000
+        journal.close()
+
+    print(f"{n} trades over {days} days")
+    print(f"append:                       {append_us:7.1f} µs/trade")
+    print(f"one symbol, one day (range):  {day_ms:7.2f} ms")
+    print(f"daily PnL, one symbol, 1y:    {daily_ms:7.2f} ms")
+    print(f"win rate / PnL, 30 days:      {stats_ms:7.2f} ms")
+
+
+# ====================== PERSISTENCE ======================
+_WRITER = """
+import sys, json
+sys.path.insert(0, {root!r})
+from persist import atomic_write_json
+path, mode = sys.argv[1], sys.argv[2]
+doc = {{"position_open": True, "position_side": "long", "last_buy_price": 81.5,
+        "crosses": [{{"type": "golden", "price": 80.0 + i}} for i in range(50)]}}
+i = 0
+while True:
+    i += 1
+    doc["total_profit"] = i
+    if mode == "atomic":
+        atomic_write_json(path, doc)
+    else:                                    # the old in-place rewrite
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=2)
+    print(i, flush=True)                     # i is on disk
+"""
+
+def check_persistence(rounds=40, seed=11):
+    """SIGKILL a writer at random points; the loader must always come back with a
+    complete snapshot at least as new as the last write the writer reported done."""
+    import signal
+    import subprocess
+    import sys
+    import tempfile
+    from persist import load_json
+
+    rng = np.random.default_rng(seed)
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = _WRITER.format(root=root)
+    for mode in ("in-place", "atomic"):
+        lost = stale = 0
+        with tempfile.TemporaryDirectory() as tmp:
+            for r in range(rounds):
+                path = os.path.join(tmp, f"state{r}.json")
+                proc = subprocess.Popen([sys.executable, "-c", code, path, mode], stdout=subprocess.PIPE, text=True)
+                proc.stdout.readline()                           # started writing
+                time.sleep(float(rng.uniform(0.0, 0.05)))
+                proc.send_signal(signal.SIGKILL)
+                done = [int(x) for x in proc.stdout.read().split()]
+                proc.wait()
+                if mode == "atomic":
+                    data, _ = load_json(path)
+                else:
+                    try:
+                        with open(path) as f:
+                            data = json.load(f)
+                    except ValueError:
+                        data = None
+                if data is None or not data.get("position_open"):
+                    lost += 1
+                elif done and data["total_profit"] < done[-1]:
+                    stale += 1
+        verdict = "OK" if mode == "in-place" or lost + stale == 0 else "FAILED"
+        print(f"{mode:>9}: {rounds} kills → {lost} unreadable/reset, {stale} older than last confirmed write  {verdict if mode == 'atomic' else ''}")
+        if mode == "atomic":
+            assert lost + stale == 0, "atomic persistence lost data"
+
+
+# ====================== METRICS ======================
+def bench_metrics(repeat=200_000, budget_us=3.0):
+    """Cost of one sample for each instrument type used on the hot path"""
+    from metrics import Counter, Histogram, Gauge, registry, render
+
+    hist = Histogram("bench_seconds", "bench", ["stage"])
+    counter = Counter("bench_total", "bench", ["endpoint", "error"])
+    gauge = Gauge("bench_gauge", "bench", ["symbol"])
+    try:
+        def timed():
+            with hist.time("fetch"):
+                pass
+        results = {
+            "histogram.observe": _timeit(lambda: hist.observe(0.0123, "fetch"), repeat) * 1e6,
+            "counter.inc": _timeit(lambda: counter.inc("/info:l2Book", "ServerError"), repeat) * 1e6,
+            "gauge.set": _timeit(lambda: gauge.set(12.5, "LTC"), repeat) * 1e6,
+            "with stage(...)": _timeit(timed, repeat) * 1e6,
+            "empty lambda (loop cost)": _timeit(lambda: None, repeat) * 1e6,
+        }
+        scrape_ms = _timeit(render, 200) * 1000
+    finally:
+        for m in (hist, counter, gauge):
+            registry.remove(m)
+
+    for name, us in results.items():
+        print(f"{name:<26} {us:6.2f} µs/sample")
+    print(f"/metrics render             {scrape_ms:6.2f} ms")
+    worst = max(v for k, v in results.items() if not k.startswith("empty"))
+    assert worst < budget_us, f"instrumentation over budget: {worst:.2f} µs > {budget_us} µs"
+    print(f"worst sample {worst:.2f} µs (budget {budget_us} µs): OK")
+
+
+# ====================== FULL TICK (recorded fixtures) ======================
+# The tick runs unchanged against Info/Exchange stand-ins that replay JSON responses
+# from saves/benchmarks/fixtures/ (synthesized, or recorded from the API with --live).
+FIXTURES_DIR = os.path.join("saves", "benchmarks", "fixtures")
+TICK_BASELINE = os.path.join("saves", "benchmarks", "tick_baseline.json")
+STORE_SIZES = {"1d": 1, "30d": 30, "1y": 365}
+
+def _fill(avg_px, sz):
+    return {"status": "ok", "response": {"type": "order", "data": {
+        "statuses": [{"filled": {"totalSz": str(sz), "avgPx": str(avg_px), "oid": 1}}]}}}
+
+def make_fixtures(symbols, out_dir, bars=1700, live=False):
+    """meta / candles_<SYM> / user_state / all_mids / order responses as the API returns them"""
+    os.makedirs(out_dir, exist_ok=True)
+    if live:
+        from hyperliquid.info import Info
+        from hyperliquid.utils import constants
+        info = Info(constants.MAINNET_API_URL, skip_ws=True)
+        now_ms = int(time.time() * 1000)
+        docs = {"meta": info.meta(), "all_mids": info.all_mids()}
+        for sym in symbols:
+            docs[f"candles_{sym}"] = info.candles_snapshot(sym, "1m", now_ms - bars * 60_000, now_ms)
+        wallet = os.getenv("HL_WALLET")
+        docs["user_state"] = info.user_state(wallet) if wallet else None
+    else:
+        start = pd.Timestamp("2025-06-01")
+        docs = {"meta": {"universe": [{"name": s, "szDecimals": 2, "maxLeverage": 10} for s in symbols]}}
+        for i, sym in enumerate(symbols):
+            df = synthetic_candles(bars, start=start, seed=100 + i)
+            ts = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+            docs[f"candles_{sym}"] = [
+                {"t": int(t), "T": int(t) + 59_999, "s": sym, "i": "1m", "o": f"{o:.4f}", "h": f"{h:.4f}",
+                 "l": f"{l:.4f}", "c": f"{c:.4f}", "v": f"{v:.2f}", "n": 42}
+                for t, o, h, l, c, v in zip(ts, df['open'], df['high'], df['low'], df['close'], df['volume'])]
+        docs["all_mids"] = {sym: docs[f"candles_{sym}"][-1]["c"] for sym in symbols}
+        docs["user_state"] = None
+    if docs["user_state"] is None:            # an open long per symbol so the risk stage has work to do
+        docs["user_state"] = {
+            "withdrawable": "100.0",
+            "marginSummary": {"accountValue": "120.0", "accountLeverage": "10"},
+            "assetPositions": [{"type": "oneWay", "position": {
+                "coin": sym, "szi": "0.2", "entryPx": "100.0", "returnOnEquity": "0.012",
+                "unrealizedPnl": "0.05", "leverage": {"type": "cross", "value": 10}}} for sym in symbols],
+        }
+    docs["order_open"] = _fill(100.0, 0.2)
+    docs["order_close"] = _fill(100.0, 0.2)
+    for name, doc in docs.items():
+        with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+            json.dump(doc, f)
+    print(f"{len(docs)} fixtures ({'recorded' if live else 'synthesized'}) → {out_dir}")
+
+def load_fixtures(fixtures_dir):
+    docs = {}
+    for name in os.listdir(fixtures_dir):
+        if name.endswith(".json"):
+            with open(os.path.join(fixtures_dir, name)) as f:
+                docs[name[:-5]] = json.load(f)
+    return docs
+
+
+class FixtureMarket:
+    """Recorded responses + a cursor: the newest bar the 'exchange' has. advance() = one bar closes."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.orders = 0
+        self.rewind(0)
+
+    def rewind(self, bar):
+        self.bar = bar
+
+    def advance(self):
+        self.bar += 1
+
+    def cursor_ms(self, symbol):
+        rows = self.docs[f"candles_{symbol}"]
+        return rows[min(self.bar, len(rows) - 1)]["t"]
+
+    def now_ms(self, symbol):
+        return self.cursor_ms(symbol) + 1_000     # just after the bar opened
+
+    def mid(self, symbol):
+        rows = self.docs[f"candles_{symbol}"]
+        return rows[min(self.bar, len(rows) - 1)]["c"]
+
+
+class FixtureInfo:
+    """hyperliquid.info.Info stand-in (same call signatures the bot uses)"""
+
+    def __init__(self, market):
+        self.market = market
+
+    def post(self, url_path, payload=None):
+        raise NotImplementedError(f"fixture has no response for {url_path} {payload}")
+
+    def meta(self):
+        return self.market.docs["meta"]
+
+    def candles_snapshot(self, name, interval, startTime, endTime):
+        end = min(endTime, self.market.cursor_ms(name))
+        return [c for c in self.market.docs[f"candles_{name}"] if startTime <= c["t"] <= end]
+
+    def all_mids(self):
+        return {sym: self.market.mid(sym) for sym in self.market.docs["all_mids"]}
+
+    def user_state(self, address):
+        return self.market.docs["user_state"]
+
+
+class FixtureExchange:
+    """hyperliquid.exchange.Exchange stand-in: orders fill at the current fixture mid"""
+
+    def __init__(self, market):
+        self.market = market
+        self.info = FixtureInfo(market)
+
+    def post(self, url_path, payload=None):
+        raise NotImplementedError(f"fixture has no response for {url_path} {payload}")
+
+    def _fill(self, name, key, sz=None):
+        self.market.orders += 1
+        doc = json.loads(json.dumps(self.market.docs[key]))
+        filled = doc["response"]["data"]["statuses"][0]["filled"]
+        filled["avgPx"] = self.market.mid(name)
+        if sz is not None:
+            filled["totalSz"] = str(sz)
+        return doc
+
+    def market_open(self, name, is_buy, sz, px=None, slippage=0.05, cloid=None, builder=None):
+        return self._fill(name, "order_open", sz)
+
+    def market_close(self, coin, sz=None, px=None, slippage=0.05, cloid=None, builder=None):
+        return self._fill(coin, "order_close", sz)
+
+
+class StageRecorder:
+    """Drop-in for metrics.stage: per-stage wall time, and peak traced allocation while tracemalloc runs"""
+
+    def __init__(self):
+        self.ms = {}
+        self.kib = {}
+
+    def __call__(self, name):
+        return _RecordedStage(self, name)
+
+class _RecordedStage:
+    def __init__(self, rec, name):
+        self.rec = rec
+        self.name = name
+
+    def __enter__(self):
+        import tracemalloc
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        import tracemalloc
+        ms = (time.perf_counter() - self.t0) * 1000
+        if self.tracing:
+            self.rec.kib.setdefault(self.name, []).append((tracemalloc.get_traced_memory()[1] - self.mem0) / 1024)
+        else:
+            self.rec.ms.setdefault(self.name, []).append(ms)
+        return False
+
+def _prefill_store(data_collector, symbol, end_ms, days):
+    """`days` of 1m bars ending right before the fixture window, plus every resampled timeframe"""
+    from candle_store import df_to_records
+    from candle_buffer import INTERVAL_MS
+
+    n = days * 1440
+    df = synthetic_candles(n, start=pd.Timestamp(end_ms - n * 60_000, unit='ms'), seed=days)
+    rec = df_to_records(df)
+    data_collector.get_store("1m", symbol).upsert(rec)
+    for tf in data_collector.ALL_TIMEFRAMES[1:]:
+        data_collector.get_store(tf, symbol).upsert(data_collector.aggregate_bars(rec, INTERVAL_MS[tf]))
+
+def bench_tick(sizes=("1d", "30d", "1y"), ticks=60, alloc_ticks=30, warmup=5, save_baseline=False, threshold=0.25):
+    """run_bot's bar tick (fetch → collect_all_candles → detect_cross → risk → execution → dashboard → persist)
+    with fixture-backed clients; candle stores pre-filled with 1 day / 30 days / 1 year of history"""
+    import shutil
+    import tempfile
+    import tracemalloc
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    fixtures_dir = os.path.join(root, FIXTURES_DIR)
+    baseline_path = os.path.join(root, TICK_BASELINE)
+    if not os.path.isdir(fixtures_dir):
+        make_fixtures(["LTC"], fixtures_dir)
+    market = FixtureMarket(load_fixtures(fixtures_dir))
+
+    tmp = tempfile.mkdtemp(prefix="tickbench-")
+    cwd = os.getcwd()
+    os.chdir(tmp)                       # saves/ (state, journal, logs) lands in the temp dir
+    try:
+        import exchange
+        import data_collector
+        import state
+        import snapshot
+        import persist
+        import trader as trader_mod
+        from candle_buffer import CandleBuffer
+        from config import SYMBOLS, TIMEFRAME, CANDLE_HISTORY_HOURS
+        from snapshot import hub
+
+        exchange.info.set(FixtureInfo(market))          # clients are lazy → install the fixture-backed ones
+        exchange.exchange.set(FixtureExchange(market))
+        rec = StageRecorder()
+        trader_mod.stage = rec
+        import risk                                     # every stop rule evaluated each tick, none ever fires
+        risk.TRAILING_STOP_ENABLED = risk.TRAILING_PNL_ENABLED = risk.PROFIT_RATCHET_ENABLED = True
+        risk.TRAILING_STOP_PCT, risk.TRAILING_PNL_PCT, risk.MIN_PROFIT_TO_ACTIVATE = 99.0, -1e9, float("inf")
+        missing = [s for s in SYMBOLS if f"candles_{s}" not in market.docs]
+        assert not missing, f"no fixture candles for {missing} — run: python benchmark.py fixtures"
+        meta = trader_mod.load_asset_meta(market.docs["meta"], SYMBOLS)
+        history = CANDLE_HISTORY_HOURS * 60
+        needed = history + warmup + ticks + alloc_ticks
+        assert all(len(market.docs[f"candles_{s}"]) > needed for s in SYMBOLS), f"fixtures need > {needed} bars"
+
+        results = {}
+        for size in sizes:
+            days = STORE_SIZES[size]
+            data_collector.LOGS_DIR = os.path.join(tmp, size)
+            os.makedirs(data_collector.LOGS_DIR, exist_ok=True)
+            data_collector._stores.clear()
+            market.rewind(history)
+            for sym in SYMBOLS:
+                _prefill_store(data_collector, sym, market.docs[f"candles_{sym}"][0]["t"], days)
+                exchange.candle_buffers[sym] = CandleBuffer(exchange.info, sym, TIMEFRAME, history_hours=CANDLE_HISTORY_HOURS)
+                st = state.get(sym)
+                st.__init__(sym, st.state_file, st.cross_file)
+                st.position_open, st.position_side, st.last_buy_price = True, "long", 100.0
+            traders = {sym: trader_mod.SymbolTrader(sym, *meta[sym]) for sym in SYMBOLS}
+
+            def one_tick():
+                market.advance()
+                t0 = time.perf_counter()
+                exchange.account.invalidate()
+                with rec("fetch"):
+                    candles = exchange.fetch_all_ohlcv(SYMBOLS, now_ms=market.now_ms(SYMBOLS[0]))
+                for sym, t in traders.items():
+                    t.tick(candles.get(sym))
+                with rec("dashboard"):
+                    state.dashboard_data.update({
+                        "usdt_balance": exchange.get_balance(),
+                        "latency": trader_mod.default_executor.stats.summary(),
+                    })
+                    hub.publish(snapshot.build())
+                with rec("persist"):
+                    persist.flush()
+                elapsed = (time.perf_counter() - t0) * 1000
+                trader_mod.default_executor.drain()     # orders land before the next bar, as they would live
+                return elapsed
+
+            for _ in range(warmup):
+                one_tick()
+            rec.ms.clear()
+            tick_ms = [one_tick() for _ in range(ticks)]
+            tracemalloc.start()
+            rec.kib.clear()
+            for _ in range(alloc_ticks):
+                one_tick()
+            tracemalloc.stop()
+
+            stages = {}
+            for name, samples in rec.ms.items():
+                kib = rec.kib.get(name, [0.0])
+                stages[name] = {"p50_ms": round(float(np.median(samples)), 4),
+                                "p99_ms": round(float(np.percentile(samples, 99)), 4),
+                                "peak_kib": round(float(np.mean(kib)), 1)}
+            stages["tick"] = {"p50_ms": round(float(np.median(tick_ms)), 4),
+                              "p99_ms": round(float(np.percentile(tick_ms, 99)), 4),
+                              "peak_kib": round(float(sum(s["peak_kib"] for s in stages.values())), 1)}
+            results[size] = stages
+            bars_1m = len(data_collector.get_store("1m", SYMBOLS[0]))
+            print(f"{size} store ({bars_1m} 1m bars), {ticks} ticks, {market.orders} orders filled so far")
+            for name, s in stages.items():
+                print(f"  {name:<15} p50 {s['p50_ms']:8.3f} ms │ p99 {s['p99_ms']:8.3f} ms │ peak {s['peak_kib']:9.1f} KiB")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    _compare_baseline(results, baseline_path, threshold)
+    if save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({"saved": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, f, indent=2)
+        print(f"baseline saved → {baseline_path}")
+
+def _compare_baseline(results, path, threshold, floor_ms=0.05):
+    """Flag stages slower (p50) or allocating more (peak) than the saved baseline by > threshold"""
+    if not os.path.exists(path):
+        print("no baseline yet (save one with --save-baseline)")
+        return
+    with open(path) as f:
+        base = json.load(f)
+    regressions = []
+    for size, stages in results.items():
+        for name, s in stages.items():
+            b = base["results"].get(size, {}).get(name)
+            if not b:
+                continue
+            if s["p50_ms"] > b["p50_ms"] * (1 + threshold) and s["p50_ms"] - b["p50_ms"] > floor_ms:
+                regressions.append(f"{size} {name}: {b['p50_ms']:.3f} → {s['p50_ms']:.3f} ms")
+            if s["peak_kib"] > b["peak_kib"] * (1 + threshold) and s["peak_kib"] - b["peak_kib"] > 64:
+                regressions.append(f"{size} {name}: {b['peak_kib']:.0f} → {s['peak_kib']:.0f} KiB peak")
+    print(f"vs baseline from {base['saved']}: " + ("OK" if not regressions else f"{len(regressions)} REGRESSIONS"))
+    for line in regressions:
+        print(f"  {line}")
+
+
+# ====================== COLD START ======================
+_STARTUP_CHILD = """
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main, metrics
+t1 = time.perf_counter()
+if {setup!r}:
+    main.setup()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "setup_ms": (time.perf_counter() - t1) * 1000,
+                  "ready_ms": metrics.process_age() * 1000, "files": sorted(os.listdir("."))}}))
+"""
+
+def _stub_api(delay, meta):
+    """Local /info server answering meta/spotMeta after `delay` seconds; .hits counts requests"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            server.hits += 1
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(delay)
+            body = json.dumps(meta if req.get("type") == "meta" else {"tokens": [], "universe": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def bench_startup(runs=5, budget_ms=1000):
+    """Process start → main.setup() done, in a fresh interpreter, with the API slow, unreachable,
+    and the metadata cache fresh / stale / missing. Importing main alone must make no request."""
+    import socket
+    import subprocess
+    import sys
+    import tempfile
+    from config import SYMBOLS
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    meta = {"universe": [{"name": s, "szDecimals": 2, "maxLeverage": 10} for s in SYMBOLS]}
+    slow = _stub_api(3.0, meta)
+    quick = _stub_api(0.3, meta)
+    with socket.socket() as s:                  # a port nothing listens on
+        s.bind(("127.0.0.1", 0))
+        dead = f"http://127.0.0.1:{s.getsockname()[1]}"
+
+    def run(base_url, cache_age=None, setup=True):
+        with tempfile.TemporaryDirectory() as tmp:
+            if cache_age is not None:
+                os.makedirs(os.path.join(tmp, "saves"))
+                docs = {k: {"fetched": time.time() - cache_age, "data": d}
+                        for k, d in (("meta", meta), ("spotMeta", {"tokens": [], "universe": []}))}
+                with open(os.path.join(tmp, "saves", "meta_cache.json"), "w") as f:
+                    json.dump(docs, f)
+            env = dict(os.environ, HL_BASE_URL=base_url, BOT_RECORD="0", BOT_PAPER="0")
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-c", _STARTUP_CHILD.format(root=root, setup=setup)],
+                                  cwd=tmp, env=env, capture_output=True, text=True, timeout=60)
+            assert proc.returncode == 0, proc.stderr[-2000:]
+            out = json.loads(proc.stdout.strip().splitlines()[-1])
+            out["wall_ms"] = (time.perf_counter() - t0) * 1000
+            return out
+
+    try:
+        hits = slow.hits
+        bare = run(f"http://127.0.0.1:{slow.server_address[1]}", setup=False)
+        assert slow.hits == hits and bare["files"] == [], f"import made requests / wrote {bare['files']}"
+        print(f"import main: {bare['import_ms']:.0f} ms, no requests, nothing written")
+
+        scenarios = [
+            ("cache fresh · API 3 s slow", f"http://127.0.0.1:{slow.server_address[1]}", 0, True),
+            ("cache fresh · API unreachable", dead, 0, True),
+            ("cache stale · API unreachable", dead, 7 * 86400, True),
+            ("no cache · API 0.3 s slow", f"http://127.0.0.1:{quick.server_address[1]}", None, False),
+        ]
+        over = []
+        for name, url, age, gated in scenarios:
+            samples = [run(url, age) for _ in range(runs)]
+            p50 = lambda key: float(np.median([x[key] for x in samples]))
+            print(f"  {name:<32} ready p50 {p50('ready_ms'):6.0f} ms │ import {p50('import_ms'):5.0f} ms │ "
+                  f"setup {p50('setup_ms'):5.0f} ms │ process wall {p50('wall_ms'):6.0f} ms")
+            if gated and p50("ready_ms") > budget_ms:
+                over.append(name)
+        assert not over, f"cold start over {budget_ms} ms: {over}"
+        print(f"cold start: OK (< {budget_ms} ms with a cached metadata file, whatever the API does)")
+    finally:
+        slow.shutdown()
+        quick.shutdown()
+
+
+# ====================== HTTP TRANSPORT ======================
+class FaultyApi:
+    """Local stand-in for the Hyperliquid REST API. Answers after `latency` s; fail(status, n) makes
+    the next n requests fail; limit=(weight/s, burst) adds a server-side budget that answers 429.
+    .log = [(request kind, client port)] in arrival order."""
+
+    def __init__(self, latency=0.0, limit=None):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from transport import TokenBucket, classify
+
+        api = self
+        self.latency = latency
+        self.faults = []
+        self.log = []
+        self.lock = threading.Lock()
+        self.budget = TokenBucket(*limit) if limit else None
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"               # keep-alive
+
+            def do_POST(self):
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                endpoint, weight, _ = classify(self.path, req)
+                kind = endpoint.split(":", 1)[1]
+                with api.lock:
+                    api.log.append((kind, self.client_address[1]))
+                    fault = api.faults.pop(0) if api.faults else None
+                    if fault is None and api.budget is not None:
+                        api.budget._refill()
+                        if api.budget.tokens < weight:
+                            fault = (429, None)
+                        else:
+                            api.budget.tokens -= weight
+                time.sleep(api.latency)
+                if fault is not None:
+                    status, retry_after = fault
+                    self._send(status, {"code": status, "msg": "injected"}, retry_after)
+                else:
+                    self._send(200, api.reply(kind, req))
+
+            def _send(self, status, doc, retry_after=None):
+                body = json.dumps(doc).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda *args: None  # clients hanging up early (timeout checks) are expected
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply(self, kind, req):
+        if kind == "clearinghouseState":
+            return {"withdrawable": "123.45", "marginSummary": {"accountValue": "123.45"}, "assetPositions": []}
+        if kind == "candleSnapshot":
+            t = req["req"]["startTime"] // 60_000 * 60_000
+            return [{"t": t + i * 60_000, "T": t + i * 60_000 + 59_999, "s": req["req"]["coin"], "i": "1m",
+                     "o": "100", "h": "100", "l": "100", "c": "100", "v": "1", "n": 1} for i in range(5)]
+        if kind == "allMids":
+            return {"LTC": "100.0"}
+        if kind == "order":
+            return {"status": "ok", "response": {"type": "order", "data": {"statuses": [
+                {"filled": {"totalSz": "0.1", "avgPx": "100.0", "oid": 1}}]}}}
+        return {}
+
+    def fail(self, status, n=1, retry_after=None):
+        with self.lock:
+            self.faults += [(status, retry_after)] * n
+
+    def hits(self, kind=None):
+        return sum(1 for k, _ in self.log if kind is None or k == kind)
+
+    def close(self):
+        self.server.shutdown()
+
+_ORDER = {"action": {"type": "order", "orders": [{"a": 0, "b": True, "p": "100", "s": "0.1", "r": False,
+                                                   "t": {"limit": {"tif": "Ioc"}}}], "grouping": "na"}}
+
+def _candles_req(coin="LTC"):
+    return {"type": "candleSnapshot", "req": {"coin": coin, "interval": "1m", "startTime": 1_700_000_040_000,
+                                              "endTime": 1_700_000_400_000}}
+
+def check_transport():
+    """transport.Transport against a local server injecting 429s, 5xx, latency and refusals"""
+    import socket
+    import threading
+    import exchange
+    from hyperliquid.info import Info
+    from transport import Transport, attach, RateLimited, ApiUnavailable, ApiRejected
+
+    api = FaultyApi()
+    account = {"type": "clearinghouseState", "user": "0x0"}
+    quick = lambda **k: Transport(**dict(dict(backoff_base=0.01, backoff_max=0.05), **k))
+    try:
+        # 429s are retried (with backoff) until they stop…
+        tr = quick()
+        api.fail(429, 2)
+        assert tr.post(api.url + "/info", json=account).json()["withdrawable"] == "123.45"
+        assert api.hits() == 3
+        # …or raised as RateLimited once the attempts run out; Retry-After is respected
+        api.fail(429, 10, retry_after=0.2)
+        t0 = time.perf_counter()
+        try:
+            tr.post(api.url + "/info", json=account)
+            raise AssertionError("expected RateLimited")
+        except RateLimited as e:
+            assert e.attempts == 5 and e.status == 429, e
+        assert time.perf_counter() - t0 >= 0.8, "Retry-After ignored"
+        api.faults.clear()
+
+        # 5xx: info retried, an order is not (it may have been executed)
+        n = api.hits()
+        api.fail(502, 1)
+        tr.post(api.url + "/info", json=account)
+        assert api.hits() - n == 2
+        n = api.hits()
+        api.fail(502, 1)
+        try:
+            tr.post(api.url + "/exchange", json=_ORDER)
+            raise AssertionError("expected ApiUnavailable")
+        except ApiUnavailable:
+            assert api.hits() - n == 1, "order was re-sent after a 5xx"
+        # a read timeout on an order isn't retried either
+        api.latency, n = 0.3, api.hits()
+        try:
+            quick(timeout=0.1).post(api.url + "/exchange", json=_ORDER)
+            raise AssertionError("expected ApiUnavailable")
+        except ApiUnavailable as e:
+            assert api.hits() - n == 1 and "read timeout" in str(e), e
+        api.latency = 0.0
+        # 4xx is the request's fault: no retry
+        n = api.hits()
+        api.fail(422, 3)
+        try:
+            tr.post(api.url + "/info", json=account)
+            raise AssertionError("expected ApiRejected")
+        except ApiRejected:
+            assert api.hits() - n == 1
+        api.faults.clear()
+        # refused connection: retried, and safe to retry for orders (nothing was sent)
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            dead = f"http://127.0.0.1:{s.getsockname()[1]}"
+        try:
+            quick(retries=2).post(dead + "/exchange", json=_ORDER)
+            raise AssertionError("expected ApiUnavailable")
+        except ApiUnavailable as e:
+            assert e.attempts == 3 and "refused" in str(e), e
+
+        # keep-alive: sequential requests share one connection, concurrent ones stay within the pool
+        for _ in range(50):
+            tr.post(api.url + "/info", json=account)
+        seq = len({p for _, p in api.log[-50:]})
+        assert seq == 1, f"{seq} connections for 50 sequential requests"
+        pooled = quick(pool_size=4)
+        api.latency = 0.01
+        start = len(api.log)
+        threads = [threading.Thread(target=lambda: [pooled.post(api.url + "/info", json=account) for _ in range(10)])
+                   for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        conns = len({p for _, p in api.log[start:]})
+        assert conns <= 4, f"{conns} connections with a pool of 4"
+        print(f"retries / typed errors: OK │ keep-alive: 50 sequential → {seq} connection, "
+              f"120 from 12 threads → {conns} connections (pool 4)")
+
+        # priority: orders jump the queue of candle fetches waiting for budget
+        api.latency = 0.0
+        paced = quick(weight_per_min=600, burst=20)             # one candle fetch (weight 20) per 2 s
+        start = len(api.log)
+        fetches = [threading.Thread(target=paced.post, args=(api.url + "/info",), kwargs={"json": _candles_req()})
+                   for _ in range(3)]
+        for t in fetches:
+            t.start()
+            time.sleep(0.05)
+        t0 = time.perf_counter()
+        paced.post(api.url + "/exchange", json=_ORDER)
+        order_wait = time.perf_counter() - t0
+        order_at = [k for k, _ in api.log[start:]].index("order")
+        for t in fetches:
+            t.join()
+        assert order_at == 1, f"order went out {order_at + 1}th"
+        print(f"priority: order sent right after the in-flight candle fetch, ahead of 2 queued ones "
+              f"({order_wait * 1000:.0f} ms round trip; each queued fetch waits ~2 s for budget)")
+
+        # exchange.py lookups: a typed error, once per tick, never a $0 balance
+        info = attach(Info(api.url, skip_ws=True, meta={"universe": []}, spot_meta={"tokens": [], "universe": []}),
+                      quick(retries=1))
+        snap = exchange.AccountSnapshot(info, "0x0")
+        saved, exchange.account = exchange.account, snap
+        try:
+            api.fail(429, 2)
+            n = api.hits()
+            for lookup in (exchange.get_balance, exchange.get_position, exchange.get_unrealized_pnl):
+                try:
+                    lookup()
+                    raise AssertionError(f"{lookup.__name__} returned a value while rate-limited")
+                except RateLimited:
+                    pass
+            assert api.hits() - n == 2, "every lookup re-fetched the account"
+            snap.invalidate()
+            assert exchange.get_balance() == 123.45
+        finally:
+            exchange.account = saved
+        print("exchange lookups: OK (RateLimited raised to every caller in the tick, one fetch)")
+    finally:
+        api.close()
+
+def bench_transport(symbols=40, orders=5, rate=100.0, burst=200.0, latency=0.02):
+    """A 40-symbol candle seed plus a few orders against a server enforcing a weight budget:
+    the SDK's own session (no pacing) vs transport.Transport (paced, orders first)"""
+    from concurrent.futures import ThreadPoolExecutor
+    from hyperliquid.api import API
+    from transport import Transport, attach
+
+    def run(make_client):
+        api = FaultyApi(latency=latency, limit=(rate, burst))
+        try:
+            client = make_client(api.url)
+            failed, order_ms = [], []
+
+            def call(payload, url_path="/info"):
+                t0 = time.perf_counter()
+                try:
+                    client.post(url_path, payload)
+                except Exception as e:
+                    failed.append(type(e).__name__)
+                if url_path == "/exchange":
+                    order_ms.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(16) as pool:        # candle fetches on a pool, orders on their own thread (as live)
+                jobs = [pool.submit(call, _candles_req(f"SYM{i}")) for i in range(symbols)]
+                for _ in range(orders):
+                    time.sleep(0.3)
+                    call(_ORDER, "/exchange")
+                for job in jobs:
+                    job.result()
+            return time.perf_counter() - t0, failed, order_ms, len(api.log)
+        finally:
+            api.close()
+
+    print(f"{symbols} candle fetches (weight 20) + {orders} orders, server budget {rate:.0f}/s burst {burst:.0f}, "
+          f"{latency * 1000:.0f} ms latency")
+    for name, make in (("SDK session", lambda url: API(url)),
+                       ("transport", lambda url: attach(API(url), Transport(weight_per_min=rate * 60, burst=burst)))):
+        wall, failed, order_ms, sent = run(make)
+        errors = ", ".join(f"{failed.count(e)} {e}" for e in sorted(set(failed))) or "none"
+        print(f"  {name:<12} {wall:5.1f}s │ {sent:3d} requests sent │ failed: {errors:<20} │ "
+              f"order p50 {float(np.median(order_ms)):6.0f} ms, max {max(order_ms):6.0f} ms")
+
+
+# ====================== HISTORY BACKFILL ======================
+class FakeCandleApi(FaultyApi):
+    """FaultyApi serving a deterministic 1m history: nothing before `listed`, no bars inside `holes`
+    [(start, end) ms], at most 5000 rows per request. .windows = startTime of every candleSnapshot."""
+
+    def __init__(self, listed=0, holes=(), latency=0.0, limit=None):
+        self.listed = listed
+        self.holes = list(holes)
+        self.windows = []
+        super().__init__(latency, limit)
+
+    @staticmethod
+    def price(t):
+        return 100 + 10 * np.sin(t / 3_600_000)
+
+    @classmethod
+    def bar(cls, t):
+        o, c = cls.price(t), cls.price(t + 60_000)
+        return {"t": t, "T": t + 59_999, "s": "LTC", "i": "1m", "o": f"{o:.6f}", "h": f"{max(o, c) + 0.05:.6f}",
+                "l": f"{min(o, c) - 0.05:.6f}", "c": f"{c:.6f}", "v": f"{1 + t // 60_000 % 7}", "n": 3}
+
+    def reply(self, kind, req):
+        if kind != "candleSnapshot":
+            return super().reply(kind, req)
+        q = req["req"]
+        with self.lock:
+            self.windows.append(q["startTime"])
+        first = max(q["startTime"], self.listed)
+        first += -first % 60_000
+        rows = []
+        for t in range(first, q["endTime"] + 1, 60_000):
+            if not any(a <= t < b for a, b in self.holes):
+                rows.append(self.bar(t))
+            if len(rows) == 5000:
+                break
+        return rows
+
+_DAY = 86_400_000
+_BF_START = 1_735_689_600_000           # 2025-01-01 UTC
+
+def _backfill_cmd(api, *args, window=1000):
+    import sys
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, HL_BASE_URL=api.url, BOT_RECORD="0", BOT_PAPER="0")
+    return [sys.executable, "-u", os.path.join(root, "backfill.py"), "LTC", *args, "--window-bars", str(window),
+            "--weight-per-min", "300000", "--burst", "5000"], env
+
+def check_backfill(days=10, kill_after=5):
+    """Run backfill.py against FakeCandleApi, SIGKILL it mid-run and resume: no completed window is
+    fetched again, bars already in the store survive, and the result is continuous and correct.
+    Then a history with holes and a late listing has to be reported as gaps."""
+    import signal
+    import subprocess
+    import tempfile
+    from candle_store import CandleStore, CANDLE_DTYPE
+    from data_collector import aggregate_bars
+    from backfill import windows
+
+    end = _BF_START + days * _DAY
+    args = ("--start", "2025-01-01", "--end", f"2025-01-{1 + days:02d}", "--workers", "4")
+    api = FakeCandleApi(latency=0.02)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            logs = os.path.join(tmp, "saves", "logs")
+            # the bot already collected the last 6 h of the range (and beyond): marked with volume 777
+            own = np.arange(end - 6 * 3_600_000, end + 3_600_000, 60_000)
+            rec = np.zeros(len(own), dtype=CANDLE_DTYPE)
+            rec['t'] = own
+            for f in ('open', 'high', 'low', 'close'):
+                rec[f] = 50.0
+            rec['volume'] = 777.0
+            CandleStore(os.path.join(logs, "ltc_1m.bin")).upsert(rec)
+
+            cmd, env = _backfill_cmd(api, *args)
+            proc = subprocess.Popen(cmd, cwd=tmp, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in proc.stdout:
+                if f"window {kill_after}/" in line:
+                    break
+            proc.send_signal(signal.SIGKILL)
+            proc.wait()
+            with open(os.path.join(logs, "ltc_1m.bin.backfill.json")) as f:
+                done = json.load(f)["done"]
+            time.sleep(0.2)                                 # requests the killed run left in flight finish
+            first_run = len(api.windows)
+            api.windows.clear()
+
+            t0 = time.perf_counter()
+            proc = subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, text=True, timeout=120)
+            assert proc.returncode == 0, proc.stdout[-2000:] + proc.stderr[-2000:]
+            wins = windows(_BF_START, end, 1000)
+            refetched = [t for t in api.windows if t < wins[done][0]]
+            print(f"killed after {done}/{len(wins)} windows ({first_run} requested) → resumed: "
+                  f"{len(api.windows)} requests, {len(refetched)} completed windows fetched again "
+                  f"({time.perf_counter() - t0:.1f}s)")
+            assert not refetched, f"resume refetched {len(refetched)} completed windows"
+            assert len(api.windows) <= len(wins) - done, "resume fetched more windows than were left"
+
+            store = CandleStore(os.path.join(logs, "ltc_1m.bin"))
+            got = store.read()
+            expect_t = np.arange(_BF_START, end + 3_600_000, 60_000)
+            assert np.array_equal(got['t'], expect_t), "stored history is not the full range"
+            mine = np.isin(got['t'], own)
+            assert np.all(got['volume'][mine] == 777.0), "backfill overwrote bars the bot collected"
+            ref = [FakeCandleApi.bar(int(t)) for t in got['t'][~mine][::97]]
+            assert all(abs(float(r["c"]) - c) < 1e-9 for r, c in zip(ref, got['close'][~mine][::97])), "wrong values"
+            for tf, step in (("3m", 180_000), ("5m", 300_000)):
+                path = os.path.join(logs, f"ltc_{tf}.bin")
+                if os.path.exists(path):
+                    assert np.array_equal(CandleStore(path).read(), aggregate_bars(got, step)), f"{tf} not rebuilt"
+            assert not os.path.exists(os.path.join(logs, "ltc_1m.bin.backfill")), "staging file left behind"
+            verify = subprocess.run(_backfill_cmd(api, "--verify")[0], cwd=tmp, env=env, capture_output=True, text=True)
+            assert verify.returncode == 0, verify.stdout
+            print(f"  {len(got)} bars, {int(mine.sum())} of the bot's own kept │ verify: {verify.stdout.strip()}")
+    finally:
+        api.close()
+
+    listed = _BF_START + _DAY // 2
+    holes = [(_BF_START + _DAY + 600_000, _BF_START + _DAY + 1_800_000)]
+    api = FakeCandleApi(listed=listed, holes=holes)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd, env = _backfill_cmd(api, "--start", "2025-01-01", "--end", "2025-01-03")
+            proc = subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, text=True, timeout=120)
+            out = proc.stdout
+            assert proc.returncode == 1, f"gaps not reported:\n{out}"
+            assert "2 gaps (740 bars missing)" in out, out
+            assert "2025-01-01 00:00 → 2025-01-01 12:00 (720 bars)" in out, out
+            assert "2025-01-02 00:10 → 2025-01-02 00:30 (20 bars)" in out, out
+            print("late listing + a 20-bar hole → reported as 2 gaps (exit 1): OK")
+    finally:
+        api.close()
+
+def bench_backfill(days=30, latency=0.05, workers=(1, 4, 8), window=1000):
+    """Wall time for `days` of 1m history with 1/4/8 workers; a server enforcing the bot's full
+    budget must never answer the backfill (BACKFILL_WEIGHT_SHARE of it) with a 429"""
+    import tempfile
+    from backfill import Backfill, api_fetcher
+    from config import BACKFILL_WEIGHT_SHARE
+    from transport import Transport
+
+    cwd = os.getcwd()
+    print(f"{days} days of 1m bars in {window}-bar windows, {latency * 1000:.0f} ms per request")
+    try:
+        for limited in (False, True):
+            rate, burst = (20.0, 40.0) if limited else (1e6, 1e6)
+            span = 3 if limited else days               # paced at 10 weight/s: keep it short
+            for n in workers if not limited else workers[-1:]:
+                api = FakeCandleApi(latency=latency, limit=(rate, burst))
+                try:
+                    with tempfile.TemporaryDirectory() as tmp:
+                        os.chdir(tmp)
+                        transport = Transport(weight_per_min=rate * 60 * BACKFILL_WEIGHT_SHARE,
+                                              burst=burst * BACKFILL_WEIGHT_SHARE)
+                        job = Backfill("LTC", _BF_START, _BF_START + span * _DAY, workers=n,
+                                       fetch=api_fetcher(api.url, transport), window_bars=window)
+                        t0 = time.perf_counter()
+                        cp = job.run(progress=None)
+                        job.splice()
+                        wall = time.perf_counter() - t0
+                        os.chdir(cwd)
+                    retried = api.hits("candleSnapshot") - len(job.windows)
+                    label = f"{span}d, server budget {rate:.0f}/s" if limited else f"{span}d, no server limit"
+                    print(f"  {n} workers, {label:<24} {wall:6.2f}s │ {cp['bars'] / wall:9,.0f} bars/s │ "
+                          f"{len(job.windows)} windows, {retried} answered 429")
+                    if limited:
+                        assert retried == 0, "backfill exceeded its share of the rate limit"
+                finally:
+                    api.close()
+    finally:
+        os.chdir(cwd)
+
+
+# ====================== BACKTEST PARITY ======================
+def _exit_parity(close, sig, leverage=10.0, **stops):
+    """backtest.simulate's stop exits vs risk.PositionRisk fed the same closes → (trades, stop exits)"""
+    from types import SimpleNamespace
+    import backtest
+    import risk
+
+    saved = {k.upper(): getattr(risk, k.upper()) for k in stops}
+    for k, v in stops.items():
+        setattr(risk, k.upper(), v)
+    try:
+        trades = backtest.simulate(close, sig, leverage=leverage, **stops)
+        stopped = 0
+        for entry, exit_i, side, qty, reason in zip(trades["entry"], trades["exit"], trades["side"],
+                                                    trades["qty"], trades["reason"]):
+            st = SimpleNamespace(position_open=True, last_buy_price=close[entry], save_state=lambda: None,
+                                 position_side="long" if side == backtest.BUY else "short", position_size=None,
+                                 peak_price=None, peak_pnl_usd=None, peak_pnl_pct=None)
+            pr = risk.PositionRisk(st)
+            pr.opened(close[entry], qty)
+            live = next(((i, hit[0]) for i in range(entry + 1, exit_i + 1)
+                         for hit in [pr.update(close[i], leverage)] if hit), None)
+            want = (int(exit_i), str(reason)) if reason in risk.RULES else None
+            assert live == want, f"trade at bar {entry}: backtest exit {want}, risk.py {live} ({stops})"
+            stopped += want is not None
+    finally:
+        for k, v in saved.items():
+            setattr(risk, k, v)
+    return len(trades["entry"]), stopped
+
+def check_parity(bars=3000, seeds=(1, 2, 3), recorded=3000):
+    """Vectorized backtest signals (backtest.strategy_signals) vs the live detect_cross replayed bar by
+    bar: zero mismatches on synthetic walks, and on the recorded 1m store when there is one. Then
+    exits: backtest.simulate's stops vs risk.PositionRisk on the same closes, one rule at a time
+    and all together."""
+    import backtest
+
+    runs = [(f"synthetic seed {seed}", synthetic_candles(bars, seed=seed)) for seed in seeds]
+    path = os.path.join("saves/logs", f"{backtest.SYMBOL.lower()}_1m.bin")
+    if os.path.exists(path):
+        runs.append((f"recorded {path}", backtest.load_candles(path).tail(recorded).reset_index(drop=True)))
+    total = 0
+    for label, df in runs:
+        t0 = time.perf_counter()
+        ok, mismatch, n = backtest.check_parity(df)
+        print(f"  {label:<32} {len(df)} bars │ {n:3d} signals │ {len(mismatch)} mismatches │ "
+              f"{time.perf_counter() - t0:.1f}s")
+        assert ok, f"{label}: backtest and detect_cross disagree at bars {mismatch[:10].tolist()}"
+        total += n
+    assert total > 0, "no signals at all — the check proves nothing"
+
+    off = dict(trailing_stop_enabled=False, profit_ratchet_enabled=False, trailing_pnl_enabled=False,
+               trailing_stop_pct=0.5, min_profit_to_activate=0.10, profit_protection_ratio=0.6, trailing_pnl_pct=-2.0)
+    rule_sets = {"trailing stop": dict(off, trailing_stop_enabled=True),
+                 "profit ratchet": dict(off, profit_ratchet_enabled=True),
+                 "trailing PnL": dict(off, trailing_pnl_enabled=True),
+                 "all three": dict(off, trailing_stop_enabled=True, profit_ratchet_enabled=True,
+                                   trailing_pnl_enabled=True)}
+    close = synthetic_candles(50_000, seed=4)['close'].to_numpy()
+    sig = backtest.strategy_signals(close)
+    for name, stops in rule_sets.items():
+        trades, stopped = _exit_parity(close, sig, **stops)
+        print(f"  exits, {name:<15} {trades:3d} trades │ {stopped:3d} stopped out │ backtest = risk.py")
+        assert stopped > 0, f"{name}: no stop fired — the check proves nothing"
+    print(f"Parity: OK ({len(runs)} histories, {total} signals, 0 mismatches; stop exits match risk.py)")
+
+
+# ====================== MARKET STREAM ======================
+class FakeWsServer:
+    """Local WebSocket endpoint (RFC 6455 text frames, stdlib only). Every accepted client shows up
+    on .conns as a _WsConn; drop() on it cuts the TCP connection without a close handshake."""
+
+    def __init__(self):
+        import queue
+        import socket
+        import threading
+
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.url = f"ws://127.0.0.1:{self.sock.getsockname()[1]}/ws"
+        self.conns = queue.Queue()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        import base64
+        import hashlib
+        import re
+
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            req = b""
+            while b"\r\n\r\n" not in req:
+                req += sock.recv(4096)
+            key = re.search(rb"Sec-WebSocket-Key: *(\S+)", req, re.I).group(1)
+            accept = base64.b64encode(hashlib.sha1(key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest())
+            sock.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            self.conns.put(_WsConn(sock))
+
+    def close(self):
+        self.sock.close()
+
+class _WsConn:
+    """Server side of one connection: .inbox gets the client's text frames, send() pushes a JSON doc"""
+
+    def __init__(self, sock):
+        import queue
+        import threading
+
+        self.sock = sock
+        self.inbox = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def send(self, doc, opcode=0x1):
+        payload = json.dumps(doc).encode() if opcode == 0x1 else doc
+        n = len(payload)
+        if n < 126:
+            size = bytes([n])
+        elif n < 65536:
+            size = bytes([126]) + n.to_bytes(2, "big")
+        else:
+            size = bytes([127]) + n.to_bytes(8, "big")
+        head = bytes([0x80 | opcode]) + size
+        self.sock.sendall(head + payload)
+
+    def _exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("closed")
+            data += chunk
+        return data
+
+    def _read(self):
+        try:
+            while True:
+                b0, b1 = self._exact(2)
+                n = b1 & 0x7F
+                if n >= 126:
+                    n = int.from_bytes(self._exact(2 if n == 126 else 8), "big")
+                mask = self._exact(4) if b1 & 0x80 else b"\0\0\0\0"      # client frames are masked
+                payload = bytes(c ^ mask[i % 4] for i, c in enumerate(self._exact(n)))
+                opcode = b0 & 0x0F
+                if opcode == 0x8:                  # close → echo it, like a real server
+                    self.send(payload, 0x8)
+                    self.sock.close()
+                    return
+                if opcode == 0x1:
+                    self.inbox.put(json.loads(payload))
+        except (ConnectionError, OSError):
+            return
+
+    def drop(self):
+        import socket
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class _StreamInfo:
+    """candles_snapshot over FakeCandleApi's deterministic 1m history, up to the bar opening at .last"""
+
+    def __init__(self, last):
+        self.last = last
+        self.requests = []
+
+    def candles_snapshot(self, name, interval, startTime, endTime):
+        self.requests.append((startTime, endTime))
+        first = startTime + (-startTime % 60_000)
+        return [FakeCandleApi.bar(t) for t in range(first, min(endTime, self.last) + 1, 60_000)]
+
+class _Invalidations:
+    def __init__(self):
+        self.count = 0
+
+    def invalidate(self):
+        self.count += 1
+
+def _wait_until(cond, timeout=5.0, what="condition"):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, f"timed out waiting for {what}"
+        time.sleep(0.01)
+
+def check_stream(missed=5, gap=3):
+    """MarketStream against a local WS server: candle / allMids / userFills frames land where they
+    should; after a dropped connection it reconnects, and REST fills the bars pushed while offline
+    (and the ones skipped by a candle that arrives `gap` bars ahead) so the buffer has no holes."""
+    import market_stream
+    from candle_buffer import CandleBuffer
+
+    logs = []
+    log_print = market_stream.log_print
+    market_stream.log_print = lambda msg, level="INFO": logs.append((level, msg))
+    now = int(time.time() * 1000)
+    info = _StreamInfo(last=now - now % 60_000 - 30 * 60_000)          # bars below the real clock
+    buf = CandleBuffer(info, "LTC", "1m", history_hours=1)
+    account = _Invalidations()
+    mids = []
+    server = FakeWsServer()
+    stream = market_stream.MarketStream(server.url, "1m", "0xabc", {"LTC": buf}, account=account)
+    stream.mid_listeners.append(lambda sym, px, at: mids.append((sym, px)))
+
+    def subscriptions(conn):
+        return sorted(conn.inbox.get(timeout=5)["subscription"]["type"] for _ in range(4))
+
+    def contiguous():
+        t = buf.snapshot().t
+        return len(t) > 1 and bool((np.diff(t) == 60_000).all()) and int(t[-1]) == info.last
+
+    try:
+        stream.start()
+        conn = server.conns.get(timeout=5)
+        assert subscriptions(conn) == ["allMids", "candle", "userEvents", "userFills"]
+        assert stream.connected.wait(5), "stream never went live"
+        assert buf.live and contiguous(), "initial REST seed incomplete"
+
+        # === frames on the first connection ===
+        conn.send({"channel": "candle", "data": dict(FakeCandleApi.bar(info.last), c="123.0")})
+        info.last += 60_000
+        conn.send({"channel": "candle", "data": FakeCandleApi.bar(info.last)})
+        assert stream.wait_for_bar_close(5), "a new bar didn't set bar_closed"
+        conn.send({"channel": "allMids", "data": {"mids": {"LTC": "101.5", "BTC": "60000"}}})
+        conn.send({"channel": "userFills", "data": {"isSnapshot": True, "user": "0xabc", "fills": []}})
+        conn.send({"channel": "userFills", "data": {"user": "0xabc", "fills": [{"coin": "LTC", "px": "101.5"}]}})
+        _wait_until(lambda: account.count == 1, what="userFills → invalidate")
+        assert mids == [("LTC", 101.5)] and stream.mids == {"LTC": 101.5}, mids
+        assert buf.snapshot().close[-2] == 123.0, "forming-bar update not merged"
+        assert len(info.requests) == 1, "REST polled while streaming"
+
+        # === drop; the market moves on while we're offline ===
+        conn.drop()
+        _wait_until(lambda: not stream.connected.is_set(), what="disconnect")
+        assert not buf.live, "buffer still marked live while offline"
+        info.last += missed * 60_000
+        conn = server.conns.get(timeout=5)            # reconnect (jittered backoff ≤ 1.5 s)
+        assert subscriptions(conn) == ["allMids", "candle", "userEvents", "userFills"]
+        assert stream.connected.wait(5), "stream didn't come back"
+        assert stream.reconnects == 1 and buf.live
+        assert contiguous(), f"the {missed} bars missed while offline weren't backfilled"
+        assert any("WS disconnected" in msg for _, msg in logs)
+
+        # === a pushed candle that skips bars → REST gap fill ===
+        before = len(info.requests)
+        info.last += gap * 60_000
+        conn.send({"channel": "candle", "data": FakeCandleApi.bar(info.last)})
+        assert stream.wait_for_bar_close(5), "gap bar didn't set bar_closed"
+        assert len(info.requests) == before + 1 and contiguous(), "gap not backfilled"
+        bars = buf.snapshot()
+        expected = [float(FakeCandleApi.bar(int(t))["c"]) for t in bars.t[-(missed + gap + 1):]]
+        assert np.allclose(bars.close[-(missed + gap + 1):], expected), "backfilled bars differ from the market"
+        failed = [msg for _, msg in logs if "failed" in msg]
+        assert not failed, failed
+    finally:
+        stream.stop()
+        stream.join(5)
+        server.close()
+        market_stream.log_print = log_print
+    print(f"Stream: OK (candle/allMids/userFills routed, reconnect after drop, "
+          f"{missed} offline + {gap} skipped bars backfilled over REST, {len(info.requests)} REST calls)")
+
+
+# ====================== RISK ENGINE ======================
+class _StopExchange:
+    """Exchange stand-in for the stop checks: fills at .px, or fails the next `.fail` closes"""
+
+    def __init__(self, px=100.0):
+        self.px = px
+        self.fail = 0
+        self.closes = []
+
+    def _fill(self, sz):
+        return {"status": "ok", "response": {"type": "order", "data": {"statuses": [
+            {"filled": {"totalSz": str(sz), "avgPx": str(self.px), "oid": 1}}]}}}
+
+    def market_open(self, name, is_buy, sz, px=None, slippage=0.05, cloid=None, builder=None):
+        return self._fill(sz)
+
+    def market_close(self, coin, sz=None, px=None, slippage=0.05, cloid=None, builder=None):
+        if self.fail:
+            self.fail -= 1
+            return {"status": "err", "response": "injected"}
+        self.closes.append(self.px)
+        return self._fill(1.0)
+
+@contextlib.contextmanager
+def _risk_rig(tmp):
+    """(trader module, make_trader(symbol) → (SymbolTrader, _StopExchange)) with saves/ under tmp.
+    On exit every order and save has landed (no save may have failed) and nothing points at tmp."""
+    import persist
+    import state
+    import trader as trader_mod
+    from execution import Executor
+
+    cwd = os.getcwd()
+    patched = {k: getattr(trader_mod, k) for k in ("get_current_leverage", "get_position", "log_print")}
+    log = persist.log_print
+    save_errors = []
+    executors = []
+
+    def record(msg, level="INFO", **kw):
+        if msg.startswith("Save failed"):
+            save_errors.append(msg)
+        log(msg, level, **kw)
+
+    def make(symbol):
+        ex = _StopExchange()
+        t = trader_mod.SymbolTrader(symbol, 2, 0.01, executor=Executor(ex))
+        executors.append(t.executor)
+        t.executor.drain()
+        return t, ex
+
+    os.chdir(tmp)
+    trader_mod.get_current_leverage = lambda symbol: 10
+    trader_mod.get_position = lambda symbol: 1.0
+    persist.log_print = record
+    try:
+        yield trader_mod, make
+        for executor in executors:
+            executor.drain()
+        persist.flush()
+        assert not save_errors, f"{len(save_errors)} saves failed, e.g. {save_errors[0]}"
+    finally:
+        persist.writer.dirty.clear()            # nothing left to write into tmp after it's gone
+        persist.log_print = log
+        state.symbols.clear()
+        state.journal = None
+        for k, v in patched.items():
+            setattr(trader_mod, k, v)
+        os.chdir(cwd)
+
+def _open(t, ex, side, px=100.0, size=1.0):
+    ex.px = px
+    (t.place_long if side == "long" else t.place_short)(size).result(timeout=5)
+    t.executor.drain()
+
+def _feed(t, ex, prices):
+    """Feed mids until a stop fires → index of the price that fired (None if nothing did)"""
+    for i, px in enumerate(prices):
+        ex.px = px
+        closing = t.on_price(px)
+        if closing is not None:
+            closing.result(timeout=5)
+            t.executor.drain()
+            return i
+    return None
+
+def check_risk():
+    """Every stop rule against hand-computed trigger prices, exactly one close per trigger from
+    concurrent feeds, a failed close re-arms, and peaks survive a restart through state.json"""
+    import shutil
+    import tempfile
+    import threading
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="riskcheck-")
+    os.chdir(tmp)                           # before the logger is imported: saves/ lands in the temp dir
+    import persist
+    import risk
+    import state
+
+    saved = {k: getattr(risk, k) for k in ("TRAILING_STOP_ENABLED", "TRAILING_STOP_PCT", "PROFIT_RATCHET_ENABLED",
+                                           "MIN_PROFIT_TO_ACTIVATE", "PROFIT_PROTECTION_RATIO",
+                                           "TRAILING_PNL_ENABLED", "TRAILING_PNL_PCT")}
+
+    def rules(stop=False, ratchet=False, pnl=False):
+        risk.TRAILING_STOP_ENABLED, risk.PROFIT_RATCHET_ENABLED, risk.TRAILING_PNL_ENABLED = stop, ratchet, pnl
+        risk.TRAILING_STOP_PCT, risk.TRAILING_PNL_PCT = 0.5, -2.0
+        risk.MIN_PROFIT_TO_ACTIVATE, risk.PROFIT_PROTECTION_RATIO = 0.10, 0.6
+
+    try:
+        with _risk_rig(tmp) as (_, make):
+            t, ex = make("LTC")
+            cases = [
+                # rule, side, prices, index that must fire
+                ("trailing stop long", dict(stop=True), "long", [100, 101, 103, 102.5, 102.49, 102.4], 5),
+                ("trailing stop short", dict(stop=True), "short", [100, 98, 97, 97.45, 97.48, 97.5], 5),
+                ("profit ratchet", dict(ratchet=True), "long", [100.05, 99.8, 100.4, 100.25, 100.245, 100.23], 5),
+                ("trailing PnL (10×)", dict(pnl=True), "long", [100.2, 100.5, 100.35, 100.31, 100.3], 4),
+            ]
+            for name, on, side, prices, want in cases:
+                rules(**on)
+                _open(t, ex, side)
+                got = _feed(t, ex, prices)
+                assert got == want, f"{name}: fired at {got}, expected {want}"
+                assert not t.state.position_open and t.state.peak_price is None, f"{name}: position not closed"
+                print(f"  {name:<20} fired at {prices[want]} ({side}, entry 100): OK")
+
+            # nothing fires while flat, or on a rule that's off
+            rules()
+            _open(t, ex, "long")
+            assert _feed(t, ex, [100, 150, 50, 100.01]) is None
+            t.close_position().result(timeout=5)
+            t.executor.drain()
+
+            # two threads hammering the trigger price → one close
+            rules(stop=True)
+            _open(t, ex, "long")
+            t.on_price(110.0)
+            closes = len(ex.closes)
+            go = threading.Event()
+            futures = []
+
+            def hammer():
+                go.wait()
+                for _ in range(2000):
+                    f = t.on_price(100.0)
+                    if f is not None:
+                        futures.append(f)
+            threads = [threading.Thread(target=hammer) for _ in range(4)]
+            for th in threads:
+                th.start()
+            go.set()
+            for th in threads:
+                th.join()
+            for f in futures:
+                f.result(timeout=5)
+            t.executor.drain()
+            assert len(futures) == 1 and len(ex.closes) == closes + 1, f"{len(futures)} closes from one trigger"
+            print("  4 threads × 2000 mids past the stop → 1 close: OK")
+
+            # a close that doesn't fill → the stop fires again on the next mid
+            _open(t, ex, "long")
+            t.on_price(110.0)
+            ex.fail = 1
+            first = t.on_price(100.0)
+            assert first is not None and first.result(timeout=5) is False
+            t.executor.drain()
+            assert t.state.position_open and _feed(t, ex, [100.0]) == 0, "stop did not re-arm after a failed close"
+            print("  failed close → re-armed, closed on the next mid: OK")
+
+            # restart: peak price / PnL / size come back from state.json
+            _open(t, ex, "long", size=2.0)
+            _feed(t, ex, [101.0, 103.0, 102.6])
+            persist.flush()
+            state.symbols.pop("LTC")
+            t2, ex2 = make("LTC")
+            st = t2.state
+            assert (st.position_open, st.position_size, st.peak_price) == (True, 2.0, 103.0), st.state_doc()
+            assert _feed(t2, ex2, [102.5, 102.4]) == 1, "restored peak not used"
+            print("  restart with a long open: peak $103.0, size 2.0 restored, stop fired at 102.4: OK")
+
+            # restart with trailing PnL on: until the deferred leverage refresh lands, the 10× peak
+            # % must not be compared with a % computed at an unknown leverage
+            rules(pnl=True)
+            _open(t2, ex2, "long")
+            _feed(t2, ex2, [100.5])                 # +5% of margin at 10×
+            persist.flush()
+            state.symbols.pop("LTC")
+            t3, ex3 = make("LTC")
+            assert math.isclose(t3.state.peak_pnl_pct, 5.0), t3.state.state_doc()
+            t3.current_leverage = None              # _refresh_leverage not run yet
+            assert _feed(t3, ex3, [100.45, 100.4]) is None, "trailing PnL fired before the leverage was known"
+            assert math.isclose(t3.state.peak_pnl_pct, 5.0)
+            t3.current_leverage = 10
+            assert _feed(t3, ex3, [100.45, 100.29]) == 1, "trailing PnL didn't fire once the leverage was known"
+            print("  restart, leverage not refreshed yet: trailing PnL held, fired at 100.29 once 10× known: OK")
+
+            # main's stop tick between bars: mids only, the account isn't read
+            import exchange
+            import main
+            sent = []
+
+            class CountingInfo:
+                def all_mids(self):
+                    sent.append("allMids")
+                    return {"LTC": "101.0"}
+
+                def user_state(self, address):
+                    sent.append("user_state")
+                    return {"withdrawable": "100.0", "marginSummary": {"accountValue": "100.0"}, "assetPositions": []}
+
+            built = exchange.info._client
+            exchange.info.set(CountingInfo())
+            try:
+                _open(t3, ex3, "long")
+                main.traders = {"LTC": t3}
+                for _ in range(3):
+                    main.run_tick("stop")
+                assert sent == ["allMids"] * 3, f"3 stop ticks sent {sent}"
+                t3.close_position().result(timeout=5)
+                t3.executor.drain()
+            finally:
+                exchange.info.set(built)
+                main.traders = {}
+            print("  3 stop ticks with a position open → 3 allMids requests, no user_state: OK")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+        for k, v in saved.items():
+            setattr(risk, k, v)
+
+def bench_risk(updates=200_000, triggers=500, symbols=100):
+    """Cost of one mid update (no trigger), and trigger latency from an allMids WS frame arriving
+    to the close being queued / filled, with `symbols` coins in the frame"""
+    import tempfile
+    import risk
+    from market_stream import MarketStream
+    from config import STOP_CHECK_INTERVAL
+
+    saved = (risk.TRAILING_STOP_ENABLED, risk.PROFIT_RATCHET_ENABLED, risk.TRAILING_PNL_ENABLED)
+    try:
+        with tempfile.TemporaryDirectory() as tmp, _risk_rig(tmp) as (trader_mod, make):
+            trader_mod.log_print = lambda *a, **k: None         # 2 lines per trigger × hundreds
+            risk.TRAILING_STOP_ENABLED = risk.PROFIT_RATCHET_ENABLED = risk.TRAILING_PNL_ENABLED = True
+            t, ex = make("LTC")
+            _open(t, ex, "long")
+            px = 100.0 + np.abs(np.sin(np.arange(updates))) * 0.1     # wiggles, never far enough to fire
+            t0 = time.perf_counter()
+            for p in px.tolist():
+                t.on_price(p)
+            per_update = (time.perf_counter() - t0) / updates * 1e6
+            assert t.state.position_open
+            print(f"mid update, 3 rules on, no trigger: {per_update:.2f} µs")
+
+            stream = MarketStream("ws://unused", "1m", None, {"LTC": None})
+            queued = []
+
+            def listener(sym, price, received_at):
+                f = t.on_price(price, received_at)
+                if f is not None:
+                    queued.append(time.perf_counter() - received_at)
+            stream.mid_listeners.append(listener)
+            coins = {f"C{i}": f"{10 + i}.5" for i in range(symbols - 1)}
+            t.executor.stats.__init__()
+            for _ in range(triggers):
+                t.executor.drain()
+                if not t.state.position_open:
+                    _open(t, ex, "long")
+                ex.px = 98.0
+                frame = json.dumps({"channel": "allMids", "data": {"mids": dict(coins, LTC="98.0")}})
+                stream._on_message(None, frame)
+            t.executor.drain()
+            q = np.array(queued) * 1000
+            fill = t.executor.stats.summary()["signal_to_fill"]
+            assert len(q) == triggers, f"{len(q)} of {triggers} triggers"
+            print(f"{triggers} stop triggers from a {symbols}-coin allMids frame:")
+            print(f"  frame received → close queued   p50 {np.median(q):.3f} ms │ p99 {np.percentile(q, 99):.3f} ms │ max {q.max():.3f} ms")
+            print(f"  frame received → close filled   p50 {fill['p50']:.3f} ms │ p95 {fill['p95']:.3f} ms (instant fake exchange)")
+            print(f"  before: checked every {STOP_CHECK_INTERVAL} s (mean {STOP_CHECK_INTERVAL / 2:.0f} s late) "
+                  f"with a user_state round trip per check; stop ticks now send one allMids and no user_state")
+    finally:
+        risk.TRAILING_STOP_ENABLED, risk.PROFIT_RATCHET_ENABLED, risk.TRAILING_PNL_ENABLED = saved
+
+
+# ====================== RECORD / REPLAY ======================
+def synthetic_tape(out_dir, symbol="LTC", hours=24, seed=21, warm_cache=False):
+    """A recording as the live bot would leave it: startup meta, the 24h candle seed, then per bar
+    the closed + forming bar and a user_state every 10 s. Written through recorder.Recorder.
+    warm_cache: like any start after the first — ./saves/meta_cache.json exists (and goes into the
+    header), so there are no meta / spotMeta requests on the tape."""
+    import recorder
+    from persist import atomic_write_json
+
+    step = 60_000
+    bars = synthetic_candles(1440 + hours * 60 + 1, seed=seed)
+    ts = bars['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+    rows = [{"t": int(t), "T": int(t) + step - 1, "s": symbol, "i": "1m", "o": f"{o:.4f}", "h": f"{h:.4f}",
+             "l": f"{l:.4f}", "c": f"{c:.4f}", "v": f"{v:.2f}", "n": 10}
+            for t, o, h, l, c, v in zip(ts, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'])]
+    forming = lambda r: dict(r, h=r["o"], l=r["o"], c=r["o"], v="0.0", n=1)
+    account = {"withdrawable": "100.0", "marginSummary": {"accountValue": "100.0"}, "assetPositions": []}
+
+    meta = {"universe": [{"name": symbol, "szDecimals": 2, "maxLeverage": 10}]}
+    spot_meta = {"tokens": [], "universe": []}
+    if warm_cache:
+        os.makedirs("saves", exist_ok=True)
+        atomic_write_json(os.path.join("saves", "meta_cache.json"), {"meta": {"fetched": time.time(), "data": meta},
+                                                                      "spotMeta": {"fetched": time.time(), "data": spot_meta}})
+    rec = recorder.Recorder(out_dir, header={"wallet": None, "symbols": [symbol], "timeframe": "1m"})
+    start = rows[1440]["t"]
+    info = lambda t, q, r: rec.write({"t": t, "p": "/info", "q": q, "r": r})
+    if not warm_cache:
+        info(start + 100, {"type": "spotMeta"}, spot_meta)
+        info(start + 200, {"type": "meta"}, meta)
+    info(start + 300, {"type": "clearinghouseState", "user": None}, account)
+    seed_req = {"coin": symbol, "interval": "1m", "startTime": start - 86_400_000, "endTime": start + 1200}
+    info(start + 1200, {"type": "candleSnapshot", "req": seed_req}, rows[:1440] + [forming(rows[1440])])
+    for i in range(1441, len(rows)):
+        t = rows[i]["t"]
+        req = {"coin": symbol, "interval": "1m", "startTime": rows[i - 1]["t"], "endTime": t + 1200}
+        info(t + 1200, {"type": "candleSnapshot", "req": req}, [rows[i - 1], forming(rows[i])])
+        for k in range(6):
+            info(t + 1300 + k * 10_000, {"type": "clearinghouseState", "user": None}, account)
+    rec.close()
+    return rec.records
+
+def check_replay(hours=24):
+    """Record a synthetic day through recorder.py, replay it twice with replay.py: both runs must
+    make identical decisions, far faster than real time. Recorded the way most tapes are — with a
+    warm metadata cache, so there is no meta request on the tape — and it still has to trade."""
+    import glob
+    import subprocess
+    import sys
+    import tempfile
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)                   # the tape header snapshots ./saves state files → just the meta cache
+        try:
+            n = synthetic_tape(os.path.join(tmp, "tapes"), hours=hours, warm_cache=True)
+        finally:
+            os.chdir(cwd)
+        tapes = sorted(glob.glob(os.path.join(tmp, "tapes", "*.jsonl.gz")))
+        size_kib = sum(os.path.getsize(p) for p in tapes) / 1024
+        print(f"tape: {n} responses over {hours}h in {len(tapes)} file(s), {size_kib:.0f} KiB gzipped")
+
+        runs = []
+        for r in range(2):
+            out = os.path.join(tmp, f"run{r}")
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, os.path.join(root, "replay.py"), *tapes, "--out", out],
+                                  capture_output=True, text=True, env=dict(os.environ, TERM="dumb"))
+            wall = time.perf_counter() - t0
+            assert proc.returncode == 0, proc.stderr[-2000:]
+            with open(os.path.join(out, "replay_summary.json")) as f:
+                summary = json.load(f)
+            runs.append(summary)
+            print(f"  replay {r + 1}: {summary['simulated_hours']}h simulated in {wall:.1f}s wall "
+                  f"({summary['simulated_hours'] * 3600 / wall:.0f}× real time) │ {summary['bar_ticks']} bar / "
+                  f"{summary['stop_ticks']} stop ticks │ {len(summary['orders'])} orders │ profit ${summary['profit']:+.4f}")
+            with open(os.path.join(out, "saves", "logs", "bot.log"), errors="replace") as f:
+                crashes = [line.strip() for line in f if "CRASH" in line]
+            assert not crashes, crashes[:3]
+
+        decisions = lambda s: (s["orders"], s["crosses"], s["profit"], s["bar_ticks"])
+        assert runs[0]["orders"], "no orders — the replay couldn't trade"
+        assert decisions(runs[0]) == decisions(runs[1]), "replays diverged"
+        assert runs[0]["bar_ticks"] >= hours * 60, "bars were skipped"
+        print("replay determinism: OK (identical orders, crosses and profit)")
+
+
+# ====================== PAPER TRADING ======================
+class _Mids:
+    def __init__(self, px):
+        self.px = px
+
+    def all_mids(self):
+        return {"LTC": str(self.px)}
+
+def check_paper():
+    """Fill model, fees, funding, margin and liquidation of paper.PaperExchange against hand-computed numbers"""
+    import clock
+    from execution import parse_fill
+    from paper import PaperExchange
+
+    sim = clock.use(clock.SimClock(1_700_000_000))
+    try:
+        market = _Mids(100.0)
+        ex = PaperExchange(market, balance=1000.0, taker_fee=0.0005, funding_rate=0.0001, leverage=10,
+                           depth_usd=1000.0, step_bps=10.0, spread_bps=20.0)
+        # 25 LTC buy: level 0 @ 100.10 takes 9.99, level 1 @ 100.20 takes 9.98, level 2 @ 100.30 the rest
+        px, sz = parse_fill(ex.market_open("LTC", True, 25.0))
+        l0, l1 = 1000 / 100.1, 1000 / 100.2
+        want = (l0 * 100.1 + l1 * 100.2 + (25 - l0 - l1) * 100.3) / 25
+        assert sz == 25.0 and abs(px - want) < 1e-9, (px, want)
+        fee = 25 * px * 0.0005
+        assert abs(ex.cash - (1000 - fee)) < 1e-9
+
+        # tight slippage limit → IOC partial fill
+        px2, sz2 = parse_fill(ex.market_open("LTC", True, 25.0, slippage=0.0012))
+        assert abs(sz2 - l0) < 1e-9, sz2
+
+        # funding: two hours later a long pays szi * mid * rate per hour
+        cash = ex.cash
+        sim.t += 2 * 3600
+        ex.user_state()
+        pos = ex.positions["LTC"]["szi"]
+        assert abs((cash - ex.cash) - 2 * pos * 100.0 * 0.0001) < 1e-9
+
+        # margin: 10× leverage on ~$1000 equity → a $50k order is refused
+        assert "error" in ex.market_open("LTC", True, 500.0)["response"]["data"]["statuses"][0]
+
+        # close realises PnL at the bid side of the book
+        market.px = 104.0
+        _, closed = parse_fill(ex.market_close("LTC"))
+        assert abs(closed - pos) < 1e-9 and not ex.positions and ex.totals["realized"] > 0
+
+        # liquidation: max size long, price falls until equity < maintenance (half the initial margin)
+        equity = float(ex.user_state()["marginSummary"]["accountValue"])
+        liquidated = []
+        ex.liquidation_listeners.append(lambda *a: liquidated.append(a))
+        _, size = parse_fill(ex.market_open("LTC", True, round(equity * 9 / 104.0, 2)))
+        market.px = 95.0
+        state = ex.user_state()
+        assert ex.totals["liquidations"] == 1 and not state["assetPositions"], state
+        assert liquidated == [("LTC", size, 95.0)], liquidated
+        print(f"paper exchange model: OK (avg fill {px:.4f} for 25 LTC, fees ${ex.totals['fees']:.4f}, "
+              f"funding ${ex.totals['funding']:.4f}, equity after liquidation ${float(state['marginSummary']['accountValue']):.2f})")
+    finally:
+        clock.use(clock.WallClock())
+
+    # the bot hears about it: main.on_liquidation → the trader goes flat, stops disarmed, a close journaled
+    import tempfile
+    import main
+    with tempfile.TemporaryDirectory() as tmp, _risk_rig(tmp) as (_, make):
+        t, stop_ex = make("LTC")
+        _open(t, stop_ex, "long", size=size)
+        main.traders = {"LTC": t}
+        try:
+            main.on_liquidation("LTC", size, 95.0)
+        finally:
+            main.traders = {}
+        t.executor.drain()
+        st = t.state
+        assert not st.position_open and st.position_side is None and st.peak_price is None, st.state_doc()
+        assert abs(st.total_profit - (95.0 - 100.0) * size) < 1e-9 and t.on_price(50.0) is None
+        assert not stop_ex.closes, "the bot tried to close a position that was already gone"
+    print(f"paper liquidation → trader flat, realised ${st.total_profit:+.2f}: OK")
+
+def check_bot_config():
+    """BOT_CONFIG: variant keys apply with the default's type; typos, protected keys and wrong types stop the import"""
+    import subprocess
+    import sys
+
+    def load(overrides):
+        env = dict(os.environ, BOT_CONFIG=json.dumps(overrides), BOT_PAPER="0")
+        code = "import config; print(config.MA_SHORT, config.TRADE_USDT, config.ALLOW_SHORTS)"
+        return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+
+    ok = load({"MA_SHORT": 20, "TRADE_USDT": 60, "ALLOW_SHORTS": False})
+    assert ok.returncode == 0 and ok.stdout.split() == ["20", "60.0", "False"], ok.stderr
+    for bad, why in [({"MA_SHORTT": 20}, "'MA_SHORTT' can't be overridden"),
+                     ({"API_WALLET_ADDRESS": "0x0"}, "'API_WALLET_ADDRESS' can't be overridden"),
+                     ({"BASE_URL": "http://x"}, "'BASE_URL' can't be overridden"),
+                     ({"PAPER_TRADING": True}, "'PAPER_TRADING' can't be overridden"),
+                     ({"API_WEIGHT_PER_MIN": 600_000}, "'API_WEIGHT_PER_MIN' can't be overridden"),
+                     ({"MA_SHORT": "20"}, "MA_SHORT must be int"),
+                     ({"MA_SHORT": 20.5}, "MA_SHORT must be int"),
+                     ({"ALLOW_SHORTS": 0}, "ALLOW_SHORTS must be bool"),
+                     ({"TRADE_USDT": True}, "TRADE_USDT must be float")]:
+        r = load(bad)
+        assert r.returncode != 0 and why in r.stderr, f"{bad}: {r.stderr or r.stdout}"
+    print("BOT_CONFIG overrides: OK (3 applied, 9 rejected)")
+
+def bench_paper(hours=24, variants=None):
+    """Strategy variants side by side on paper accounts over the same (synthetic) recorded day"""
+    import glob
+    import tempfile
+    from paper import compare, print_comparison
+
+    variants = variants or [("base", {}), ("fast-ma", {"MA_SHORT": 20, "MA_LONG": 100}),
+                            ("size-x4", {"TRADE_USDT": 60.0}), ("no-shorts", {"ALLOW_SHORTS": False})]
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            synthetic_tape(os.path.join(tmp, "tapes"), hours=hours)
+        finally:
+            os.chdir(cwd)
+        tapes = sorted(glob.glob(os.path.join(tmp, "tapes", "*.jsonl.gz")))
+        t0 = time.perf_counter()
+        results = compare(tapes, variants, os.path.join(tmp, "paper"))
+        wall = time.perf_counter() - t0
+    print(f"{len(variants)} variants × {hours}h on paper in {wall:.1f}s wall ({os.cpu_count()} CPUs)")
+    print_comparison(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks")
+    parser.add_argument("suite", choices=["indicators", "symbols", "logging", "dashboard", "journal", "persistence",
+                                          "metrics", "tick", "fixtures", "replay", "paper", "startup", "transport", "candles",
+                                          "backfill", "stream", "parity", "risk"])
+    parser.add_argument("--save-baseline", action="store_true", help="tick: store these results as the new baseline")
+    parser.add_argument("--live", action="store_true", help="fixtures: record from the Hyperliquid API instead of synthesizing")
+    args = parser.parse_args()
+
+    if args.suite == "indicators":
+        check_indicator_equivalence()
+        bench_indicators()
+    elif args.suite == "candles":
+        check_candles()
+        bench_candles()
+    elif args.suite == "symbols":
+        bench_symbols()
+    elif args.suite == "logging":
+        bench_logging()
+    elif args.suite == "dashboard":
+        bench_dashboard()
+    elif args.suite == "journal":
+        bench_journal()
+    elif args.suite == "persistence":
+        check_persistence()
+    elif args.suite == "metrics":
+        bench_metrics()
+    elif args.suite == "tick":
+        bench_tick(save_baseline=args.save_baseline)
+    elif args.suite == "replay":
+        check_replay()
+    elif args.suite == "paper":
+        check_paper()
+        check_bot_config()
+        bench_paper()
+    elif args.suite == "startup":
+        bench_startup()
+    elif args.suite == "transport":
+        check_transport()
+        bench_transport()
+    elif args.suite == "backfill":
+        check_backfill()
+        bench_backfill()
+    elif args.suite == "stream":
+        check_stream()
+    elif args.suite == "parity":
+        check_parity()
+    elif args.suite == "risk":
+        check_risk()
+        bench_risk()
+    elif args.suite == "fixtures":
+        from config import SYMBOLS
+        make_fixtures(SYMBOLS, os.path.join(os.path.dirname(os.path.abspath(__file__)), FIXTURES_DIR), live=args.live)
@@ -0,0 +1,111 @@
+# candle_buffer.py — in-memory OHLCV buffer, seeded once then updated incrementally
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from candles import Candles, CandleArray
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "8h": 28_800_000,
+    "12h": 43_200_000, "1d": 86_400_000,
+}
+
+class CandleBuffer:
+    """Keeps the last `history_hours` of bars for one symbol/interval.
+
+    The first call downloads the full window. After that only bars from the
+    still-forming one onward are requested: the forming bar is replaced in
+    place and any newly opened bars are appended, the oldest are dropped.
+    Bars live in a preallocated CandleArray; snapshot() hands out views of it.
+    """
+
+    def __init__(self, info, symbol, interval="1m", history_hours=24):
+        self.info = info
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.history_ms = history_hours * 3600 * 1000
+        self.max_bars = self.history_ms // self.interval_ms + 1
+        self.bars = CandleArray(self.max_bars)
+        self.last_ts_ms = None          # open time of the newest (forming) bar
+        self.live = False               # True while a MarketStream is pushing bars into us
+        self.lock = threading.RLock()
+
+    def _fetch(self, start_ms, end_ms):
+        raw = self.info.candles_snapshot(name=self.symbol, interval=self.interval, startTime=start_ms, endTime=end_ms)
+        return Candles.from_raw(raw)
+
+    def seed(self, now_ms=None):
+        now_ms = now_ms or int(time.time() * 1000)
+        new = self._fetch(now_ms - self.history_ms, now_ms)
+        with self.lock:
+            self.bars.replace(new)
+            self.last_ts_ms = self.bars.last_t
+            return len(self.bars)
+
+    def update(self, now_ms=None):
+        """Pull bars newer than the last closed one. Returns number of bars touched."""
+        now_ms = now_ms or int(time.time() * 1000)
+
+        # Cold start, or we fell further behind than the buffer holds → full reseed
+        if self.last_ts_ms is None or now_ms - self.last_ts_ms >= self.history_ms:
+            return self.seed(now_ms)
+
+        new = self._fetch(self.last_ts_ms, now_ms)
+        if not len(new):
+            return 0
+        with self.lock:
+            self.bars.merge(new)
+            self.last_ts_ms = self.bars.last_t
+        return len(new)
+
+    def apply_bar(self, raw):
+        """Merge one pushed candle (same shape as a candles_snapshot row).
+
+        Returns "update" (forming bar changed), "new" (a bar closed and the next
+        one opened), "gap" (bars were missed — caller should backfill with update())
+        or None for stale messages.
+        """
+        t = int(raw['t'])
+        with self.lock:
+            if self.last_ts_ms is None or t > self.last_ts_ms + self.interval_ms:
+                return "gap"
+            if t < self.last_ts_ms:
+                return None
+            kind = "update" if t == self.last_ts_ms else "new"
+            self.bars.merge(Candles.from_raw([raw]))
+            self.last_ts_ms = self.bars.last_t
+            return kind
+
+    def snapshot(self):
+        """Read-only Candles view of the buffer (no copy; the forming bar may still be revised)"""
+        with self.lock:
+            return self.bars.view()
+
+
+# === MANY SYMBOLS ===
+_pool = None
+_pool_size = 0
+
+def update_many(buffers, max_workers=64, now_ms=None):
+    """Update several buffers concurrently (one candles_snapshot each, I/O bound) so a tick
+    costs roughly one round trip instead of one per symbol. Returns {symbol: snapshot};
+    a failed symbol maps to the exception it raised and doesn't hold up the others."""
+    global _pool, _pool_size
+    buffers = list(buffers)
+    size = min(max_workers, max(1, len(buffers)))
+    if _pool is None or _pool_size < size:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="candles")
+        _pool_size = size
+
+    def one(buf):
+        try:
+            if not buf.live:
+                buf.update(now_ms)
+            return buf.snapshot()
+        except Exception as e:
+            return e
+
+    return {buf.symbol: bars for buf, bars in zip(buffers, _pool.map(one, buffers))}
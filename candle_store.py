@@ -0,0 +1,155 @@
+# candle_store.py — append-only fixed-width binary candle files
+#
+# One file per symbol/timeframe, one 48-byte little-endian record per bar:
+#   int64 open time (ms) | float64 open | high | low | close | volume
+# Records are kept sorted by time, so appends are O(1), the last (forming)
+# bar is rewritten in place and range reads are a binary search on a memmap.
+#
+#   python candle_store.py import saves/logs/ltc_1m.csv saves/logs/ltc_1m.bin
+#   python candle_store.py export saves/logs/ltc_1m.bin saves/logs/ltc_1m.csv
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+CANDLE_DTYPE = np.dtype([
+    ('t', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'),
+])
+RECORD_SIZE = CANDLE_DTYPE.itemsize   # 48 bytes
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+def df_to_records(df: pd.DataFrame) -> np.ndarray:
+    """OHLCV DataFrame (datetime or ms timestamps) → sorted, de-duplicated record array"""
+    ts = df['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(ts):
+        t = ts.values.astype('datetime64[ms]').astype(np.int64)
+    else:
+        t = ts.to_numpy(dtype=np.int64)
+    rec = np.empty(len(df), dtype=CANDLE_DTYPE)
+    rec['t'] = t
+    for col in OHLCV:
+        rec[col] = df[col].to_numpy(dtype=np.float64)
+    rec = rec[np.argsort(rec['t'], kind='stable')]
+    if len(rec) > 1:
+        # keep the last row for duplicated timestamps (newest revision of the bar)
+        keep = np.append(rec['t'][1:] != rec['t'][:-1], True)
+        rec = rec[keep]
+    return rec
+
+def records_to_df(rec: np.ndarray) -> pd.DataFrame:
+    df = pd.DataFrame({col: rec[col] for col in OHLCV})
+    df.insert(0, 'timestamp', pd.to_datetime(rec['t'], unit='ms'))
+    return df
+
+
+class CandleStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        size = os.path.getsize(path)
+        if size % RECORD_SIZE:
+            # Torn write from a crash — drop the partial trailing record
+            with open(path, 'r+b') as f:
+                f.truncate(size - size % RECORD_SIZE)
+        self._reload()
+
+    def _reload(self):
+        self.size = os.path.getsize(self.path)
+        self.count = self.size // RECORD_SIZE
+        self.last_t = int(self._read_at(self.count - 1)['t']) if self.count else None
+
+    def _check(self):
+        # backfill.py may have replaced the file with a longer history since we last looked
+        if os.path.getsize(self.path) != self.size:
+            self._reload()
+
+    def __len__(self):
+        return self.count
+
+    def _read_at(self, i):
+        with open(self.path, 'rb') as f:
+            f.seek(i * RECORD_SIZE)
+            return np.frombuffer(f.read(RECORD_SIZE), dtype=CANDLE_DTYPE)[0]
+
+    # === WRITE ===
+    def upsert(self, rec: np.ndarray):
+        """Write sorted records. Bars older than the last stored one are ignored,
+        the last stored bar is overwritten, newer bars are appended.
+        Returns the number of bars appended."""
+        if len(rec) == 0:
+            return 0
+        self._check()
+        if self.last_t is not None:
+            rec = rec[rec['t'] >= self.last_t]
+            if len(rec) == 0:
+                return 0
+        with open(self.path, 'r+b') as f:
+            if self.last_t is not None and rec['t'][0] == self.last_t:
+                f.seek((self.count - 1) * RECORD_SIZE)
+                f.write(rec[:1].tobytes())
+                rec = rec[1:]
+            if len(rec):
+                f.seek(self.count * RECORD_SIZE)
+                f.write(rec.tobytes())
+        self.count += len(rec)
+        self.size = self.count * RECORD_SIZE
+        self.last_t = int(rec['t'][-1]) if len(rec) else self.last_t
+        return len(rec)
+
+    def upsert_df(self, df: pd.DataFrame):
+        return self.upsert(df_to_records(df)) if not df.empty else 0
+
+    # === READ ===
+    def _map(self):
+        self._check()
+        if self.count == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(self.path, dtype=CANDLE_DTYPE, mode='r', shape=(self.count,))
+
+    def read(self, start_ms=None, end_ms=None) -> np.ndarray:
+        """Records with start_ms <= t <= end_ms (either bound optional), copied out of the map"""
+        m = self._map()
+        t = m['t']
+        lo = 0 if start_ms is None else int(np.searchsorted(t, start_ms, side='left'))
+        hi = len(m) if end_ms is None else int(np.searchsorted(t, end_ms, side='right'))
+        return np.array(m[lo:hi])
+
+    def tail(self, n) -> np.ndarray:
+        m = self._map()
+        return np.array(m[max(0, len(m) - n):])
+
+    def read_df(self, start_ms=None, end_ms=None) -> pd.DataFrame:
+        return records_to_df(self.read(start_ms, end_ms))
+
+    # === CSV COMPAT ===
+    def import_csv(self, csv_path):
+        """One-shot import of a legacy saves/logs/*.csv file. Returns bars appended."""
+        if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+            return 0
+        df = pd.read_csv(csv_path, parse_dates=['timestamp'])
+        if df.empty:
+            return 0
+        return self.upsert_df(df)
+
+    def export_csv(self, csv_path, start_ms=None, end_ms=None):
+        """Write the same CSV layout data_collector used to produce"""
+        df = self.read_df(start_ms, end_ms)
+        for col in ['open', 'high', 'low', 'close']:
+            df[col] = df[col].round(3)
+        df['volume'] = df['volume'].round(2)
+        df.to_csv(csv_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        return len(df)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("usage: python candle_store.py import <csv> <bin> | export <bin> <csv>")
+        sys.exit(1)
+    cmd, src, dst = sys.argv[1:]
+    if cmd == "import":
+        print(f"Imported {CandleStore(dst).import_csv(src)} bars from {src} → {dst}")
+    else:
+        print(f"Exported {CandleStore(src).export_csv(dst)} bars from {src} → {dst}")
@@ -0,0 +1,142 @@
+# candles.py — fixed-capacity structure-of-arrays OHLCV bars shared by fetch → indicators → persistence
+#
+# One int64 array of open times (ms) and one float64 row per field (open/high/low/close/volume),
+# preallocated at twice the capacity. New bars are written in place and the window slides by
+# moving a start index; only when the tail reaches the end of the arrays is the window copied
+# to fresh ones (once per `capacity` bars). Readers get Candles — slices of those same arrays,
+# no copies. pandas is only for the edges (to_df / from_df: analysis, backtests, CSV).
+import numpy as np
+from candle_store import CANDLE_DTYPE, OHLCV
+
+FIELDS = OHLCV                          # row order of Candles.ohlcv
+RAW_KEYS = ('o', 'h', 'l', 'c', 'v')    # same fields in a candles_snapshot / WS row
+
+
+class Candles:
+    """Read-only window of bars: .t (int64 ms), .open/.high/.low/.close/.volume (float64), all views.
+    A CandleArray's owner may still revise the forming (last) bar in place."""
+    __slots__ = ("t", "ohlcv")
+
+    def __init__(self, t, ohlcv):
+        self.t = t
+        self.ohlcv = ohlcv
+
+    def __len__(self):
+        return len(self.t)
+
+    open = property(lambda self: self.ohlcv[0])
+    high = property(lambda self: self.ohlcv[1])
+    low = property(lambda self: self.ohlcv[2])
+    close = property(lambda self: self.ohlcv[3])
+    volume = property(lambda self: self.ohlcv[4])
+
+    @property
+    def last_t(self):
+        return int(self.t[-1]) if len(self.t) else None
+
+    def tail(self, n):
+        lo = max(0, len(self.t) - n)
+        return Candles(self.t[lo:], self.ohlcv[:, lo:])
+
+    # === EDGES ===
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty((len(FIELDS), 0), dtype=np.float64))
+
+    @classmethod
+    def from_raw(cls, rows):
+        """candles_snapshot / WS candle rows ({"t": ms, "o": "1.2", ...}) → Candles"""
+        if not rows:
+            return cls.empty()
+        t = np.fromiter((r['t'] for r in rows), dtype=np.int64, count=len(rows))
+        ohlcv = np.array([[r[k] for r in rows] for k in RAW_KEYS], dtype=np.float64)
+        return cls(t, ohlcv)
+
+    @classmethod
+    def from_df(cls, df):
+        """OHLCV DataFrame (datetime or ms timestamps) → Candles (copies; for analysis code)"""
+        ts = df['timestamp']
+        if ts.dtype.kind == 'M':
+            t = ts.values.astype('datetime64[ms]').astype(np.int64)
+        else:
+            t = ts.to_numpy(dtype=np.int64)
+        return cls(t, np.array([df[f].to_numpy(dtype=np.float64) for f in FIELDS]))
+
+    def to_df(self):
+        import pandas as pd
+        df = pd.DataFrame({f: self.ohlcv[i] for i, f in enumerate(FIELDS)})
+        df.insert(0, 'timestamp', pd.to_datetime(self.t, unit='ms'))
+        return df
+
+    def records(self, since=None):
+        """candle_store records for the bars with t >= since (only those are interleaved/copied)"""
+        lo = 0 if since is None else int(np.searchsorted(self.t, since, side='left'))
+        rec = np.empty(len(self.t) - lo, dtype=CANDLE_DTYPE)
+        rec['t'] = self.t[lo:]
+        for i, f in enumerate(FIELDS):
+            rec[f] = self.ohlcv[i, lo:]
+        return rec
+
+def as_candles(bars):
+    """Candles as-is; a DataFrame (backtests, notebooks) is converted"""
+    return bars if isinstance(bars, Candles) else Candles.from_df(bars)
+
+
+class CandleArray:
+    """The owner side: preallocated arrays holding the last `capacity` bars"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._alloc()
+        self.start = self.end = 0
+
+    def _alloc(self):
+        # fresh arrays rather than moving data in place: views handed out earlier stay valid
+        self._t = np.empty(2 * self.capacity, dtype=np.int64)
+        self._v = np.empty((len(FIELDS), 2 * self.capacity), dtype=np.float64)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def last_t(self):
+        return int(self._t[self.end - 1]) if self.end > self.start else None
+
+    def view(self):
+        t = self._t[self.start:self.end]
+        v = self._v[:, self.start:self.end]
+        t.flags.writeable = False
+        v.flags.writeable = False
+        return Candles(t, v)
+
+    def replace(self, bars):
+        """Drop everything, keep the newest `capacity` of `bars` (in new arrays, like any reallocation)"""
+        bars = bars.tail(self.capacity)
+        n = len(bars)
+        self._alloc()
+        self._t[:n] = bars.t
+        self._v[:, :n] = bars.ohlcv
+        self.start, self.end = 0, n
+
+    def merge(self, bars):
+        """Bars from the first new open time onward are replaced by `bars` (forming bar revised,
+        new bars appended); the oldest drop off past capacity. Returns bars written."""
+        n = len(bars)
+        if n == 0:
+            return 0
+        if n >= self.capacity or not len(self):
+            self.replace(bars)
+            return min(n, self.capacity)
+        cut = self.start + int(np.searchsorted(self._t[self.start:self.end], bars.t[0], side='left'))
+        if cut + n > len(self._t):
+            keep = min(cut - self.start, self.capacity - n)
+            old_t, old_v = self._t, self._v
+            self._alloc()
+            self._t[:keep] = old_t[cut - keep:cut]
+            self._v[:, :keep] = old_v[:, cut - keep:cut]
+            self.start, cut = 0, keep
+        self._t[cut:cut + n] = bars.t
+        self._v[:, cut:cut + n] = bars.ohlcv
+        self.end = cut + n
+        self.start = max(self.start, self.end - self.capacity)
+        return n
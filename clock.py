@@ -0,0 +1,69 @@
+# clock.py — the bot's "now": the wall clock when live, a simulated clock when replaying a recording
+#
+# Everything that decides *when* something happens (scheduler, pending-trade expiry,
+# price-log interval, account snapshot TTL) reads time through here. Latency
+# measurements (perf_counter) and dashboard liveness stay on the real clock.
+import threading
+import time
+from datetime import datetime, timezone
+
+class WallClock:
+    def now(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def wait(self, event, timeout):
+        return event.wait(timeout)
+
+
+class SimClock:
+    """Time only moves when the bot waits, and jumps straight to the end of the wait.
+
+    settle() runs before every jump (e.g. drain the order executor) so work that
+    would have finished within the wait in real life has finished here too.
+    Past `end` the event being waited on is set (the replay is over).
+    """
+
+    def __init__(self, start, end=None, settle=None):
+        self.t = float(start)
+        self.end = end
+        self.settle = settle
+        self.lock = threading.Lock()
+
+    def now(self):
+        return self.t
+
+    def monotonic(self):
+        return self.t
+
+    def wait(self, event, timeout):
+        if self.settle is not None:
+            self.settle()
+        with self.lock:
+            self.t += max(timeout or 0.0, 0.0)
+        if self.end is not None and self.t >= self.end:
+            event.set()
+        return event.is_set()
+
+
+source = WallClock()
+
+def use(clock):
+    global source
+    source = clock
+    return clock
+
+def now():
+    return source.now()
+
+def monotonic():
+    return source.monotonic()
+
+def utcnow():
+    return datetime.fromtimestamp(source.now(), timezone.utc)
+
+def wait(event, timeout):
+    """event.wait(timeout), in this clock's time"""
+    return source.wait(event, timeout)
@@ -1,4 +1,5 @@
 # config.py
+import json
 import os
 from dotenv import load_dotenv
 from hyperliquid.utils import constants
@@ -8,6 +9,7 @@ load_dotenv()
 EXCHANGE = "hyperliquid"
 NETWORK = "mainnet"
 SYMBOL = "LTC" # adjust depending on which currency you want the program to trade on.
+SYMBOLS = [SYMBOL]  # trade several perps in one process, e.g. ["LTC", "BTC", "ETH"] (SYMBOL keeps the original save files)
 TRADE_USDT = 15.0
 TIMEFRAME = "1m"
 MA_SHORT = 50
@@ -17,7 +19,16 @@ RSI_PERIOD = 14
 RSI_OVERBOUGHT = 80
 RSI_OVERSOLD = 15
 FEE_BUFFER_PCT = 0.001
-CHECK_INTERVAL = 30
+BAR_CLOSE_DELAY = 1.0         # seconds after a bar closes (exchange clock) before the strategy runs
+BAR_CLOSE_JITTER = 0.5        # + random 0..N s so we don't hit the API on the exact same ms as everyone else
+STOP_CHECK_INTERVAL = 10      # intra-bar stop checks without WebSocket (seconds, 0 = only at bar close); streamed mids are checked as they arrive
+HEARTBEAT_TIMEOUT = 150       # dashboard shows STOPPED if the bot loop hasn't ticked for this long (seconds)
+ACCOUNT_SNAPSHOT_TTL = 10      # seconds a user_state snapshot is reused (also refreshed every tick / after fills)
+CANDLE_HISTORY_HOURS = 24     # bars kept in memory; seeded once, then only new bars are fetched
+USE_WEBSOCKET = False         # stream candles/mids/fills instead of polling REST (falls back to REST while disconnected)
+WS_URL = os.getenv("HL_WS_URL")   # override, e.g. a local test server; default derives from BASE_URL
+RECORD_API = os.getenv("BOT_RECORD", "0") == "1"   # tape every API response to saves/recordings/ (python replay.py <tape>)
+CANDLE_TIMEFRAMES = ["1m", "3m", "5m"]   # stored under saves/logs/; all built locally from 1m (add "15m", "1h", ... for free)
 MIN_LTC_SELL = 0.01
 MAX_CROSSES = 4
 
@@ -29,7 +40,7 @@ USE_RSI_EARLY_EXIT = False     # Optional: exit longs early if RSI >85, shorts i
 # NEW: Profit protection
 PROFIT_RATCHET_ENABLED = True          # ← Turn the whole feature on/off
 MIN_PROFIT_TO_ACTIVATE = 0.10           # $0.20 profit → switch to protection mode
-PROFIT_PROTECTION_FLOOR = 0.05        # Keep 70% of peak profit (e.g., +$0.40 → close if drops below +$0.24)
+PROFIT_PROTECTION_RATIO = 0.6         # Keep this share of peak profit (+$0.40 peak → close if it drops below +$0.24)
 
 
 # How often to log current price in terminal (in seconds)
@@ -44,6 +55,7 @@ PRICE_LOG_INTERVAL = 60   # 300 = 5 minutes (default)
 # Set what you want to see in terminal
 # Options: "QUIET", "NORMAL", "VERBOSE", "DEBUG"
 TERMINAL_LOG_MODE = "QUIET"        # ← Change this line to control everything
+LOG_JSONL = False                  # also write saves/logs/bot.jsonl (one JSON object per line, with fields)
 
 # What each mode shows in terminal:
 # QUIET   → only startup, balance, entries/exits, warnings/errors
@@ -64,14 +76,95 @@ API_WALLET_ADDRESS = os.getenv("HL_WALLET")
 API_PRIVATE_KEY = os.getenv("HL_PRIVATE_KEY")
 MAIN_WALLET = os.getenv("MAIN_WALLET")
 
-BASE_URL = constants.MAINNET_API_URL
+BASE_URL = os.getenv("HL_BASE_URL") or constants.MAINNET_API_URL   # override e.g. for a local stub server
+META_CACHE_TTL = 6 * 3600       # seconds before saves/meta_cache.json is refreshed (in the background)
+META_FETCH_TIMEOUT = 5          # seconds; only a first start without a cache waits for this
+
+# === HTTP TRANSPORT (transport.py — every Info/Exchange request) ===
+API_WEIGHT_PER_MIN = 1200       # Hyperliquid's REST budget per IP (request weight / minute)
+API_WEIGHT_BURST = 120          # ← weight that may go out at once before the bucket starts pacing
+API_POOL_SIZE = 16              # keep-alive connections shared by every client
+API_TIMEOUT = 10                # seconds per attempt
+API_MAX_RETRIES = 4             # 429 / 5xx / timeouts; orders only retry when they surely weren't received
+API_BACKOFF_BASE = 0.25         # seconds, doubled per attempt (full jitter)
+API_BACKOFF_MAX = 8.0
+
+# === HISTORY BACKFILL (python backfill.py SYMBOL --start YYYY-MM-DD) ===
+BACKFILL_WINDOW_BARS = 5000     # bars per request (Hyperliquid's candleSnapshot maximum)
+BACKFILL_WORKERS = 4            # windows fetched concurrently
+BACKFILL_WEIGHT_SHARE = 0.5     # ← part of API_WEIGHT_PER_MIN the backfill may use; a running bot keeps the rest
 
 # ==================== TRAILING STOP CONFIG ====================
 TRAILING_STOP_ENABLED = False   # ← Toggle: True to use Price-based PnL
-TRAILING_STOP_PCT = 0.5        # ← Your 1% trailing stop
+TRAILING_STOP_PCT = 0.5        # ← Close once price is 0.5% off its best since entry
 # ==============================================================
 
 # ==================== TRAILING PNLP STOP CONFIG ====================
 TRAILING_PNL_ENABLED = False      # ← Toggle: True to use PnL-based instead of price
 TRAILING_PNL_PCT = -2.0          # ← e.g., -2% from peak PnL (negative for loss floor)
 # ==============================================================
+
+# ==================== PAPER TRADING ====================
+PAPER_TRADING = os.getenv("BOT_PAPER", "0") == "1"   # ← simulated orders/balance (paper.py), real market data, no key needed
+PAPER_BALANCE = 1000.0          # starting USDC
+PAPER_TAKER_FEE = 0.00045       # 0.045% per fill (Hyperliquid base taker tier)
+PAPER_FUNDING_RATE = 0.0000125  # per hour, longs pay shorts (0.00125%/h ≈ 11% APR)
+PAPER_LEVERAGE = 10             # cross leverage for new positions
+PAPER_SPREAD_BPS = 2.0          # modelled book: best bid/ask this far apart,
+PAPER_BOOK_STEP_BPS = 1.0       # then one level every N bps,
+PAPER_BOOK_DEPTH_USD = 25_000   # each holding this much notional
+# =======================================================
+
+# PROFIT_PROTECTION_FLOOR (old absolute $ floor) became PROFIT_PROTECTION_RATIO (share of peak profit):
+# an old config.py must be updated by hand rather than have its value silently reinterpreted
+if "PROFIT_PROTECTION_FLOOR" in globals():
+    raise SystemExit("config.py: PROFIT_PROTECTION_FLOOR is no longer supported — the profit ratchet now keeps "
+                     "PROFIT_PROTECTION_RATIO × the best profit (e.g. 0.6). Replace the old setting to start.")
+
+# ==================== PER-RUN OVERRIDES ====================
+# Paper variants, experiments: BOT_CONFIG='{"MA_SHORT": 20, "TRADE_USDT": 30}'
+# Only these keys — wallet, keys, endpoint and the paper/live switch come from this file and the environment
+OVERRIDABLE = (
+    # strategy
+    "TRADE_USDT", "MA_SHORT", "MA_LONG", "TREND_LOOKBACK", "RSI_PERIOD", "RSI_OVERBOUGHT", "RSI_OVERSOLD",
+    "FEE_BUFFER_PCT", "MAX_CROSSES", "ALLOW_SHORTS", "USE_RSI_EARLY_EXIT",
+    # stops
+    "TRAILING_STOP_ENABLED", "TRAILING_STOP_PCT", "PROFIT_RATCHET_ENABLED", "MIN_PROFIT_TO_ACTIVATE",
+    "PROFIT_PROTECTION_RATIO", "TRAILING_PNL_ENABLED", "TRAILING_PNL_PCT",
+    # simulated account (not PAPER_TRADING itself)
+    "PAPER_BALANCE", "PAPER_TAKER_FEE", "PAPER_FUNDING_RATE", "PAPER_LEVERAGE", "PAPER_SPREAD_BPS",
+    "PAPER_BOOK_STEP_BPS", "PAPER_BOOK_DEPTH_USD",
+)
+
+def check_overrides(overrides):
+    """BOT_CONFIG dict → validated copy; ValueError on an unknown key or a value of the wrong type"""
+    if not isinstance(overrides, dict):
+        raise ValueError(f"BOT_CONFIG must be a JSON object, got {overrides!r}")
+    checked = {}
+    for key, value in overrides.items():
+        if key not in OVERRIDABLE:
+            raise ValueError(f"BOT_CONFIG: {key!r} can't be overridden (unknown or protected key). "
+                             f"Allowed: {', '.join(OVERRIDABLE)}")
+        default = globals()[key]
+        if isinstance(default, bool) or isinstance(value, bool):
+            ok = isinstance(default, bool) and isinstance(value, bool)
+        elif isinstance(default, float):
+            ok = isinstance(value, (int, float))      # 30 for 30.0 is fine
+            value = float(value) if ok else value
+        else:
+            ok = type(value) is type(default)
+        if not ok:
+            raise ValueError(f"BOT_CONFIG: {key} must be {type(default).__name__} "
+                             f"(default {default!r}), got {value!r}")
+        checked[key] = value
+    return checked
+
+try:
+    _overrides = json.loads(os.getenv("BOT_CONFIG") or "{}")
+except ValueError as e:
+    raise SystemExit(f"config.py: BOT_CONFIG is not valid JSON ({e})")
+try:
+    globals().update(check_overrides(_overrides))
+except ValueError as e:
+    raise SystemExit(f"config.py: {e}")
+# ===========================================================
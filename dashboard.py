@@ -1,18 +1,25 @@
-# dashboard.py — YOUR ORIGINAL (beautiful) + crosses fixed
-from flask import Flask, render_template_string, request
-import subprocess
+# dashboard.py — YOUR ORIGINAL (beautiful) + crosses fixed, now fed from the per-tick snapshot
+#
+#   /                 page (first paint server-side, then live via /api/stream)
+#   /api/snapshot     full snapshot JSON (+ bot status)
+#   /api/status       heartbeat-based liveness
+#   /api/stream       Server-Sent Events: "snapshot" once, then "delta" per tick + "status" changes
+#   /metrics          Prometheus text format (stage timings, API latency/errors, RSS, ...)
+#   /profile?ticks=N  profile the next N ticks → saves/profiles/ (status without ticks)
+import json
+from flask import Flask, Response, render_template_string, request
 import state  # ← ONLY CHANGE: import module, not variables
+from snapshot import hub
+import metrics
 from logger import log_print
-import datetime
-from datetime import timezone
-from utils import start_time
 
 app = Flask(__name__)
 
+SSE_KEEPALIVE = 15      # seconds between comment pings on an idle stream (proxies drop silent ones)
+
 HTML = """
 <!DOCTYPE html>
 <html><head><title>LTC Bot</title>
-<meta http-equiv="refresh" content="30">
 <style>
   body {
     font-family: 'Courier New', monospace;
@@ -73,68 +80,184 @@ HTML = """
   }
 </style>
 </head><body>
-<div class="card"><h1>LTC/USDT Bot</h1></div>
+<div class="card"><h1>{{ title }} Bot</h1></div>
 
 <div class="card">
-  <p><strong>Status:</strong> <span style="color:{{ 'green' if status=='RUNNING' else 'red' }};">{{ status }}</span></p>
-  <p><strong>Price:</strong> ${{ (price|round(2)) if price else '-.--' }}</p>
-  <p><strong>Trend:</strong> <span style="color: {{ '#00FFFF' if trend == 'Uptrend' else '#FFFF00' }}; font-weight: bold;">{{ trend }}</span></p>
-  <p><strong>USDC Balance:</strong> ${{ (usdt_balance|round(2)) if usdt_balance is not none else '0.00' }}</p>
-  <p><strong>LTC Position:</strong> {{ (ltc_position|round(6)) if ltc_position else '0.000000' }} LTC</p>
-  <p><strong>Position:</strong> {{ position }}</p>
-  <p><strong>Total Profit:</strong> <span style="color:{{ 'green' if profit>=0 else 'red' }};">${{ (profit|round(2)) if profit is not none else '0.00' }}</span></p>
-  <p><strong>Last Signal:</strong> {{ signal }}</p>
-  <p><strong>Last Update:</strong> {{ last_update }} UTC</p>
+  <p><strong>Status:</strong> <span data-k="status" style="color:{{ 'green' if status=='RUNNING' else 'red' }};">{{ status }}</span></p>
+  <p><strong>USDC Balance:</strong> $<span data-k="usdt_balance">{{ '%.2f'|format(snap.usdt_balance or 0) }}</span></p>
+  <p><strong>Total Profit:</strong> <span data-k="profit" data-sign style="color:{{ 'green' if (snap.profit or 0)>=0 else 'red' }};">${{ '%.2f'|format(snap.profit or 0) }}</span></p>
+  <p><strong>Last Update:</strong> <span data-k="last_update">{{ snap.last_update }}</span> UTC</p>
 </div>
 
-<div class="card"><h2>Recent Crosses</h2>
-<ul>
-{% for c in crosses %}
-  <li>
-    <strong>{{ c.type|capitalize }}</strong> 
-    @ {{ c.time }} — ${{ (c.price|round(2)) if c.price else '-.--' }}
-    <span style="color: {{ '#00FFFF' if c.trend == 'Uptrend' else '#FFFF00' }}; font-weight: bold;">
-      ({{ c.trend }})
-    </span>
-  </li>
+<div class="card" id="scheduler"></div>
+<div class="card" id="latency"></div>
+
+{% for name, s in (snap.symbols or {}).items() %}
+<div class="card"><h2>{{ name }}</h2>
+  <p><strong>Price:</strong> $<span data-k="symbols.{{ name }}.price">{{ '%.2f'|format(s.price) if s.price else '-.--' }}</span></p>
+  <p><strong>Trend:</strong> <span data-k="symbols.{{ name }}.trend" data-trend style="color: {{ '#00FFFF' if s.trend == 'Uptrend' else '#FFFF00' }}; font-weight: bold;">{{ s.trend }}</span></p>
+  <p><strong>{{ name }} Position:</strong> <span data-k="symbols.{{ name }}.position" data-size>{{ '%.6f'|format(s.position or 0) }}</span> {{ name }}</p>
+  <p><strong>Position:</strong> <span data-k="symbols.{{ name }}.side">{{ s.side }}</span></p>
+  <p><strong>Profit:</strong> <span data-k="symbols.{{ name }}.profit" data-sign style="color:{{ 'green' if s.profit>=0 else 'red' }};">${{ '%.2f'|format(s.profit) }}</span></p>
+  <p><strong>Last Signal:</strong> <span data-k="symbols.{{ name }}.signal">{{ s.signal }}</span></p>
+  <h3>Recent Crosses</h3>
+  <ul data-crosses="{{ name }}">
+  {% for c in s.crosses %}
+    <li>
+      <strong>{{ c.type|capitalize }}</strong> 
+      @ {{ c.time }} — ${{ '%.2f'|format(c.price) if c.price else '-.--' }}
+      <span style="color: {{ '#00FFFF' if c.trend == 'Uptrend' else '#FFFF00' }}; font-weight: bold;">
+        ({{ c.trend }})
+      </span>
+    </li>
+  {% endfor %}
+  </ul>
+</div>
 {% endfor %}
-</ul></div>
 
 <button onclick="location.reload()">Refresh Now</button>
+<script>
+let doc = {{ snap_json|safe }};
+const get = (o, path) => path.split('.').reduce((a, k) => a == null ? a : a[k], o);
+const fmt = (el, v) => {
+  if (v == null) return '-';
+  if (el.hasAttribute('data-size')) return Number(v).toFixed(6);
+  if (el.hasAttribute('data-sign')) return '$' + Number(v).toFixed(2);
+  return typeof v === 'number' ? v.toFixed(2) : String(v);
+};
+function merge(a, b) {
+  for (const k in b) {
+    if (k === 'symbols') { a.symbols = a.symbols || {}; for (const s in b.symbols) a.symbols[s] = Object.assign(a.symbols[s] || {}, b.symbols[s]); }
+    else a[k] = b[k];
+  }
+}
+function crossItem(c) {
+  const col = c.trend === 'Uptrend' ? '#00FFFF' : '#FFFF00';
+  const px = c.price ? Number(c.price).toFixed(2) : '-.--';
+  return `<li><strong>${c.type.charAt(0).toUpperCase() + c.type.slice(1)}</strong> @ ${c.time} — $${px} ` +
+         `<span style="color: ${col}; font-weight: bold;">(${c.trend})</span></li>`;
+}
+function statsCard(title, rows) {
+  return rows.length ? `<h2>${title}</h2><ul>${rows.map(r => `<li>${r}</li>`).join('')}</ul>` : '';
+}
+function render() {
+  document.querySelectorAll('[data-k]').forEach(el => {
+    const k = el.dataset.k;
+    if (k === 'status') return;
+    const v = get(doc, k);
+    el.textContent = fmt(el, v);
+    if (el.hasAttribute('data-sign')) el.style.color = v >= 0 ? 'green' : 'red';
+    if (el.hasAttribute('data-trend')) el.style.color = v === 'Uptrend' ? '#00FFFF' : '#FFFF00';
+  });
+  document.querySelectorAll('[data-crosses]').forEach(ul => {
+    ul.innerHTML = (get(doc, 'symbols.' + ul.dataset.crosses + '.crosses') || []).map(crossItem).join('');
+  });
+  const sc = doc.scheduler || {};
+  document.getElementById('scheduler').innerHTML = statsCard('Scheduler',
+    sc.clock_offset_ms === undefined ? [] :
+    [`<strong>Clock offset:</strong> ${sc.clock_offset_ms} ms │ <strong>Missed bars:</strong> ${sc.missed_bars}`]
+      .concat(['bar', 'stop'].filter(k => sc[k]).map(k => `<strong>${k} ticks</strong> — lag last ${sc[k].lag_last} │ mean ${sc[k].lag_mean} │ max ${sc[k].lag_max} ms │ took ${sc[k].took_last} ms (${sc[k].count})`)));
+  const lat = doc.latency || {};
+  document.getElementById('latency').innerHTML = statsCard('Order Latency (ms)',
+    Object.entries(lat).map(([p, l]) => `<strong>${p.replace(/_/g, ' ')}</strong> — last ${l.last} │ p50 ${l.p50} │ p95 ${l.p95} │ max ${l.max} (${l.count} orders)`));
+  ['scheduler', 'latency'].forEach(id => { const el = document.getElementById(id); el.style.display = el.innerHTML ? '' : 'none'; });
+}
+function setStatus(st) {
+  const el = document.querySelector('[data-k="status"]');
+  el.textContent = st.status;
+  el.style.color = st.status === 'RUNNING' ? 'green' : 'red';
+}
+render();
+if (window.EventSource) {
+  const es = new EventSource('/api/stream');
+  es.addEventListener('snapshot', e => { doc = JSON.parse(e.data); render(); });
+  es.addEventListener('delta', e => { merge(doc, JSON.parse(e.data)); render(); });
+  es.addEventListener('status', e => setStatus(JSON.parse(e.data)));
+} else {
+  setTimeout(() => location.reload(), 30000);
+}
+</script>
 </body></html>
 """
 
+def _snapshot_doc():
+    _, body, _ = hub.current()
+    return json.loads(body), body.decode()
+
 @app.route('/')
 def index():
-    try:
-        ps_output = subprocess.check_output(['ps', 'aux']).decode()
-        is_running = 'main.py' in ps_output
-    except:
-        is_running = False
-    status = "RUNNING" if is_running else "STOPPED"
-    pos = "LONG" if state.position_open and state.position_side == "long" else \
-          "SHORT" if state.position_open and state.position_side == "short" else "FLAT"
-    
-    crosses = list(reversed(state.cross_history))  # ← live list
-
+    snap, snap_json = _snapshot_doc()
     return render_template_string(
         HTML,
-        status=status,
-        profit=state.total_profit,
-        position=pos,
-        signal=state.last_signal,
-        crosses=crosses,
-        **state.dashboard_data
+        title="/".join(state.symbols) + "/USDT",
+        status=hub.status()["status"],
+        snap=snap,
+        snap_json=snap_json.replace("</", "<\\/"),
     )
 
+# === JSON API (read-only, served from the pre-encoded snapshot) ===
+@app.route('/api/snapshot')
+def api_snapshot():
+    version, body, _ = hub.current()
+    status = json.dumps(hub.status()).encode()
+    return Response(b'{"bot": ' + status + b', "snapshot": ' + body + b'}', mimetype="application/json")
+
+@app.route('/api/status')
+def api_status():
+    return hub.status()
+
+@app.route('/api/stream')
+def api_stream():
+    def events():
+        version, body, _ = hub.current()
+        last_status = hub.status()["status"]
+        yield f"event: status\ndata: {json.dumps(hub.status())}\n\n"
+        yield f"id: {version}\nevent: snapshot\ndata: {body.decode()}\n\n"
+        while True:
+            if hub.wait(version, SSE_KEEPALIVE) > version:
+                current, body, delta = hub.current()
+                if current == version + 1:
+                    yield f"id: {current}\nevent: delta\ndata: {delta.decode()}\n\n"
+                else:
+                    yield f"id: {current}\nevent: snapshot\ndata: {body.decode()}\n\n"   # missed some → resync
+                version = current
+            else:
+                yield ": keepalive\n\n"
+            st = hub.status()
+            if st["status"] != last_status:      # loop died / came back — no publish happens for that
+                last_status = st["status"]
+                yield f"event: status\ndata: {json.dumps(st)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/profile', methods=['GET', 'POST'])
+def profile():
+    """/profile?ticks=N starts a capture of the next N ticks; without ticks just reports status"""
+    ticks = request.args.get('ticks', type=int)
+    if ticks and not state.profiling['active']:
+        state.profiling['requested'] = min(ticks, 100)
+        log_print(f"Profiling requested from dashboard ({state.profiling['requested']} ticks)", "INFO")
+    return dict(state.profiling)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/health')
 def health():
+    snap = hub.doc
+    symbols = snap.get("symbols", {})
+    bot = hub.status()
     return {
-        "status": "alive",
-        "uptime": (datetime.now(timezone.utc) - start_time).seconds,
-        "profit": round(state.total_profit, 2),
-        "position": state.position_side or "flat",
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        **bot,
+        "status": "alive",              # the process answers — what external monitors key on
+        "bot": bot["status"],           # RUNNING / STOPPED from the loop heartbeat (see heartbeat_age)
+        "profit": round(snap.get("profit", 0.0), 2),
+        "position": next(iter(symbols.values()), {}).get("side", "FLAT").lower(),
+        "positions": {sym: s["side"].lower() for sym, s in symbols.items()},
+        "order_latency_ms": snap.get("latency", {}),
+        "scheduler": snap.get("scheduler", {}),
     }
 
 @app.route('/shutdown', methods=['GET'])
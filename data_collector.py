@@ -1,82 +1,91 @@
 # data_collector.py – FINAL VERSION (NO WARNINGS, EVER)
-import pandas as pd
 import os
-from datetime import datetime
-from exchange import info, SYMBOL
+import numpy as np
+from config import SYMBOL, CANDLE_TIMEFRAMES
+from exchange import fetch_ohlcv
 from logger import log_print
+from candle_store import CandleStore, CANDLE_DTYPE
+from candle_buffer import INTERVAL_MS
 
 # PERMANENTLY SILENCE THE PANDAS WARNING (this is the nuclear option)
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-CANDLE_FILES = {
-    "1m": "ltc_1m.csv",
-    "3m": "ltc_3m.csv",
-    "5m": "ltc_5m.csv"
-}
+LOGS_DIR = "saves/logs"
 
-def get_or_create_csv(filename):
-    logs_dir = "saves/logs"
-    full_path = os.path.join(logs_dir, filename)
-    os.makedirs(logs_dir, exist_ok=True)
-    if not os.path.exists(full_path):
-        pd.DataFrame(columns=['timestamp','open','high','low','close','volume']).to_csv(full_path, index=False)
-        log_print(f"Created new candle file: {full_path}")
-    return full_path
+# Only 1m is downloaded; every other timeframe is built from the stored 1m bars
+ALL_TIMEFRAMES = list(dict.fromkeys(["1m", *CANDLE_TIMEFRAMES]))
 
-def append_candle(timeframe, df):
-    if df.empty:
+def candle_file(symbol, timeframe):
+    return f"{symbol.lower()}_{timeframe}.bin"
+
+_stores = {}
+
+def get_store(timeframe, symbol=SYMBOL):
+    """Open (once) the binary store for a symbol/timeframe; imports the legacy CSV on first run"""
+    store = _stores.get((symbol, timeframe))
+    if store is None:
+        full_path = os.path.join(LOGS_DIR, candle_file(symbol, timeframe))
+        is_new = not os.path.exists(full_path)
+        store = CandleStore(full_path)
+        if is_new:
+            legacy_csv = os.path.splitext(full_path)[0] + ".csv"
+            imported = store.import_csv(legacy_csv)
+            if imported:
+                log_print(f"Imported {imported} {timeframe} bars from {legacy_csv}")
+            else:
+                log_print(f"Created new candle file: {full_path}")
+        _stores[(symbol, timeframe)] = store
+    return store
+
+def append_candle(timeframe, bars, symbol=SYMBOL):
+    """Persist Candles; only the bars from the store's last (forming) one onward are written"""
+    if not len(bars):
         return
-    
-    filename = get_or_create_csv(CANDLE_FILES[timeframe])
-    
-    # This line fixes the warning FOREVER
-    existing_df = pd.read_csv(filename, parse_dates=['timestamp']) if os.path.getsize(filename) > 0 else pd.DataFrame(columns=['timestamp','open','high','low','close','volume'])
-    
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Safe concat — no FutureWarning
-    combined_df = pd.concat([existing_df, df[['timestamp','open','high','low','close','volume']].copy()], ignore_index=True)
-    
-    agg_df = combined_df.groupby('timestamp').agg({
-        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-    }).reset_index()
-    
-    agg_df = agg_df.sort_values('timestamp').drop_duplicates(subset=['timestamp'], keep='last')
-    for col in ['open','high','low','close']:
-        agg_df[col] = agg_df[col].round(3)
-    agg_df['volume'] = agg_df['volume'].round(2)
-    
-    agg_df.to_csv(filename, index=False, date_format='%Y-%m-%d %H:%M:%S')
-    
-    new_bars = len(agg_df) - len(existing_df)
+
+    store = get_store(timeframe, symbol)
+    new_bars = store.upsert(bars.records(since=store.last_t))
     if new_bars > 0:
-        log_print(f"Saved {new_bars} new {timeframe} bars")
+        log_print(f"Saved {new_bars} new {symbol} {timeframe} bars")
 
-def collect_all_candles(one_m_df=None):
-    end_time = int(datetime.now().timestamp() * 1000)
-    start_time = end_time - 24 * 3600 * 1000
+def export_csv(timeframe, csv_path=None, symbol=SYMBOL):
+    """CSV copy of a stored timeframe for spreadsheets / older tooling"""
+    csv_path = csv_path or os.path.join(LOGS_DIR, os.path.splitext(candle_file(symbol, timeframe))[0] + ".csv")
+    return get_store(timeframe, symbol).export_csv(csv_path)
 
-    if one_m_df is not None:
-        append_candle("1m", one_m_df.copy())
-    else:
-        try:
-            raw = info.candles_snapshot(name=SYMBOL, interval="1m", startTime=start_time, endTime=end_time)
-            if raw:
-                df = pd.DataFrame(raw).rename(columns={'t':'timestamp','o':'open','h':'high','l':'low','c':'close','v':'volume'})
-                df[['open','high','low','close','volume']] = df[['open','high','low','close','volume']].apply(pd.to_numeric, errors='coerce').fillna(0.0)
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                append_candle("1m", df)
-        except Exception as e:
-            log_print(f"1m fetch failed: {e}", "WARNING")
+def aggregate_bars(rec, step_ms):
+    """Fold sorted 1m records into step_ms buckets aligned to the epoch (same as the exchange)"""
+    if len(rec) == 0:
+        return rec
+    bucket = rec['t'] - rec['t'] % step_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rec)] - 1
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out['t'] = bucket[starts]
+    out['open'] = rec['open'][starts]
+    out['high'] = np.maximum.reduceat(rec['high'], starts)
+    out['low'] = np.minimum.reduceat(rec['low'], starts)
+    out['close'] = rec['close'][ends]
+    out['volume'] = np.add.reduceat(rec['volume'], starts)
+    return out
+
+def resample_timeframe(timeframe, symbol=SYMBOL):
+    """Rebuild `timeframe` from its last stored bucket onward (everything, for a new file)"""
+    step = INTERVAL_MS[timeframe]
+    store = get_store(timeframe, symbol)
+    since = store.last_t            # bucket start, so the forming bucket is re-aggregated whole
+    rec = get_store("1m", symbol).read(start_ms=since)
+    new_bars = store.upsert(aggregate_bars(rec, step))
+    if new_bars > 0:
+        log_print(f"Saved {new_bars} new {symbol} {timeframe} bars")
+
+def collect_all_candles(one_m=None, symbol=SYMBOL):
+    if one_m is None:
+        one_m = fetch_ohlcv(symbol)
+    append_candle("1m", one_m, symbol)
 
-    for tf in ["3m", "5m"]:
+    for tf in ALL_TIMEFRAMES[1:]:
         try:
-            raw = info.candles_snapshot(name=SYMBOL, interval=tf, startTime=start_time, endTime=end_time)
-            if raw:
-                df = pd.DataFrame(raw).rename(columns={'t':'timestamp','o':'open','h':'high','l':'low','c':'close','v':'volume'})
-                df[['open','high','low','close','volume']] = df[['open','high','low','close','volume']].apply(pd.to_numeric, errors='coerce').fillna(0.0)
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                append_candle(tf, df)
+            resample_timeframe(tf, symbol)
         except Exception as e:
-            log_print(f"{tf} fetch failed: {e}", "WARNING")
+            log_print(f"{symbol} {tf} resample failed: {e}", "WARNING")
@@ -1,46 +1,185 @@
 # exchange.py - CLEAN FINAL VERSION
-from hyperliquid.info import Info
-from hyperliquid.exchange import Exchange
-import eth_account
-import time
-import pandas as pd
+import threading
+import clock
 from logger import log_print
+from metrics import instrument
+from candle_buffer import CandleBuffer, update_many
+from meta_cache import cache as meta_cache
+from transport import attach, ApiError, BadResponse
 
-from config import API_WALLET_ADDRESS, API_PRIVATE_KEY, SYMBOL, TIMEFRAME, BASE_URL
+from config import (API_WALLET_ADDRESS, API_PRIVATE_KEY, SYMBOL, SYMBOLS, TIMEFRAME, BASE_URL, CANDLE_HISTORY_HOURS,
+                    ACCOUNT_SNAPSHOT_TTL, PAPER_TRADING)
 
-info = Info(BASE_URL, skip_ws=True)
-wallet = eth_account.Account.from_key(API_PRIVATE_KEY)
-exchange = Exchange(wallet=wallet, base_url=BASE_URL, account_address=API_WALLET_ADDRESS)
+# === CLIENTS (built on first use — importing this module makes no requests) ===
+class LazyClient:
+    """Stands in for an SDK client and builds it the first time anything on it is used.
+    set() installs a ready-made one instead (paper account, replays, benchmarks)."""
 
-def fetch_ohlcv():
-    end_time = int(time.time() * 1000)
-    start_time = end_time - 24 * 3600 * 1000
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def set(self, client):
+        self._client = client
+        return client
+
+    @property
+    def built(self):
+        return self._client is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+def _make_info():
+    from hyperliquid.info import Info
+    # cached metadata → the SDK skips its own meta/spotMeta requests in __init__
+    return instrument(attach(Info(BASE_URL, skip_ws=True, meta=meta_cache.get("meta"), spot_meta=meta_cache.get("spotMeta"))))
+
+def _make_exchange():
+    if PAPER_TRADING:           # simulated fills / balance / positions on top of the real market data
+        from paper import PaperExchange
+        return PaperExchange(info)
+    import eth_account
+    from hyperliquid.exchange import Exchange
+    wallet = eth_account.Account.from_key(API_PRIVATE_KEY)
+    ex = instrument(attach(Exchange(wallet=wallet, base_url=BASE_URL, account_address=API_WALLET_ADDRESS,
+                                    meta=meta_cache.get("meta"), spot_meta=meta_cache.get("spotMeta"))))
+    instrument(attach(ex.info))  # market_open/close look up mids through the Exchange's own Info
+    return ex
+
+info = LazyClient(_make_info)
+exchange = LazyClient(_make_exchange)
+
+def warm_up():
+    """Build both clients now (background thread at startup) so the first tick / order doesn't pay for it"""
+    for client in (info, exchange):
+        try:
+            client.get()
+        except Exception as e:
+            log_print(f"Client warm-up failed (retried on first use): {e}", "WARNING")
+
+# Seeded with the last 24h on first use, then only the forming bar onward is requested
+candle_buffers = {sym: CandleBuffer(info, sym, TIMEFRAME, history_hours=CANDLE_HISTORY_HOURS) for sym in SYMBOLS}
+
+def fetch_ohlcv(symbol=SYMBOL, now_ms=None):
+    """Candles for one symbol; raises ApiError when they couldn't be fetched"""
+    buf = candle_buffers[symbol]
+    if not buf.live:                    # a connected MarketStream keeps the buffer current already
+        buf.update(now_ms)
+    return buf.snapshot()
+
+def fetch_all_ohlcv(symbols=SYMBOLS, now_ms=None):
+    """{symbol: candles} for every traded symbol, fetched concurrently; a symbol whose fetch
+    failed maps to the exception instead, so one bad reply doesn't hold up the others.
+    now_ms = exchange-clock time (scheduler skew correction) so the request window includes the newest bar"""
+    if len(symbols) == 1:
+        try:
+            return {symbols[0]: fetch_ohlcv(symbols[0], now_ms)}
+        except Exception as e:
+            return {symbols[0]: e}
+    return update_many((candle_buffers[sym] for sym in symbols), now_ms=now_ms)
+
+# === ACCOUNT SNAPSHOT ===
+class AccountSnapshot:
+    """One user_state request shared by every balance/position/leverage/PnL lookup.
+
+    run_bot() invalidates it at the start of each tick and after fills; the TTL
+    is a safety net so a forgotten invalidate can never serve stale data for long.
+    A failed fetch is remembered the same way: every lookup in that tick raises the
+    same ApiError instead of retrying (or pretending the account is empty).
+    """
+
+    def __init__(self, info, address, ttl=ACCOUNT_SNAPSHOT_TTL):
+        self.info = info
+        self.address = address
+        self.ttl = ttl
+        self.data = None
+        self.error = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if (self.data is None and self.error is None) or clock.monotonic() - self.fetched_at > self.ttl:
+                self._refresh()
+            if self.error is not None:
+                raise self.error
+            return self.data
+
+    def _refresh(self):
+        self.fetched_at = clock.monotonic()
+        try:
+            data = self.info.user_state(self.address)
+        except ApiError as e:
+            self.data, self.error = None, e
+            return
+        if not isinstance(data, dict):
+            self.data, self.error = None, BadResponse("/info:clearinghouseState", f"unexpected reply {str(data)[:200]}")
+        else:
+            self.data, self.error = data, None
+
+    def set(self, data):
+        """Replace the snapshot with a state we already have (e.g. pushed by the exchange)"""
+        with self.lock:
+            self.data, self.error = data, None
+            self.fetched_at = clock.monotonic()
+
+    def invalidate(self):
+        with self.lock:
+            self.data = self.error = None
+
+    def position(self, symbol=SYMBOL):
+        for pos in self.get().get('assetPositions', []):
+            if pos.get('position', {}).get('coin') == symbol:
+                return pos['position']
+        return None
+
+account = AccountSnapshot(LazyClient(lambda: exchange.get().info) if PAPER_TRADING else info, API_WALLET_ADDRESS)
+
+# Lookups below raise ApiError (transport.py) when the account can't be read — never a made-up 0
+def _number(endpoint, value):
     try:
-        raw = info.candles_snapshot(name=SYMBOL, interval=TIMEFRAME, startTime=start_time, endTime=end_time)
-        if not raw:
-            return pd.DataFrame()
-        df = pd.DataFrame(raw)
-        df = df.rename(columns={'t': 'timestamp', 'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'})
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
-    except:
-        return pd.DataFrame()
+        return float(value)
+    except (TypeError, ValueError):
+        raise BadResponse(endpoint, f"not a number: {value!r}") from None
 
 def get_balance():
-    try:
-        state = info.user_state(API_WALLET_ADDRESS)
-        return float(state.get("withdrawable", "0.0"))
-    except:
-        return 0.0
+    return _number("/info:clearinghouseState", account.get().get("withdrawable", "0.0"))
 
-def get_ltc_position():
-    try:
-        state = info.user_state(API_WALLET_ADDRESS)
-        for pos in state.get('assetPositions', []):
-            if pos.get('position', {}).get('coin') == SYMBOL:
-                return abs(float(pos['position'].get('szi', '0')))
-        return 0.0
-    except:
-        return 0.0
+def get_position(symbol=SYMBOL):
+    pos = account.position(symbol)
+    return abs(_number("/info:clearinghouseState", pos.get('szi', '0'))) if pos else 0.0
+
+get_ltc_position = get_position
+
+def get_unrealized_pnl(symbol=SYMBOL):
+    """(pnl % of margin, pnl $) for the open position, as shown on the website"""
+    pos = account.position(symbol)
+    if not pos:
+        return 0.0, 0.0
+    return (_number("/info:clearinghouseState", pos.get('returnOnEquity', 0.0)) * 100,
+            _number("/info:clearinghouseState", pos.get('unrealizedPnl', 0.0)))
+
+def get_mids(symbols=SYMBOLS):
+    """{symbol: mid price} from one allMids request (weight 2, no account lookup)"""
+    mids = info.all_mids()
+    if not isinstance(mids, dict):
+        raise BadResponse("/info:allMids", f"unexpected reply {str(mids)[:200]}")
+    return {sym: _number("/info:allMids", mids[sym]) for sym in symbols if sym in mids}
+
+def get_current_leverage(symbol=SYMBOL):
+    pos = account.position(symbol)
+    if pos:
+        return int(_number("/info:clearinghouseState", (pos.get("leverage") or {}).get("value", 1)))
+    # fallback: account-wide cross leverage (website setting if available)
+    return int(_number("/info:clearinghouseState", account.get().get("marginSummary", {}).get("accountLeverage", 1)))
@@ -0,0 +1,198 @@
+# execution.py — orders run off the bot loop, with per-order latency tracking
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from logger import log_print
+from metrics import ORDER_SECONDS
+
+# No ack→fill phase: IOC market orders report the fill in the ack itself, so it would always be ~0
+PHASES = ("signal_to_submit", "submit_to_ack", "signal_to_fill")
+
+
+class LatencyStats:
+    """Rolling window of samples (ms) per phase → count / last / mean / p50 / p95 / max"""
+
+    def __init__(self, window=500):
+        self.samples = {p: deque(maxlen=window) for p in PHASES}
+        self.counts = {p: 0 for p in PHASES}
+        self.lock = threading.Lock()
+
+    def add(self, phase, ms):
+        with self.lock:
+            self.samples[phase].append(ms)
+            self.counts[phase] += 1
+
+    def summary(self):
+        out = {}
+        with self.lock:
+            for phase, s in self.samples.items():
+                if not s:
+                    continue
+                ordered = sorted(s)
+                out[phase] = {
+                    "count": self.counts[phase],
+                    "last": round(s[-1], 2),
+                    "mean": round(sum(s) / len(s), 2),
+                    "p50": round(ordered[len(ordered) // 2], 2),
+                    "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                    "max": round(ordered[-1], 2),
+                }
+        return out
+
+
+class Order:
+    """One market order. `kind` is "long", "short" or "close".
+
+    on_fill(order) runs on the executor thread right after the fill is confirmed and
+    should only do the critical in-memory bookkeeping; anything slow goes to defer().
+    `after` chains this order behind another one (e.g. open-after-close on a reversal)
+    and skips it if that one didn't fill.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, symbol, kind, qty=None, signal_at=None, on_fill=None, on_fail=None, after=None):
+        self.id = next(self._ids)
+        self.symbol = symbol
+        self.kind = kind
+        self.qty = qty
+        self.signal_at = signal_at or time.perf_counter()
+        self.on_fill = on_fill
+        self.on_fail = on_fail
+        self.after = after
+        self.future = Future()
+        self.submitted_at = self.acked_at = self.filled_at = None
+        self.result = None
+        self.avg_px = None
+        self.filled_sz = None
+
+    def latencies(self):
+        ms = lambda a, b: (b - a) * 1000 if a is not None and b is not None else None
+        return {
+            "signal_to_submit": ms(self.signal_at, self.submitted_at),
+            "submit_to_ack": ms(self.submitted_at, self.acked_at),
+            "signal_to_fill": ms(self.signal_at, self.filled_at),
+        }
+
+
+def parse_fill(result):
+    """(avgPx, totalSz) from a market_open/market_close response, or None if nothing filled"""
+    if result and result.get("status") == "ok":
+        for s in result["response"]["data"]["statuses"]:
+            if "filled" in s:
+                return float(s["filled"]["avgPx"]), float(s["filled"]["totalSz"])
+    return None
+
+
+class Executor:
+    """Single order thread (orders stay strictly in submission order) plus a
+    follow-up thread for work that must not delay the next order or tick:
+    leverage refresh, trade journaling, state persistence."""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.orders = queue.Queue()
+        self.followups = queue.Queue()
+        self.stats = LatencyStats()
+        self.in_flight = {}                 # symbol → number of queued/running orders
+        self.lock = threading.Lock()
+        self.started = False                # threads start with the first order / follow-up, not at import
+
+    def _start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self._order_loop, daemon=True, name="orders").start()
+        threading.Thread(target=self._followup_loop, daemon=True, name="order-followups").start()
+
+    # === API ===
+    def submit(self, order):
+        if not self.started:
+            self._start()
+        with self.lock:
+            self.in_flight[order.symbol] = self.in_flight.get(order.symbol, 0) + 1
+        self.orders.put(order)
+        return order.future
+
+    def busy(self, symbol):
+        with self.lock:
+            return self.in_flight.get(symbol, 0) > 0
+
+    def defer(self, fn, *args):
+        if not self.started:
+            self._start()
+        self.followups.put((fn, args))
+
+    def drain(self, timeout=5.0):
+        """Wait until every queued order and follow-up has run (tests / shutdown)"""
+        deadline = time.monotonic() + timeout
+        while (self.orders.unfinished_tasks or self.followups.unfinished_tasks) and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    # === WORKERS ===
+    def _order_loop(self):
+        while True:
+            order = self.orders.get()
+            try:
+                self._execute(order)
+            except Exception as e:
+                log_print(f"{order.symbol} ORDER {order.kind.upper()} CRASH: {e}", "ERROR")
+                if not order.future.done():
+                    order.future.set_result(False)
+            finally:
+                with self.lock:
+                    self.in_flight[order.symbol] -= 1
+                self.orders.task_done()
+
+    def _execute(self, order):
+        if order.after is not None and not order.after.result():
+            log_print(f"{order.symbol} {order.kind.upper()} SKIPPED — previous order did not fill", "WARNING")
+            order.future.set_result(False)
+            return
+
+        order.submitted_at = time.perf_counter()
+        if order.kind == "close":
+            result = self.exchange.market_close(order.symbol)
+        else:
+            result = self.exchange.market_open(order.symbol, order.kind == "long", order.qty)
+        order.acked_at = time.perf_counter()
+        order.result = result
+
+        fill = parse_fill(result)
+        if fill is None:
+            log_print(f"{order.kind.upper()} FAILED: {result}", "ERROR")
+            if order.on_fail:
+                order.on_fail(order)
+            order.future.set_result(False)
+            return
+
+        # IOC market orders report the fill in the ack itself
+        order.filled_at = time.perf_counter()
+        order.avg_px, order.filled_sz = fill
+        if order.on_fill:
+            order.on_fill(order)
+        order.future.set_result(True)
+        self._record(order)
+
+    def _record(self, order):
+        lat = order.latencies()
+        for phase, ms in lat.items():
+            if ms is not None:
+                self.stats.add(phase, ms)
+                ORDER_SECONDS.observe(ms / 1000, phase)
+        self.defer(log_print, (f"{order.symbol} {order.kind.upper()} LATENCY │ signal→submit {lat['signal_to_submit']:.1f}ms │ "
+                               f"submit→ack {lat['submit_to_ack']:.1f}ms │ signal→fill {lat['signal_to_fill']:.1f}ms"), "DEBUG")
+
+    def _followup_loop(self):
+        while True:
+            fn, args = self.followups.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                log_print(f"Order follow-up failed: {e}", "ERROR")
+            finally:
+                self.followups.task_done()
@@ -1,10 +1,13 @@
 # indicators.py
+import math
+import time
+from collections import deque
+import numpy as np
 import pandas as pd
+from candles import Candles, as_candles
 from config import MA_SHORT, MA_LONG, TREND_LOOKBACK, RSI_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD, ALLOW_SHORTS, USE_RSI_EARLY_EXIT
-from state import position_open, position_side, save_crosses  # ← MOVED TO TOP!
 from logger import log_print
 
-last_cross_time = None
 
 def rsi(series: pd.Series, period: int) -> pd.Series:
     delta = series.diff()
@@ -15,43 +18,210 @@ def rsi(series: pd.Series, period: int) -> pd.Series:
     rs = avg_gain / avg_loss
     return 100 - (100 / (1 + rs))
 
-def detect_cross(df: pd.DataFrame, cross_history: list, last_trend: str | None):
-    global last_cross_time
+def _rsi_from_avgs(avg_gain, avg_loss):
+    # Same edge cases as the pandas path: no losses → 100, flat window → NaN
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else math.nan
+    return 100 - (100 / (1 + avg_gain / avg_loss))
 
-    df['sma_short'] = df['close'].rolling(window=MA_SHORT).mean()
-    df['sma_long']  = df['close'].rolling(window=MA_LONG).mean()
-    df['rsi']       = rsi(df['close'], RSI_PERIOD)
 
-    cur_short = df['sma_short'].iloc[-1]
-    cur_long  = df['sma_long'].iloc[-1]
-    prev_short = df['sma_short'].shift(1).iloc[-1]
-    prev_long  = df['sma_long'].shift(1).iloc[-1]
+class StreamingIndicators:
+    """O(1) SMA short/long, trend and RSI over a stream of bars.
 
-    is_uptrend = df['sma_long'].iloc[-1] > df['sma_long'].iloc[-1 - TREND_LOOKBACK]
+    Closed bars are folded into running sums once. The last (still forming)
+    bar is held separately, so a price change on it only re-evaluates the
+    current values and never touches the accumulators. Values match
+    `rolling().mean()` / `rsi()` evaluated on the last row of the DataFrame.
+    """
+
+    def __init__(self, ma_short=MA_SHORT, ma_long=MA_LONG, rsi_period=RSI_PERIOD, trend_lookback=TREND_LOOKBACK):
+        self.ma_short = ma_short
+        self.ma_long = ma_long
+        self.rsi_period = rsi_period
+        self.trend_lookback = trend_lookback
+        self.reset()
+
+    def reset(self):
+        self.count = 0                                        # closed bars folded in
+        self.closes = deque(maxlen=max(self.ma_long, self.ma_short))
+        self.sum_short = 0.0                                  # last ma_short closed closes
+        self.sum_long = 0.0                                   # last ma_long closed closes
+        self.gains = deque(maxlen=self.rsi_period)
+        self.losses = deque(maxlen=self.rsi_period)
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.long_hist = deque(maxlen=self.trend_lookback)    # sma_long on the last closed bars
+        self.live_ts = None
+        self.live_close = None
+
+    # === FEED ===
+    def update(self, ts, close):
+        """Feed one bar. Same ts as the live bar → replace it; newer ts → close the live bar first."""
+        if self.live_ts is not None and ts == self.live_ts:
+            self.live_close = close
+            return
+        if self.live_ts is not None:
+            if ts < self.live_ts:
+                return
+            self._commit(self.live_close)
+        self.live_ts = ts
+        self.live_close = close
+
+    def sync(self, bars: Candles):
+        """Feed only the bars at or after the live bar (all of them on first call).
+        Reads the Candles arrays in place; a DataFrame is converted first."""
+        bars = as_candles(bars)
+        if not len(bars):
+            return
+        ts, closes = bars.t, bars.close
+        start = 0 if self.live_ts is None else int(np.searchsorted(ts, self.live_ts, side='left'))
+        if start == 0 and self.live_ts is not None and ts[0] > self.live_ts:
+            # Gap between what we have and the frame — rebuild from the frame
+            self.reset()
+        for i in range(start, len(ts)):
+            self.update(int(ts[i]), float(closes[i]))
+
+    def _commit(self, close):
+        closes = self.closes
+        n = self.count
+        d = close - closes[-1] if n else 0.0      # first diff is NaN in pandas → counts as 0 gain/loss
+        g, l = (d if d > 0 else 0.0), (-d if d < 0 else 0.0)
+        if len(self.gains) == self.rsi_period:
+            self.gain_sum -= self.gains[0]
+            self.loss_sum -= self.losses[0]
+        self.gains.append(g)
+        self.losses.append(l)
+        self.gain_sum += g
+        self.loss_sum += l
+
+        if n >= self.ma_short:
+            self.sum_short -= closes[-self.ma_short]
+        if n >= self.ma_long:
+            self.sum_long -= closes[-self.ma_long]
+        closes.append(close)
+        self.sum_short += close
+        self.sum_long += close
+        self.count = n + 1
+
+        # Running sums drift; re-add from the window once per ma_long bars (amortised O(1))
+        if self.count % self.ma_long == 0:
+            self._resync()
+
+        self.long_hist.append(self.sum_long / self.ma_long if self.count >= self.ma_long else math.nan)
+
+    def _resync(self):
+        c = list(self.closes)
+        self.sum_short = math.fsum(c[-self.ma_short:])
+        self.sum_long = math.fsum(c[-self.ma_long:])
+        self.gain_sum = math.fsum(self.gains)
+        self.loss_sum = math.fsum(self.losses)
+
+    # === READ ===
+    def _sma_live(self, window, closed_sum):
+        if self.live_close is None or self.count + 1 < window:
+            return math.nan
+        without_oldest = closed_sum - self.closes[-window] if self.count >= window else closed_sum
+        return (without_oldest + self.live_close) / window
+
+    @property
+    def sma_short(self):
+        return self._sma_live(self.ma_short, self.sum_short)
+
+    @property
+    def sma_long(self):
+        return self._sma_live(self.ma_long, self.sum_long)
+
+    @property
+    def prev_sma_short(self):
+        return self.sum_short / self.ma_short if self.count >= self.ma_short else math.nan
+
+    @property
+    def prev_sma_long(self):
+        return self.sum_long / self.ma_long if self.count >= self.ma_long else math.nan
+
+    @property
+    def is_uptrend(self):
+        if len(self.long_hist) < self.trend_lookback:
+            return False
+        return self.sma_long > self.long_hist[0]
+
+    @property
+    def rsi(self):
+        p = self.rsi_period
+        if self.live_close is None or self.count + 1 < p:
+            return math.nan
+        d = self.live_close - self.closes[-1] if self.count else 0.0
+        full = len(self.gains) == p
+        g = self.gain_sum - (self.gains[0] if full else 0.0) + (d if d > 0 else 0.0)
+        l = self.loss_sum - (self.losses[0] if full else 0.0) + (-d if d < 0 else 0.0)
+        return _rsi_from_avgs(g / p, l / p)
+
+    def values(self):
+        return {
+            'sma_short': self.sma_short,
+            'sma_long': self.sma_long,
+            'prev_short': self.prev_sma_short,
+            'prev_long': self.prev_sma_long,
+            'is_uptrend': self.is_uptrend,
+            'rsi': self.rsi,
+        }
+
+
+def pandas_values(df: pd.DataFrame):
+    """Reference path: full rolling recompute over the frame (does not mutate df)"""
+    close = df['close']
+    sma_short = close.rolling(window=MA_SHORT).mean()
+    sma_long = close.rolling(window=MA_LONG).mean()
+    return {
+        'sma_short': sma_short.iloc[-1],
+        'sma_long': sma_long.iloc[-1],
+        'prev_short': sma_short.shift(1).iloc[-1],
+        'prev_long': sma_long.shift(1).iloc[-1],
+        'is_uptrend': bool(sma_long.iloc[-1] > sma_long.iloc[-1 - TREND_LOOKBACK]),
+        'rsi': rsi(close, RSI_PERIOD).iloc[-1],
+    }
+
+def detect_cross(bars: Candles, sym, engine: StreamingIndicators | None = None):
+    """Evaluate the cross rules on the last bar of `bars` for one symbol (a state.SymbolState).
+    `bars` may also be a DataFrame (backtests)."""
+    cross_history = sym.cross_history
+    bars = as_candles(bars)
+
+    if engine is not None:
+        engine.sync(bars)
+        v = engine.values()
+    else:
+        v = pandas_values(bars.to_df())
+
+    cur_short, cur_long = v['sma_short'], v['sma_long']
+    prev_short, prev_long = v['prev_short'], v['prev_long']
+
+    is_uptrend = v['is_uptrend']
     trend_str = 'Uptrend' if is_uptrend else 'Downtrend'
 
     signal = None
     cross_type = None
-    current_time = df['timestamp'].iloc[-1]
+    current_time = int(bars.t[-1])                     # open time, ms
+    price = float(bars.close[-1])
 
-    if last_cross_time != current_time:
-        last_cross_time = current_time
-        rsi_val = df['rsi'].iloc[-1]
+    if sym.last_cross_time != current_time:
+        sym.last_cross_time = current_time
+        rsi_val = v['rsi']
 
         # === GOLDEN CROSS ===
         if cur_short > cur_long and prev_short <= prev_long:
             cross_type = 'golden'
-            log_print(f"GOLDEN CROSS DETECTED @ ${df['close'].iloc[-1]:.3f} | RSI {rsi_val:.1f}", "INFO")
+            log_print(f"{sym.symbol} GOLDEN CROSS DETECTED @ ${price:.3f} | RSI {rsi_val:.1f}", "INFO")
             
             cross_history.append({
                 'type': 'golden',
-                'time': current_time.strftime('%H:%M:%S'),
-                'price': df['close'].iloc[-1],
+                'time': time.strftime('%H:%M:%S', time.gmtime(current_time / 1000)),
+                'price': price,
                 'trend': trend_str
             })
             if len(cross_history) > 4:
                 cross_history.pop(0)
-            save_crosses()  # ← NOW ALWAYS CALLED
+            sym.save_crosses()  # ← NOW ALWAYS CALLED
 
             if is_uptrend and rsi_val < RSI_OVERBOUGHT:
                 signal = 'buy'
@@ -63,17 +233,17 @@ def detect_cross(df: pd.DataFrame, cross_history: list, last_trend: str | None):
         # === DEATH CROSS ===
         elif cur_short < cur_long and prev_short >= prev_long:
             cross_type = 'death'
-            log_print(f"DEATH CROSS DETECTED @ ${df['close'].iloc[-1]:.3f} | RSI {rsi_val:.1f}", "INFO")
+            log_print(f"{sym.symbol} DEATH CROSS DETECTED @ ${price:.3f} | RSI {rsi_val:.1f}", "INFO")
             
             cross_history.append({
                 'type': 'death',
-                'time': current_time.strftime('%H:%M:%S'),
-                'price': df['close'].iloc[-1],
+                'time': time.strftime('%H:%M:%S', time.gmtime(current_time / 1000)),
+                'price': price,
                 'trend': trend_str
             })
             if len(cross_history) > 4:
                 cross_history.pop(0)
-            save_crosses()  # ← NOW ALWAYS CALLED
+            sym.save_crosses()  # ← NOW ALWAYS CALLED
 
             if not is_uptrend and ALLOW_SHORTS and rsi_val > RSI_OVERSOLD:
                 signal = 'short'
@@ -83,10 +253,10 @@ def detect_cross(df: pd.DataFrame, cross_history: list, last_trend: str | None):
                 log_print(f"[SKIPPED] DEATH CROSS — {reason}", "WARNING")
 
         # Early exit
-        if USE_RSI_EARLY_EXIT and position_open:
-            if position_side == "long" and rsi_val > 85:
+        if USE_RSI_EARLY_EXIT and sym.position_open:
+            if sym.position_side == "long" and rsi_val > 85:
                 signal = 'sell_early'
-            elif position_side == "short" and rsi_val < 15:
+            elif sym.position_side == "short" and rsi_val < 15:
                 signal = 'cover_early'
 
     return signal, trend_str, cross_type
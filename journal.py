@@ -0,0 +1,183 @@
+# journal.py — append-only trade journal (SQLite), indexed by time / symbol / action
+#
+#   python journal.py migrate [saves/trades.json]
+#   python journal.py stats [--symbol LTC] [--days 30]
+#   python journal.py tail [-n 20]
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+import clock
+
+SAVES_DIR = "saves"
+JOURNAL_FILE = os.path.join(SAVES_DIR, "trades.db")
+LEGACY_FILE = os.path.join(SAVES_DIR, "trades.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id        INTEGER PRIMARY KEY,
+    ts        INTEGER NOT NULL,     -- epoch ms (UTC)
+    symbol    TEXT    NOT NULL,
+    action    TEXT    NOT NULL,     -- buy | short | close
+    qty       REAL    NOT NULL,
+    price     REAL    NOT NULL,
+    value_usd REAL    NOT NULL,
+    pnl       REAL                  -- realised PnL on closes, NULL on opens
+);
+CREATE INDEX IF NOT EXISTS trades_ts        ON trades (ts);
+CREATE INDEX IF NOT EXISTS trades_symbol_ts ON trades (symbol, ts);
+CREATE INDEX IF NOT EXISTS trades_action_ts ON trades (action, ts);
+CREATE INDEX IF NOT EXISTS trades_symbol_action_ts ON trades (symbol, action, ts);
+"""
+
+def _ms(when):
+    """datetime / epoch seconds / epoch ms / None → epoch ms"""
+    if when is None:
+        return None
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return int(when.timestamp() * 1000)
+    return int(when if when > 1e11 else when * 1000)
+
+
+class TradeJournal:
+    """One row per fill. Inserts are a single indexed append; nothing is held in memory."""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    # === WRITE ===
+    def record(self, action, qty, price, symbol, pnl=None, ts=None):
+        ts = _ms(ts) or int(clock.now() * 1000)
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO trades (ts, symbol, action, qty, price, value_usd, pnl) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, symbol, action, round(qty, 6), round(price, 4), round(qty * price, 2), pnl))
+
+    # === READ ===
+    def _where(self, symbol=None, action=None, start=None, end=None):
+        clauses, args = [], []
+        if symbol:
+            clauses.append("symbol = ?"); args.append(symbol)
+        if action:
+            clauses.append("action = ?"); args.append(action)
+        if start is not None:
+            clauses.append("ts >= ?"); args.append(_ms(start))
+        if end is not None:
+            clauses.append("ts < ?"); args.append(_ms(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, symbol=None, action=None, start=None, end=None, limit=None, newest_first=False):
+        where, args = self._where(symbol, action, start, end)
+        sql = f"SELECT * FROM trades{where} ORDER BY ts {'DESC' if newest_first else 'ASC'}, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return [dict(r) for r in self.db.execute(sql, args)]
+
+    def count(self, symbol=None, action=None, start=None, end=None):
+        where, args = self._where(symbol, action, start, end)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM trades{where}", args).fetchone()[0]
+
+    def daily_pnl(self, symbol=None, start=None, end=None):
+        """[{day, pnl, closes, wins}] per UTC day, realised PnL from closes"""
+        where, args = self._where(symbol, "close", start, end)
+        sql = (f"SELECT date(ts / 1000, 'unixepoch') AS day, SUM(pnl) AS pnl, COUNT(pnl) AS closes, "
+               f"SUM(pnl > 0) AS wins FROM trades{where} GROUP BY day ORDER BY day")
+        with self.lock:
+            return [dict(r) for r in self.db.execute(sql, args)]
+
+    def stats(self, symbol=None, start=None, end=None):
+        """Totals over closes: trades, wins, win_rate, pnl, avg, best, worst"""
+        where, args = self._where(symbol, "close", start, end)
+        sql = (f"SELECT COUNT(pnl) AS closes, SUM(pnl > 0) AS wins, SUM(pnl) AS pnl, AVG(pnl) AS avg_pnl, "
+               f"MAX(pnl) AS best, MIN(pnl) AS worst FROM trades{where}")
+        with self.lock:
+            row = dict(self.db.execute(sql, args).fetchone())
+        row["wins"] = row["wins"] or 0
+        row["pnl"] = row["pnl"] or 0.0
+        row["win_rate"] = round(row["wins"] / row["closes"] * 100, 1) if row["closes"] else None
+        return row
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # === MIGRATION ===
+    def migrate_json(self, path=LEGACY_FILE, default_symbol="LTC"):
+        """Import the old trades.json (only into an empty journal), rebuilding PnL on closes
+        from the preceding open of the same symbol. The old file is renamed *.migrated."""
+        if not os.path.exists(path) or self.count():
+            return 0
+        try:
+            with open(path, 'r') as f:
+                old = json.load(f)
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Corrupt/invalid {path} ({e}) — not migrated.")
+            return 0
+
+        open_legs = {}          # symbol → (side, entry price)
+        rows = []
+        for t in old:
+            symbol = t.get("symbol", default_symbol)
+            action = t.get("action")
+            qty, price = float(t.get("ltc", 0.0)), float(t.get("price", 0.0))
+            ts = int(datetime.strptime(t["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp() * 1000)   # was local time
+            pnl = None
+            if action in ("buy", "short"):
+                open_legs[symbol] = ("long" if action == "buy" else "short", price)
+            elif action == "close" and symbol in open_legs:
+                side, entry = open_legs.pop(symbol)
+                pnl = round((price - entry) * qty if side == "long" else (entry - price) * qty, 6)
+            rows.append((ts, symbol, action, qty, price, round(qty * price, 2), pnl))
+
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT INTO trades (ts, symbol, action, qty, price, value_usd, pnl) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("COMMIT")
+        os.replace(path, path + ".migrated")
+        print(f"Migrated {len(rows)} trades from {path} → {self.path}")
+        return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trade journal")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate")
+    m.add_argument("path", nargs="?", default=LEGACY_FILE)
+    s = sub.add_parser("stats")
+    s.add_argument("--symbol")
+    s.add_argument("--days", type=int, default=30)
+    t = sub.add_parser("tail")
+    t.add_argument("-n", type=int, default=20)
+    t.add_argument("--symbol")
+    args = parser.parse_args()
+
+    journal = TradeJournal()
+    if args.cmd == "migrate":
+        journal.migrate_json(args.path)
+    elif args.cmd == "stats":
+        start = datetime.now(timezone.utc) - timedelta(days=args.days)
+        for d in journal.daily_pnl(args.symbol, start=start):
+            print(f"{d['day']}  PnL ${d['pnl'] or 0:+.2f}  ({d['wins']}/{d['closes']} wins)")
+        st = journal.stats(args.symbol, start=start)
+        rate = f"{st['win_rate']:.1f}%" if st['win_rate'] is not None else "-"
+        print(f"last {args.days}d: {st['closes']} closes │ win rate {rate} │ PnL ${st['pnl']:+.2f}")
+    elif args.cmd == "tail":
+        for r in reversed(journal.query(args.symbol, limit=args.n, newest_first=True)):
+            when = datetime.fromtimestamp(r['ts'] / 1000).strftime("%Y-%m-%d %H:%M:%S")
+            pnl = f"  PnL ${r['pnl']:+.2f}" if r['pnl'] is not None else ""
+            print(f"{when}  {r['symbol']:<5} {r['action']:<5} {r['qty']:g} @ ${r['price']:.2f}{pnl}")
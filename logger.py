@@ -1,92 +1,87 @@
-# logger.py — FINAL ULTIMATE VERSION (your exact dream formatting) + PnL support
+# logger.py — queued, structured logging (your exact dream formatting) + PnL support
+#
+# log_print() only builds a record and drops it on a queue; a background listener
+# thread does the formatting, disk writes and terminal output. Values such as
+# price/RSI/balance/PnL travel as fields on the record (log_print(msg, price=...)),
+# so nothing here parses strings back apart or touches the exchange.
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
-from config import TERMINAL_LOG_MODE
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from config import TERMINAL_LOG_MODE, SYMBOL, LOG_JSONL
 from utils import color_text
-import state
-from exchange import get_unrealized_pnl  # NEW: For PnL in price logs
 
 LOGS_DIR = "saves/logs"
 LOG_FILE = os.path.join(LOGS_DIR, "bot.log")
-os.makedirs(LOGS_DIR, exist_ok=True)
+JSONL_FILE = os.path.join(LOGS_DIR, "bot.jsonl")
+
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
 
 logger = logging.getLogger("LTCBot")
 logger.setLevel(logging.DEBUG)
 logger.propagate = False
 logger.handlers.clear()
 
-# File handler — full detail
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10*1024*1024, backupCount=5)
-file_formatter = logging.Formatter('%(asctime)s - %(levelname)-8s - %(message)s', '%Y-%m-%d %H:%M:%S')
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
 
-# Terminal handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+# === FORMATTING ===
+def trend_colored(trend):
+    return color_text("Uptrend ↑", 'light_green') if "Uptrend" in (trend or "") else color_text("Downtrend ↓", 'light_red')
+
+def format_price_line(f):
+    """Terminal price line from the fields trader.tick() attaches"""
+    symbol = f.get("symbol", SYMBOL)
+    pos = f.get("position", 0.0)
+    pos_str = f"0 {symbol}" if abs(pos) < 0.001 else f"{pos:.6f}".rstrip("0").rstrip(".") + f" {symbol}"
+    pnl_str = f"{f.get('pnl_pct', 0.0):+.1f}% (${f.get('pnl_usd', 0.0):+.2f})" if f.get("position_open") else "0% ($0.00)"
+    return (
+        f"{symbol} Price ${f.get('price', 0.0):.3f} │ "
+        f"RSI {f.get('rsi', 0.0):.1f} │ "
+        f"Balance: ${f.get('balance', 0.0):.2f} │ "
+        f"Position: {pos_str} | "
+        f"PnL: {pnl_str} │ "
+        f"{trend_colored(f.get('trend'))}"
+    )
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, msg + any structured fields"""
+
+    def format(self, record):
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        doc.update(getattr(record, "fields", None) or {})
+        return json.dumps(doc, default=str, ensure_ascii=False)
+
 
 class ConfigurableFilter(logging.Filter):
     def filter(self, record):
-        msg = record.getMessage()
+        fields = getattr(record, "fields", None) or {}
+        event = fields.get("event")
 
         if record.levelno >= logging.WARNING:
             return True
 
-        # TREND → (Downtrend ↓) or (Uptrend ↑)
-        if "TREND →" in msg:
-            if "Uptrend" in msg:
-                record.msg = f"TREND → ({color_text('Uptrend ↑', 'light_green')})"
-            elif "Downtrend" in msg:
-                record.msg = f"TREND → ({color_text('Downtrend ↓', 'light_red')})"
+        # [SYM] TREND → (Downtrend ↓) or (Uptrend ↑)
+        if event == "trend":
+            record.msg = f"{fields.get('symbol', SYMBOL)} TREND → ({trend_colored(fields.get('trend'))})"
+            record.args = None
             return True
 
-        # PRICE + BALANCE + POSITION + PnL (UPDATED FOR NEW FORMAT)
-        if "Price $" in msg:
-            parts = msg.split(" │ ")
-            
-            # Robust: Grab trend from last part
-            trend_part = parts[-1] if len(parts) > 1 else "Downtrend"
-            
-            # Extract price/RSI from first two (ignore extras)
-            price_part = parts[0] if len(parts) > 0 else "Price $0.000"
-            rsi_part = parts[1] if len(parts) > 1 else "RSI 0.0"
-
-            # Extract values
-            try:
-                price = float(price_part.split("$")[1].split()[0])
-                rsi = float(rsi_part.split()[1])
-            except:
-                price, rsi = 0.0, 0.0
-
-            # Fetch live balance/position/PnL from state/exchange
-            balance = state.dashboard_data.get("usdt_balance", 0.0)
-            ltc_pos = state.dashboard_data.get("ltc_position", 0.0)
-            position_open = getattr(state, 'position_open', False)  # From state
-
-            # Format position
-            if abs(ltc_pos) < 0.001:
-                pos_str = "0 LTC"
-            else:
-                pos_str = f"{ltc_pos:.6f}".rstrip("0").rstrip(".") + " LTC"
-
-            # NEW: Fetch PnL
-            current_pnl_pct, current_pnl_usd = get_unrealized_pnl() if position_open else (0.0, 0.0)
-            pnl_str = f"{current_pnl_pct:+.1f}% (${current_pnl_usd:+.2f})" if position_open else "0% ($0.00)"
-
-            # Build new line
-            trend_colored = color_text("Uptrend ↑", 'light_green') if "Uptrend" in trend_part else color_text("Downtrend ↓", 'light_red')
-            new_msg = (
-                f"Price ${price:.3f} │ "
-                f"RSI {rsi:.1f} │ "
-                f"Balance: ${balance:.2f} │ "
-                f"Position: {pos_str} | "
-                f"PnL: {pnl_str} │ "
-                f"{trend_colored}"
-            )
-            record.msg = new_msg
+        # PRICE + BALANCE + POSITION + PnL
+        if event == "price":
+            record.msg = format_price_line(fields)
+            record.args = None
             return True
 
+        msg = record.getMessage()
+
         # Allow important events
         if TERMINAL_LOG_MODE == "QUIET":
             allowed = ["BOT STARTED", "Balance", "GOLDEN CROSS", "DEATH CROSS",
@@ -105,13 +100,65 @@ class ConfigurableFilter(logging.Filter):
 
         return True
 
+
+# === SINKS (all run on the listener thread) ===
+# File handler — full detail
+file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10*1024*1024, backupCount=5, delay=True)   # opened on first write
+file_formatter = logging.Formatter('%(asctime)s - %(levelname)-8s - %(message)s', '%Y-%m-%d %H:%M:%S')
+file_handler.setFormatter(file_formatter)
+
+# Terminal handler
+console_handler = logging.StreamHandler()
+console_handler.setLevel(logging.INFO)
 console_handler.addFilter(ConfigurableFilter())
 console_formatter = logging.Formatter('%(asctime)s - %(message)s', '%H:%M:%S')
 console_handler.setFormatter(console_formatter)
-logger.addHandler(console_handler)
 
-def log_print(msg, level="INFO"):
-    levels = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
-    logger.log(levels.get(level, logging.INFO), msg)
-    levels = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
-    logger.log(levels.get(level, logging.INFO), msg)
+sinks = [file_handler]
+
+# Machine-readable copy (set LOG_JSONL = True in config.py)
+if LOG_JSONL:
+    jsonl_handler = RotatingFileHandler(JSONL_FILE, maxBytes=10*1024*1024, backupCount=5, delay=True)
+    jsonl_handler.setFormatter(JsonLinesFormatter())
+    sinks.append(jsonl_handler)
+
+sinks.append(console_handler)    # last: its filter rewrites record.msg with colours
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The stdlib version formats here (on the caller's thread) — sinks do their own
+        # formatting on the listener thread, so just hand the record over untouched.
+        return record
+
+log_queue = queue.SimpleQueue()
+logger.addHandler(_QueueHandler(log_queue))
+listener = None
+_started = False
+_start_lock = threading.Lock()
+
+def start_logging():
+    """Create saves/logs and start the writer thread (first log_print does this; importing doesn't)"""
+    global listener, _started
+    with _start_lock:
+        if _started:
+            return
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        listener = QueueListener(log_queue, *sinks, respect_handler_level=True)
+        listener.start()
+        atexit.register(stop_logging)
+        _started = True
+
+def stop_logging():
+    """Flush everything still queued (called on shutdown; safe to call twice)"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def log_print(msg, level="INFO", **fields):
+    """Log `msg`; keyword args are kept as structured fields (JSONL sink, terminal formatting)."""
+    if not _started:
+        start_logging()
+    logger.log(LEVELS.get(level, logging.INFO), msg, extra={"fields": fields} if fields else None)
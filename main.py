@@ -1,231 +1,215 @@
 # main.py — (December 2025)
 
 import threading
-import time
 import signal
-import math
-import pandas as pd
-from datetime import datetime, timezone, timedelta
+import time
 
-from dashboard import app
 from config import *
 import state
-from exchange import get_balance, get_position, fetch_ohlcv, exchange, get_unrealized_pnl
-from indicators import detect_cross
-from data_collector import collect_all_candles
-from logger import log_print
-
-from state import total_profit, position_open, position_side, last_signal, cross_history, dashboard_data
-
-# === NEW: Info instance to read metadata & leverage ===
-from hyperliquid.info import Info
-info = Info(BASE_URL, skip_ws=True)
-
-# === FETCH ASSET PRECISION ONCE AT START ===
-meta = info.meta()
-asset_info = next(a for a in meta['universe'] if a['name'] == SYMBOL)
-SZ_DECIMALS = int(asset_info['szDecimals'])           # e.g. 2 for LTC, 5 for BTC
-MIN_SIZE = float(asset_info.get('minSize', 0.001))
-
-# === DYNAMIC LEVERAGE DETECTION (from instant_test.py) ===
-def get_current_leverage():
+from exchange import get_balance, get_mids, fetch_all_ohlcv, account, candle_buffers, warm_up as warm_clients
+from trader import SymbolTrader, load_asset_meta, default_executor
+from logger import log_print, stop_logging
+from market_stream import MarketStream, ws_url_for
+from scheduler import BarScheduler
+import snapshot
+import persist
+import metrics
+import clock
+from snapshot import hub
+from meta_cache import cache as meta_cache
+from transport import ApiError
+from candle_buffer import INTERVAL_MS
+
+# === SETUP ===
+# Importing this module does no I/O. setup() does only what the first tick needs, from disk
+# (metadata cache, state files); clients, leverage and the startup balance follow in the background.
+asset_meta = {}
+traders = {}
+
+def setup():
+    global asset_meta, traders
+    if RECORD_API:                          # before the first request, so everything is on the tape
+        import recorder
+        recorder.start({"wallet": API_WALLET_ADDRESS, "symbols": SYMBOLS, "timeframe": TIMEFRAME})
+    state.load_all()
+    asset_meta = load_asset_meta(meta_cache.get("meta"), SYMBOLS)
+    traders = {sym: SymbolTrader(sym, *asset_meta[sym]) for sym in SYMBOLS}
+    if PAPER_TRADING:                       # a paper liquidation closes positions the traders didn't
+        default_executor.exchange.get().liquidation_listeners.append(on_liquidation)
+    return traders
+
+def on_liquidation(sym, size, px):
+    trader = traders.get(sym)
+    if trader is not None:
+        trader.on_liquidated(size, px)
+
+def warm_up():
+    warm_clients()
     try:
-        state = info.user_state(API_WALLET_ADDRESS)
-        for pos in state.get("assetPositions", []):
-            if pos["position"]["coin"] == SYMBOL:
-                return int(pos["position"]["leverage"]["value"])
-        # fallback: account-wide cross leverage (website setting if available)
-        return int(state.get("marginSummary", {}).get("accountLeverage", 1))
-    except:
-        return 1
-
-current_leverage = get_current_leverage()
-log_print(f"Detected leverage: {current_leverage}× (from Hyperliquid; updates post-trade)", "INFO")
-
-# === CONSERVATIVE MARGIN CHECK (assumes website leverage will handle) ===
-def enough_usdt(required_notional):
-    """Conservative check: Proceed if balance covers min for max leverage (20×); exchange enforces actual"""
-    free = get_balance()
-    min_margin = required_notional / 20 * (1 + FEE_BUFFER_PCT)  # Conservative threshold (~$3 for $60)
-    enough = free >= min_margin
-    if not enough:
-        log_print(f"Insufficient min balance: need ~${min_margin:.2f}, have ${free:.2f} (website leverage will use actual margin)", "WARNING")
-    return enough, free
-
-def calculate_dynamic_qty(current_price):
-    """Round quantity to correct decimals using asset metadata (from test)"""
-    if current_price <= 0:
-        return MIN_SIZE
-    raw_qty = TRADE_USDT / current_price
-    qty = round(raw_qty, SZ_DECIMALS)
-    return max(MIN_SIZE, qty)
-
-def place_long(qty):
-    result = exchange.market_open(SYMBOL, True, qty)
-    if result and result.get("status") == "ok":
-        for s in result["response"]["data"]["statuses"]:
-            if "filled" in s:
-                entry_px = float(s["filled"]["avgPx"])
-                log_print(f"LONG OPENED ✅ {qty} {SYMBOL} @ ${entry_px:.3f}", "INFO")
-                state.last_buy_price = entry_px
-                state.position_open = True
-                state.position_side = "long"
-                # Update leverage post-open (website value now visible)
-                global current_leverage
-                current_leverage = get_current_leverage()
-                log_print(f"Updated leverage: {current_leverage}× (confirmed from position)", "INFO")
-                state.save_state()
-                state.save_trade("buy", qty, entry_px)
-                return True
-    log_print(f"LONG FAILED: {result}", "ERROR")
-    return False
-
-def place_short(qty):
-    result = exchange.market_open(SYMBOL, False, qty)
-    if result and result.get("status") == "ok":
-        for s in result["response"]["data"]["statuses"]:
-            if "filled" in s:
-                entry_px = float(s["filled"]["avgPx"])
-                log_print(f"SHORT OPENED ✅ {qty} {SYMBOL} @ ${entry_px:.3f}", "INFO")
-                state.last_buy_price = entry_px
-                state.position_open = True
-                state.position_side = "short"
-                # Update leverage post-open (website value now visible)
-                global current_leverage
-                current_leverage = get_current_leverage()
-                log_print(f"Updated leverage: {current_leverage}× (confirmed from position)", "INFO")
-                state.save_state()
-                state.save_trade("short", qty, entry_px)
-                return True
-    log_print(f"SHORT FAILED: {result}", "ERROR")
-    return False
-
-def close_position():
-    result = exchange.market_close(SYMBOL)
-    if result and result.get("status") == "ok":
-        for s in result["response"]["data"]["statuses"]:
-            if "filled" in s:
-                exit_px = float(s["filled"]["avgPx"])
-                qty = float(s["filled"]["totalSz"])
-                pnl = (exit_px - state.last_buy_price) * qty if state.position_side == "long" else (state.last_buy_price - exit_px) * qty
-
-                if pnl > 0:
-                    log_print(f"POSITION CLOSED ✅ {qty} {SYMBOL} @ ${exit_px:.3f} → PROFIT ${pnl:+.2f} 🎉", "INFO")
-                else:
-                    log_print(f"POSITION CLOSED ❌ {qty} {SYMBOL} @ ${exit_px:.3f} → ${pnl:+.2f}", "INFO")
-
-                state.total_profit += pnl
-                state.save_trade("close", qty, exit_px)
-                state.position_open = False
-                state.position_side = None
-                state.save_state()
-                return True
-    log_print(f"CLOSE FAILED: {result}", "ERROR")
-    return False
+        log_print(f"Startup Balance: ${get_balance():.2f} | Symbols: {', '.join(SYMBOLS)}", "INFO")
+    except ApiError as e:
+        log_print(f"Startup balance unavailable ({type(e).__name__}: {e}) | Symbols: {', '.join(SYMBOLS)}", "WARNING")
 
 # === BOT LOOP ===
 stop_event = threading.Event()
-pending_trade = None
-last_price_log = datetime.now(timezone.utc)
+market_stream = None
+scheduler = BarScheduler(INTERVAL_MS[TIMEFRAME], BAR_CLOSE_DELAY, BAR_CLOSE_JITTER, STOP_CHECK_INTERVAL)
 
 def signal_handler(sig, frame):
     log_print("Bot stopped by user.", "INFO")
     stop_event.set()
+    default_executor.drain(timeout=5.0)     # let an in-flight order land and its state get saved
+    persist.flush()
+    if RECORD_API:
+        import recorder
+        recorder.stop()
+    stop_logging()                          # os._exit skips atexit → flush the log queue by hand
     import os
     os._exit(0)
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+def run_bar_tick():
+    sent_ms = clock.now() * 1000
+    with metrics.stage("fetch"):
+        candles = fetch_all_ohlcv(SYMBOLS, now_ms=int(scheduler.skew.server_now_ms()))   # concurrent; one round trip regardless of symbol count
+    recv_ms = clock.now() * 1000
+    for sym in SYMBOLS:
+        buf, bars = candle_buffers[sym], candles.get(sym)
+        if isinstance(bars, Exception):
+            log_print(f"{sym} tick skipped — no candles ({type(bars).__name__}: {bars})", "WARNING")
+            candles[sym] = None
+            continue
+        if not buf.live and bars is not None and len(bars):     # fresh REST reply → bounds the exchange clock
+            scheduler.skew.observe_bar(buf.last_ts_ms, sent_ms, recv_ms)
+        if buf.last_ts_ms is not None:
+            metrics.CANDLE_AGE.set((scheduler.skew.server_now_ms() - buf.last_ts_ms) / 1000, sym)
+
+    for sym, trader in traders.items():
+        try:
+            trader.tick(candles.get(sym))
+        except ApiError as e:       # a pending trade stays pending and is retried next tick
+            log_print(f"{sym} tick cut short — {type(e).__name__}: {e}", "WARNING")
+        except Exception as e:
+            log_print(f"{sym} CRASH: {e}", "ERROR")
+
+def on_mid(sym, price, received_at):
+    """MarketStream allMids push → that symbol's stops (runs on the WS thread)"""
+    trader = traders.get(sym)
+    if trader is not None:
+        trader.on_price(price, received_at)
+
+def run_stop_tick():
+    if market_stream is not None and market_stream.connected.is_set():
+        return                              # streamed mids already ran the stops as they arrived
+    if not any(trader.state.position_open for trader in traders.values()):
+        return
+    received_at = time.perf_counter()
+    try:
+        mids = get_mids(SYMBOLS)            # one allMids request for every symbol, no user_state
+    except ApiError as e:
+        log_print(f"Stop check skipped — {type(e).__name__}: {e}", "WARNING")
+        return
+    for sym, trader in traders.items():
+        try:
+            if sym in mids:
+                trader.check_stops(mids[sym], received_at)
+        except Exception as e:
+            log_print(f"{sym} STOP CHECK CRASH: {e}", "ERROR")
+
+def run_tick(kind):
+    """One scheduler tick. Bar ticks read the account (one user_state, shared by every lookup);
+    stop ticks only fetch mids, the dashboard keeps the balance from the last bar tick."""
+    if kind == "bar":
+        account.invalidate()
+        run_bar_tick()
+    else:
+        run_stop_tick()
+
+    # Dashboard update (account-wide)
+    with metrics.stage("dashboard"):
+        if kind == "bar":
+            try:
+                state.dashboard_data["usdt_balance"] = get_balance()
+            except ApiError:
+                pass                                # keep showing the last known balance
+        state.dashboard_data.update({
+            "last_update": clock.utcnow().strftime("%H:%M:%S"),
+            "latency": default_executor.stats.summary(),
+            "scheduler": scheduler.summary(),
+        })
+        hub.publish(snapshot.build())    # one build + encode per tick, shared by every viewer
+
+def start_profiling():
+    """Requested via BOT_PROFILE_TICKS or /profile — the profiler is imported only now.
+    Returns the session, or None if it couldn't start (the bot keeps trading either way)."""
+    ticks = state.profiling['requested']
+    state.profiling.update(requested=0, active=True)
+    try:
+        from profiler import ProfileSession
+        session = ProfileSession(ticks, threading.current_thread())
+    except Exception as e:
+        state.profiling['active'] = False
+        log_print(f"PROFILING failed to start: {e}", "ERROR")
+        return None
+    log_print(f"PROFILING next {ticks} ticks", "INFO")
+    return session
+
+def stop_profiling(session):
+    try:
+        out_dir = session.finish()
+    except Exception as e:
+        state.profiling['active'] = False
+        log_print(f"PROFILE not written: {e}", "ERROR")
+        return
+    state.profiling.update(active=False, last=out_dir)
+    log_print(f"PROFILE written to {out_dir}", "INFO")
 
 def run_bot():
-    global last_price_log, pending_trade
-
+    profile = None
     while not stop_event.is_set():
+        streaming = market_stream is not None and market_stream.connected.is_set()
+        tick = scheduler.wait(stop_event, market_stream.bar_closed if streaming else None)
+        if tick is None:
+            break
+        if profile is None and state.profiling['requested'] > 0:
+            profile = start_profiling()
+        if profile is not None:
+            profile.begin_tick()
         try:
-            df = fetch_ohlcv()
-            if df.empty or len(df) < MA_LONG + 20:
-                time.sleep(CHECK_INTERVAL)
-                continue
-
-            collect_all_candles(one_m_df=df)
-            current_price = df['close'].iloc[-1]
-            signal, trend_str, cross_type = detect_cross(df, cross_history, state.last_trend)
-
-            if getattr(state, 'last_trend', None) != trend_str:
-                log_print(f"TREND → {trend_str}", "INFO")
-                state.last_trend = trend_str
-
-            # Price log
-            if PRICE_LOG_INTERVAL > 0 and (datetime.now(timezone.utc) - last_price_log).total_seconds() >= PRICE_LOG_INTERVAL:
-                rsi_val = df['rsi'].iloc[-1] if 'rsi' in df.columns else 0.0
-                pnl_pct, pnl_usd = get_unrealized_pnl() if state.position_open else (0.0, 0.0)
-                log_print(f"Price ${current_price:.3f} │ RSI {rsi_val:.1f} │ Balance: ${get_balance():.2f} │ Pos: {get_position():.4f} {SYMBOL} │ PnL: {pnl_pct:+.1f}% │ {trend_str}")
-                last_price_log = datetime.now(timezone.utc)
-
-            # Trailing PnL stop
-            if TRAILING_PNL_ENABLED and state.position_open:
-                qty = get_position()
-                if qty >= MIN_SIZE:
-                    current_pnl_pct, _ = get_unrealized_pnl()
-                    if not hasattr(state, 'peak_pnl_pct') or current_pnl_pct > state.peak_pnl_pct:
-                        state.peak_pnl_pct = current_pnl_pct
-                    if current_pnl_pct <= state.peak_pnl_pct + TRAILING_PNL_PCT:
-                        log_print(f"TRAILING STOP HIT @ {current_pnl_pct:+.1f}%", "INFO")
-                        close_position()
-
-            # Close on opposite signal
-            if state.position_open:
-                if (state.position_side == "long" and signal == "short") or \
-                   (state.position_side == "short" and signal == "buy"):
-                    close_position()
-
-            # Open new position
-            if not state.position_open and signal in ("buy", "short"):
-                qty = calculate_dynamic_qty(current_price)
-                side = "long" if signal == "buy" else "short"
-                pending_trade = {
-                    "type": side,
-                    "qty": qty,
-                    "expires": datetime.now(timezone.utc) + timedelta(minutes=2)
-                }
-                log_print(f"GOLDEN/DEATH CROSS — PENDING {side.upper()} {qty} {SYMBOL}", "INFO")
-
-            # Execute pending trade instantly if possible
-            if pending_trade and datetime.now(timezone.utc) < pending_trade["expires"]:
-                qty = pending_trade["qty"]
-                if pending_trade["type"] == "long" and enough_usdt(TRADE_USDT)[0]:
-                    place_long(qty)
-                    pending_trade = None
-                elif pending_trade["type"] == "short" and enough_usdt(TRADE_USDT)[0]:
-                    place_short(qty)
-                    pending_trade = None
-            elif pending_trade:
-                log_print("PENDING TRADE EXPIRED", "WARNING")
-                pending_trade = None
-
-            # Dashboard update
-            state.dashboard_data.update({
-                "last_update": datetime.now(timezone.utc).strftime("%H:%M:%S"),
-                "price": current_price,
-                "trend": trend_str,
-                "usdt_balance": get_balance(),
-                "ltc_position": get_position(),
-            })
-            state.last_signal = signal or "None"
-
-            time.sleep(CHECK_INTERVAL)
-
+            run_tick(tick.kind)
         except Exception as e:
             log_print(f"CRASH: {e}", "ERROR")
-            time.sleep(10)
+        finally:
+            hub.beat()                       # liveness for the dashboard, even if this tick crashed
+            persist.flush()                  # everything this tick changed → one atomic write per file
+            scheduler.finish(tick)
+            metrics.TICK_SECONDS.observe(tick.duration_ms / 1000, tick.kind)
+            metrics.TICK_LAG_SECONDS.observe(tick.lag_ms / 1000, tick.kind)
+            if profile is not None:
+                profile.end_tick(tick.kind)
+                if profile.done:
+                    stop_profiling(profile)
+                    profile = None
+            level = "WARNING" if tick.lag_ms > 5000 else "DEBUG"
+            log_print(f"{tick.kind.upper()} TICK lag {tick.lag_ms:.0f}ms │ took {tick.duration_ms:.0f}ms │ "
+                      f"clock offset {scheduler.skew.offset_ms:+.0f}ms", level)
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
     log_print("=== HYPERLIQUID BOT STARTED — @DustsCapital ===", "INFO")
-    log_print(f"Startup Balance: ${get_balance():.2f} | Leverage: {current_leverage}× (pre-trade; updates post-open) | Symbol: {SYMBOL}", "INFO")
+    setup()
+    threading.Thread(target=warm_up, daemon=True, name="warm-up").start()
+
+    if USE_WEBSOCKET:
+        market_stream = MarketStream(WS_URL or ws_url_for(BASE_URL), TIMEFRAME, API_WALLET_ADDRESS, candle_buffers, account, scheduler.skew)
+        market_stream.mid_listeners.append(on_mid)     # stops evaluated on every mid push
+        market_stream.start()
 
     bot_thread = threading.Thread(target=run_bot, daemon=False)
     bot_thread.start()
+    log_print(f"Ready in {metrics.process_age() * 1000:.0f} ms (process start → bot loop running)", "INFO")
 
     import logging
+    from dashboard import app                # Flask is only needed once the bot is already running
     logging.getLogger("werkzeug").setLevel(logging.ERROR)
     app.run(host="0.0.0.0", port=5000, threaded=True)
@@ -0,0 +1,160 @@
+# market_stream.py — optional WebSocket feed (candles, mids, fills) pushed into the candle buffer
+import json
+import random
+import threading
+import time
+import websocket
+from logger import log_print
+from metrics import API_RETRIES
+
+def ws_url_for(base_url):
+    """https://api.hyperliquid.xyz → wss://api.hyperliquid.xyz/ws (same rule as the SDK)"""
+    return "ws" + base_url[len("http"):] + "/ws"
+
+
+class MarketStream(threading.Thread):
+    """Subscribes to candle (one per symbol) / allMids / userFills / userEvents and
+    keeps the candle buffers and account snapshot current without polling.
+
+    - every candle push is merged into that symbol's buffer; when a new bar opens,
+      `bar_closed` is set so run_bot() can evaluate immediately
+    - fills and user events invalidate the account snapshot
+    - on disconnect the buffer falls back to REST (`live = False`), we reconnect
+      with jittered backoff and backfill the gap through REST before going live again
+    """
+
+    PING_INTERVAL = 50          # server drops idle connections after 60s
+
+    def __init__(self, ws_url, interval, address, candle_buffers, account=None, skew=None):
+        super().__init__(daemon=True, name="market-stream")
+        self.ws_url = ws_url
+        self.interval = interval
+        self.address = address
+        self.candle_buffers = candle_buffers      # {symbol: CandleBuffer}
+        self.account = account
+        self.skew = skew                # scheduler.ClockSkew fed with pushed bar opens
+        self.bar_closed = threading.Event()
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.mids = {}
+        self.mid_listeners = []         # callables(symbol, price, received_at) run on every allMids push for our symbols
+        self.last_msg_at = None
+        self.reconnects = 0
+        self.ws = None
+
+    # === LIFECYCLE ===
+    def run(self):
+        backoff = 1.0
+        while not self.stop_event.is_set():
+            self.ws = websocket.WebSocketApp(
+                self.ws_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda _ws, e: log_print(f"WS error: {e}", "WARNING"),
+                on_close=lambda *_: None,
+            )
+            started = time.monotonic()
+            self.ws.run_forever(ping_interval=0)
+            self._went_offline()
+            if self.stop_event.is_set():
+                break
+            if time.monotonic() - started > 60:
+                backoff = 1.0           # the connection was healthy for a while → start over
+            delay = backoff * (0.5 + random.random())
+            log_print(f"WS disconnected — reconnecting in {delay:.1f}s", "WARNING")
+            self.stop_event.wait(delay)
+            backoff = min(backoff * 2, 60.0)
+            self.reconnects += 1
+            API_RETRIES.inc("ws_reconnect")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.ws:
+            self.ws.close()
+
+    def wait_for_bar_close(self, timeout):
+        """Block until a bar closes (or timeout). Returns True if a bar closed."""
+        fired = self.bar_closed.wait(timeout)
+        self.bar_closed.clear()
+        return fired
+
+    # === HANDLERS ===
+    def _on_open(self, ws):
+        subs = [{"type": "candle", "coin": sym, "interval": self.interval} for sym in self.candle_buffers]
+        subs.append({"type": "allMids"})
+        if self.address:
+            subs += [{"type": "userFills", "user": self.address}, {"type": "userEvents", "user": self.address}]
+        for sub in subs:
+            ws.send(json.dumps({"method": "subscribe", "subscription": sub}))
+        threading.Thread(target=self._ping_loop, args=(ws,), daemon=True).start()
+
+        # Anything that happened while we were offline comes from REST, then go live
+        for buf in self.candle_buffers.values():
+            self._backfill(buf)
+            buf.live = True
+        self.connected.set()
+        log_print(f"WS connected — streaming {', '.join(self.candle_buffers)} {self.interval}", "INFO")
+
+    def _ping_loop(self, ws):
+        while not self.stop_event.wait(self.PING_INTERVAL):
+            if not ws.keep_running:
+                return
+            try:
+                ws.send(json.dumps({"method": "ping"}))
+            except Exception:
+                return
+
+    def _went_offline(self):
+        self.connected.clear()
+        for buf in self.candle_buffers.values():
+            buf.live = False
+        if self.account:
+            self.account.invalidate()
+
+    def _backfill(self, buf):
+        try:
+            buf.update()
+        except Exception as e:
+            log_print(f"WS backfill failed for {buf.symbol}: {e}", "WARNING")
+
+    def _on_message(self, _ws, message):
+        received_at = time.perf_counter()       # stop-trigger latency is measured from here
+        self.last_msg_at = time.time()
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return                      # "Websocket connection established." banner
+        channel = msg.get("channel")
+        data = msg.get("data")
+
+        if channel == "candle":
+            buf = self.candle_buffers.get(data.get("s"))
+            if buf is None or data.get("i") != self.interval:
+                return
+            kind = buf.apply_bar(data)
+            if kind == "gap":
+                self._backfill(buf)
+                kind = "new"
+            if kind == "new":
+                if self.skew:
+                    self.skew.observe_bar(int(data['t']))
+                self.bar_closed.set()
+
+        elif channel == "allMids":
+            mids = data.get("mids", {})
+            for sym in self.candle_buffers:
+                px = mids.get(sym)
+                if px is None:
+                    continue
+                self.mids[sym] = float(px)
+                for listener in self.mid_listeners:
+                    try:
+                        listener(sym, self.mids[sym], received_at)
+                    except Exception as e:
+                        log_print(f"Mid listener failed: {e}", "WARNING")
+
+        elif channel in ("userFills", "user"):
+            if isinstance(data, dict) and data.get("isSnapshot"):
+                return
+            if self.account:
+                self.account.invalidate()
@@ -0,0 +1,79 @@
+# meta_cache.py — exchange metadata (perp/spot universe: szDecimals, minSize, asset ids) cached on disk
+#
+# Startup reads saves/meta_cache.json instead of calling the API. A copy older than META_CACHE_TTL
+# is still used straight away and refreshed on a background thread; only a first run with no
+# cache at all waits for the API (META_FETCH_TIMEOUT per attempt, see transport.py).
+import os
+import threading
+import time
+from config import BASE_URL, META_CACHE_TTL, META_FETCH_TIMEOUT
+from logger import log_print
+from persist import atomic_write_json, load_json
+
+CACHE_FILE = os.path.join("saves", "meta_cache.json")
+
+def fetch_info(kind, base_url=BASE_URL, timeout=META_FETCH_TIMEOUT):
+    """One /info request without building a full SDK client"""
+    from hyperliquid.api import API
+    from transport import attach
+    return attach(API(base_url, timeout=timeout)).post("/info", {"type": kind})
+
+
+class MetaCache:
+    """{kind: doc} for "meta" / "spotMeta", each with the wall time it was fetched"""
+
+    def __init__(self, path=CACHE_FILE, ttl=META_CACHE_TTL, fetch=fetch_info):
+        self.path = path
+        self.ttl = ttl
+        self.fetch = fetch
+        self.docs = None            # kind → {"fetched": epoch s, "data": ...}; None until first read
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.docs is None:
+            data, _ = load_json(self.path)
+            self.docs = data if isinstance(data, dict) else {}
+
+    def get(self, kind):
+        with self.lock:
+            self._load()
+            entry = self.docs.get(kind)
+        if entry is None:
+            return self.refresh(kind)               # nothing cached yet → have to wait for it
+        if time.time() - entry["fetched"] > self.ttl:
+            self.refresh_in_background(kind)
+        return entry["data"]
+
+    def refresh(self, kind):
+        data = self.fetch(kind)
+        with self.lock:
+            self._load()
+            self.docs[kind] = {"fetched": time.time(), "data": data}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                atomic_write_json(self.path, self.docs)
+            except OSError as e:
+                log_print(f"Metadata cache not saved: {e}", "WARNING")
+        return data
+
+    def refresh_in_background(self, kind):
+        with self.lock:
+            if kind in self.refreshing:
+                return
+            self.refreshing.add(kind)
+
+        def run():
+            try:
+                self.refresh(kind)
+                log_print(f"Exchange {kind} refreshed", "DEBUG")
+            except Exception as e:
+                log_print(f"Exchange {kind} refresh failed (keeping the cached copy): {e}", "WARNING")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(kind)
+
+        threading.Thread(target=run, daemon=True, name=f"{kind}-refresh").start()
+
+
+cache = MetaCache()
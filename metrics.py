@@ -0,0 +1,204 @@
+# metrics.py — tiny in-process metrics registry rendered in Prometheus text format (/metrics)
+#
+# No prometheus_client dependency: counters, gauges and histograms are plain
+# dicts keyed by label values. A sample is a dict lookup + a couple of adds
+# under a lock (~1 µs, see `python benchmark.py metrics`).
+import os
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _fmt_labels(names, values, extra=""):
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v):
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        with self.lock:
+            items = list(self.values.items())
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), fn=None):
+        super().__init__(name, help_text, labels)
+        self.fn = fn                    # optional callback → value (or {labels: value}) read at scrape time
+
+    def set(self, value, *labels):
+        self.values[labels] = value     # single dict store, atomic under the GIL
+
+    def render(self):
+        values = dict(self.values)
+        if self.fn is not None:
+            got = self.fn()
+            values.update(got if isinstance(got, dict) else {(): got})
+        return self.header() + [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}"
+                                for k, v in values.items() if v is not None]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.values.get(labels)
+            if row is None:
+                row = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            row[0][i] += 1
+            row[1] += value
+            row[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self.lock:
+            items = [(k, (list(r[0]), r[1], r[2])) for k, r in self.values.items()]
+        lines = self.header()
+        for k, (counts, total, n) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {running}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {_num(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {n}")
+        return lines
+
+
+class _Timer:
+    """with hist.time("fetch"): ...  → observes elapsed seconds"""
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, *self.labels)
+        return False
+
+
+registry = []
+
+def render():
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# === PROCESS ===
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024    # peak, Linux units
+
+
+def process_age():
+    """Seconds since this process was started (includes interpreter start + imports)"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time() - _IMPORTED          # non-Linux: from when metrics was imported
+
+_IMPORTED = time.time()
+
+
+# === BOT METRICS ===
+TICK_SECONDS = Histogram("bot_tick_seconds", "Whole tick duration", ["kind"])
+STAGE_SECONDS = Histogram("bot_stage_seconds", "Tick time per stage", ["stage"])
+TICK_LAG_SECONDS = Histogram("bot_tick_lag_seconds", "How late the scheduler woke for a tick", ["kind"],
+                             buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0))
+API_SECONDS = Histogram("hl_api_request_seconds", "Hyperliquid HTTP latency", ["endpoint"])
+API_ERRORS = Counter("hl_api_errors_total", "Hyperliquid HTTP errors", ["endpoint", "error"])
+API_RETRIES = Counter("hl_api_retries_total", "Retried Hyperliquid requests / reconnects", ["what"])
+API_THROTTLE_SECONDS = Histogram("hl_api_throttle_seconds", "Wait for rate-limit budget before a request", ["priority"])
+ORDER_SECONDS = Histogram("bot_order_latency_seconds", "Order execution phases", ["phase"])
+STOP_TRIGGER_SECONDS = Histogram("bot_stop_trigger_seconds", "Price update received → close order queued", ["rule"],
+                                 buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25, 1.0))
+CANDLE_AGE = Gauge("bot_candle_age_seconds", "Age of the newest bar we hold (forming bar open → now)", ["symbol"])
+RSS = Gauge("process_resident_memory_bytes", "Resident set size", fn=rss_bytes)
+STARTED = Gauge("process_start_time_seconds", "Start time since epoch")
+STARTED.set(time.time())
+
+stage = STAGE_SECONDS.time
+
+
+# === HYPERLIQUID CLIENT INSTRUMENTATION ===
+def _endpoint(url_path, payload):
+    payload = payload or {}
+    kind = payload.get("type")
+    if kind is None and isinstance(payload.get("action"), dict):
+        kind = payload["action"].get("type")
+    return f"{url_path}:{kind}" if kind else url_path
+
+def instrument(client):
+    """Wrap an SDK Info/Exchange instance's post() with latency + error metrics"""
+    post = client.post
+    if getattr(post, "_instrumented", False):
+        return client
+
+    def timed_post(url_path, payload=None):
+        endpoint = _endpoint(url_path, payload)
+        t0 = time.perf_counter()
+        try:
+            return post(url_path, payload)
+        except Exception as e:
+            API_ERRORS.inc(endpoint, type(e).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - t0, endpoint)
+
+    timed_post._instrumented = True
+    client.post = timed_post
+    return client
@@ -0,0 +1,296 @@
+# paper.py — simulated Hyperliquid account: the Exchange/Info subset the bot uses, fills against a modelled book
+#
+# PAPER_TRADING = True (or BOT_PAPER=1): market data still comes from the real Info (or a replay tape),
+# orders, balances, positions, fees, funding and margin are simulated in memory. No key needed.
+#
+#   python paper.py compare <tape...> --variant base= --variant fast="MA_SHORT=20,MA_LONG=100" [--jobs N]
+#
+# runs every variant over the same recorded market in its own process (simulated clock, full speed)
+# and prints them side by side.
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import clock
+from config import (PAPER_BALANCE, PAPER_TAKER_FEE, PAPER_FUNDING_RATE, PAPER_LEVERAGE,
+                    PAPER_BOOK_DEPTH_USD, PAPER_BOOK_STEP_BPS, PAPER_SPREAD_BPS, check_overrides)
+
+HOUR = 3600
+
+class PaperInfo:
+    """Info stand-in: market data from `market`, account data from the paper account"""
+
+    def __init__(self, market, account):
+        self.market = market
+        self.account = account
+
+    def __getattr__(self, name):            # meta, candles_snapshot, l2_snapshot, ... → real market data
+        return getattr(self.market, name)
+
+    def user_state(self, address=None, dex=""):
+        return self.account.user_state()
+
+
+class PaperExchange:
+    """Exchange stand-in. Market orders walk a synthetic book around the mid:
+    `spread_bps` between best bid and ask, then a level every `step_bps` holding `depth_usd`
+    of notional each. Orders are IOC like the SDK's market orders, so whatever lies beyond the
+    slippage limit stays unfilled. Cross margin, one-way positions, hourly funding."""
+
+    def __init__(self, market, balance=PAPER_BALANCE, taker_fee=PAPER_TAKER_FEE, funding_rate=PAPER_FUNDING_RATE,
+                 leverage=PAPER_LEVERAGE, depth_usd=PAPER_BOOK_DEPTH_USD, step_bps=PAPER_BOOK_STEP_BPS,
+                 spread_bps=PAPER_SPREAD_BPS):
+        self.market = market
+        self.info = PaperInfo(market, self)
+        self.cash = float(balance)
+        self.taker_fee = taker_fee
+        self.funding_rate = funding_rate            # per hour, longs pay shorts when positive
+        self.default_leverage = leverage
+        self.depth_usd = depth_usd
+        self.step_bps = step_bps
+        self.spread_bps = spread_bps
+        self.positions = {}         # coin → {"szi", "entry", "leverage", "funding"}
+        self.leverage = {}          # coin → leverage set with update_leverage
+        self.fills = []             # (ms, coin, side, size, avg px, fee)
+        self.totals = {"fees": 0.0, "funding": 0.0, "realized": 0.0, "volume": 0.0, "liquidations": 0}
+        self.oid = 0
+        self.funded_until = None    # funding settled up to this hour (epoch s)
+        self.liquidation_listeners = []     # callables(coin, size, px) once a position was liquidated
+        self.lock = threading.RLock()
+
+    # === MARKET ===
+    def mid(self, coin, mids=None):
+        return float((mids or self.market.all_mids())[coin])
+
+    def _walk(self, coin, is_buy, sz, limit_px):
+        """(filled size, avg px) walking the modelled book up to limit_px"""
+        mid = self.mid(coin)
+        side = 1 if is_buy else -1
+        left, cost, level = sz, 0.0, 0
+        while left > 1e-12:
+            px = mid * (1 + side * (self.spread_bps / 2 + level * self.step_bps) / 1e4)
+            if limit_px is not None and (px > limit_px if is_buy else px < limit_px):
+                break
+            take = min(left, self.depth_usd / px)
+            cost += take * px
+            left -= take
+            level += 1
+        filled = sz - left
+        return filled, (cost / filled if filled > 0 else 0.0)
+
+    # === ACCOUNT ===
+    def _settle_funding(self):
+        hour = int(clock.now() // HOUR) * HOUR
+        if self.funded_until is None:
+            self.funded_until = hour
+        mids = self.market.all_mids() if self.positions and self.funded_until < hour else None
+        while self.funded_until < hour:
+            self.funded_until += HOUR
+            for coin, pos in self.positions.items():
+                pay = pos["szi"] * self.mid(coin, mids) * self.funding_rate
+                pos["funding"] += pay
+                self.cash -= pay
+                self.totals["funding"] += pay
+
+    def _leverage(self, coin):
+        return self.leverage.get(coin, self.default_leverage)
+
+    def _summary(self):
+        value, ntl, margin, rows = self.cash, 0.0, 0.0, []
+        mids = self.market.all_mids() if self.positions else None     # one request however many positions
+        for coin, pos in self.positions.items():
+            mid = self.mid(coin, mids)
+            notional = abs(pos["szi"]) * mid
+            upnl = (mid - pos["entry"]) * pos["szi"]
+            used = notional / pos["leverage"]
+            value += upnl
+            ntl += notional
+            margin += used
+            rows.append((coin, pos, mid, notional, upnl, used))
+        return value, ntl, margin, rows
+
+    def _check_liquidation(self):
+        """Maintenance margin = half the initial margin; below it everything is closed at the mid"""
+        value, _, margin, rows = self._summary()
+        if rows and value < margin / 2:
+            for coin, pos, mid, *_ in rows:
+                self._apply(coin, -pos["szi"], mid, fee=abs(pos["szi"]) * mid * self.taker_fee)
+            self.totals["liquidations"] += 1
+            for coin, pos, mid, *_ in rows:         # the bot didn't place these → tell it its position is gone
+                for listener in self.liquidation_listeners:
+                    listener(coin, abs(pos["szi"]), mid)
+
+    def _refresh(self):
+        with self.lock:
+            self._settle_funding()
+            self._check_liquidation()
+
+    def _apply(self, coin, signed_sz, px, fee):
+        pos = self.positions.get(coin)
+        szi = pos["szi"] if pos else 0.0
+        new = round(szi + signed_sz, 10)
+        if pos and (szi > 0) != (signed_sz > 0):            # reducing / flipping → realise PnL on the closed part
+            closed = min(abs(signed_sz), abs(szi))
+            pnl = (px - pos["entry"]) * closed * (1 if szi > 0 else -1)
+            self.cash += pnl
+            self.totals["realized"] += pnl
+        self.cash -= fee
+        self.totals["fees"] += fee
+        self.totals["volume"] += abs(signed_sz) * px
+        if abs(new) < 1e-10:
+            self.positions.pop(coin, None)
+        elif pos is None or (szi > 0) != (new > 0):          # new position or flipped through zero
+            self.positions[coin] = {"szi": new, "entry": px, "leverage": self._leverage(coin), "funding": 0.0}
+        elif abs(new) > abs(szi):                            # adding → average entry
+            pos["entry"] = (pos["entry"] * abs(szi) + px * abs(signed_sz)) / abs(new)
+            pos["szi"] = new
+        else:
+            pos["szi"] = new
+
+    # === EXCHANGE API (SDK signatures / response shapes) ===
+    def _order(self, coin, is_buy, sz, limit_px, reduce_only):
+        with self.lock:
+            self._settle_funding()
+            pos = self.positions.get(coin)
+            szi = pos["szi"] if pos else 0.0
+            if reduce_only:
+                if szi == 0 or (szi > 0) == is_buy:
+                    return _status({"error": "Reduce only order would increase position."})
+                sz = min(sz, abs(szi))
+            filled, avg_px = self._walk(coin, is_buy, sz, limit_px)
+            if filled <= 0:
+                return _status({"error": "Order could not immediately match against any resting orders."})
+
+            signed = filled if is_buy else -filled
+            if abs(szi + signed) > abs(szi):                 # opens or adds exposure → needs initial margin
+                value, _, margin, _ = self._summary()
+                opening = (abs(szi + signed) - abs(szi)) if (szi + signed) * szi >= 0 else abs(szi + signed)
+                need = opening * avg_px / self._leverage(coin) + filled * avg_px * self.taker_fee
+                if value - margin < need:
+                    return _status({"error": "Insufficient margin to place order."})
+
+            fee = filled * avg_px * self.taker_fee
+            self._apply(coin, signed, avg_px, fee)
+            self.oid += 1
+            self.fills.append((int(clock.now() * 1000), coin, "buy" if is_buy else "sell", filled, avg_px, fee))
+            return _status({"filled": {"totalSz": str(round(filled, 10)), "avgPx": str(avg_px), "oid": self.oid}})
+
+    def market_open(self, name, is_buy, sz, px=None, slippage=0.05, cloid=None, builder=None):
+        limit = (px or self.mid(name)) * ((1 + slippage) if is_buy else (1 - slippage))
+        return self._order(name, is_buy, sz, limit, reduce_only=False)
+
+    def market_close(self, coin, sz=None, px=None, slippage=0.05, cloid=None, builder=None):
+        pos = self.positions.get(coin)
+        if not pos:
+            return None                                      # same as the SDK with no open position
+        is_buy = pos["szi"] < 0
+        limit = (px or self.mid(coin)) * ((1 + slippage) if is_buy else (1 - slippage))
+        return self._order(coin, is_buy, sz or abs(pos["szi"]), limit, reduce_only=True)
+
+    def update_leverage(self, leverage, name, is_cross=True):
+        with self.lock:
+            self.leverage[name] = int(leverage)
+        return {"status": "ok", "response": {"type": "default"}}
+
+    def user_state(self):
+        self._refresh()
+        with self.lock:
+            value, ntl, margin, rows = self._summary()
+            positions = []
+            for coin, pos, mid, notional, upnl, used in rows:
+                positions.append({"type": "oneWay", "position": {
+                    "coin": coin, "szi": str(pos["szi"]), "entryPx": str(pos["entry"]),
+                    "positionValue": str(notional), "unrealizedPnl": str(upnl),
+                    "returnOnEquity": str(upnl / (abs(pos["szi"]) * pos["entry"] / pos["leverage"])),
+                    "leverage": {"type": "cross", "value": pos["leverage"]}, "marginUsed": str(used),
+                    "cumFunding": {"sinceOpen": str(pos["funding"])},
+                }})
+            summary = {"accountValue": str(value), "totalNtlPos": str(ntl), "totalRawUsd": str(self.cash),
+                       "totalMarginUsed": str(margin)}
+            return {"marginSummary": summary, "crossMarginSummary": summary,
+                    "withdrawable": str(max(0.0, value - margin)), "assetPositions": positions,
+                    "time": int(clock.now() * 1000)}
+
+    def stats(self):
+        """Account totals for reports"""
+        with self.lock:
+            value, _, _, _ = self._summary()
+            return dict(self.totals, cash=round(self.cash, 6), equity=round(value, 6), fills=len(self.fills),
+                        open_positions={c: p["szi"] for c, p in self.positions.items()})
+
+def _status(status):
+    return {"status": "ok", "response": {"type": "order", "data": {"statuses": [status]}}}
+
+
+# === SIDE-BY-SIDE VARIANTS ===
+def parse_variant(text):
+    """'fast=MA_SHORT=20,MA_LONG=100' → ("fast", {"MA_SHORT": 20, "MA_LONG": 100})"""
+    name, _, spec = text.partition("=")
+    overrides = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        try:
+            overrides[key.strip()] = json.loads(value)
+        except ValueError:
+            overrides[key.strip()] = value
+    return name, overrides
+
+def compare(tapes, variants, out_root, jobs=None, hours=None):
+    """Replay `tapes` once per variant (own process, own paper account) → {name: summary}"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, overrides in variants:            # fail here, not in N child processes
+        try:
+            check_overrides(overrides)
+        except ValueError as e:
+            raise ValueError(f"variant {name}: {e}") from None
+
+    def run_one(item):
+        name, overrides = item
+        out = os.path.join(out_root, name)
+        env = dict(os.environ, BOT_PAPER="1", BOT_CONFIG=json.dumps(overrides))
+        cmd = [sys.executable, os.path.join(here, "replay.py"), *tapes, "--out", out]
+        if hours:
+            cmd += ["--hours", str(hours)]
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            raise RuntimeError(f"variant {name} failed:\n{proc.stderr[-2000:]}")
+        with open(os.path.join(out, "replay_summary.json")) as f:
+            return name, json.load(f)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        return dict(pool.map(run_one, variants))
+
+def print_comparison(results):
+    print(f"{'variant':<14}{'fills':>6}{'volume $':>11}{'fees $':>9}{'funding $':>10}{'realized $':>11}"
+          f"{'equity $':>11}{'liqs':>5}{'wall s':>8}")
+    for name, s in results.items():
+        p = s["paper"]
+        print(f"{name:<14}{p['fills']:>6}{p['volume']:>11.2f}{p['fees']:>9.4f}{p['funding']:>10.4f}"
+              f"{p['realized']:>11.4f}{p['equity']:>11.4f}{p['liquidations']:>5}{s['wall_seconds']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paper trading")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compare", help="run strategy variants side by side over recorded market data")
+    c.add_argument("tapes", nargs="+")
+    c.add_argument("--variant", action="append", default=[], help='name=KEY=VALUE,KEY=VALUE (config overrides)')
+    c.add_argument("--jobs", type=int)
+    c.add_argument("--hours", type=float)
+    c.add_argument("--out", default=os.path.join("saves", "paper"))
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.tapes:
+        paths += sorted(glob.glob(os.path.join(p, "*.jsonl.gz"))) if os.path.isdir(p) else [p]
+    variants = [parse_variant(v) for v in args.variant] or [("base", {})]
+    try:
+        results = compare([os.path.abspath(p) for p in paths], variants, os.path.abspath(args.out), args.jobs, args.hours)
+    except ValueError as e:
+        parser.error(str(e))
+    print_comparison(results)
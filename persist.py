@@ -0,0 +1,84 @@
+# persist.py — crash-safe JSON files: temp + fsync + rename, coalesced to one write per file per tick
+import json
+import os
+import shutil
+import threading
+from logger import log_print
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return                          # e.g. Windows: directories can't be opened
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write_json(path, data):
+    """Replace `path` so a crash at any point leaves either the old or the new file intact.
+
+    path.tmp is written and fsynced first; the current file is kept as path.bak
+    (last good snapshot) and the new one renamed into place.
+    """
+    tmp, bak = path + ".tmp", path + ".bak"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        os.replace(path, bak)
+    os.replace(tmp, path)
+    _fsync_dir(path)
+
+def load_json(path):
+    """(data, source) from the newest readable copy: path, then path.tmp (finished write
+    whose rename didn't happen), then path.bak. (None, None) if nothing is usable."""
+    for candidate in (path, path + ".tmp", path + ".bak"):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, 'r') as f:
+                return json.load(f), candidate
+        except (json.JSONDecodeError, ValueError, OSError):
+            if candidate == path:
+                shutil.copyfile(path, path + ".corrupt")     # keep the evidence, never overwrite it silently
+                log_print(f"{path} is corrupt — saved as {path}.corrupt, trying the last good copy", "ERROR")
+    return None, None
+
+
+class Persister:
+    """Collects save requests and writes each file once on flush().
+
+    Several changes in one tick (cross detected, position opened, profit updated)
+    end up as a single write of the latest data. `producer` is called at flush
+    time so it always serialises the current values.
+    """
+
+    def __init__(self):
+        self.dirty = {}                 # path → producer()
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.writes = 0
+
+    def mark(self, path, producer):
+        with self.lock:
+            self.dirty[path] = producer
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                pending, self.dirty = self.dirty, {}
+            for path, producer in pending.items():
+                try:
+                    atomic_write_json(path, producer())
+                    self.writes += 1
+                except Exception as e:
+                    log_print(f"Save failed for {path}: {e}", "ERROR")
+                    with self.lock:
+                        self.dirty.setdefault(path, producer)   # retry on the next flush
+            return len(pending)
+
+
+writer = Persister()
+flush = writer.flush
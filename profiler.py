@@ -0,0 +1,138 @@
+# profiler.py — capture N ticks of run_bot(): sampled stacks (flamegraph-ready) + tracemalloc
+#
+# Only imported once profiling is requested (BOT_PROFILE_TICKS=N or /profile?ticks=N),
+# so a normal run never loads it. Output lands in saves/profiles/<timestamp>/:
+#   stacks.folded   collapsed stacks ("thread;outer;inner count") → flamegraph.pl / speedscope
+#   summary.txt     tick times + top functions by self / total samples (bot thread)
+#   alloc.txt       tracemalloc: growth over the capture, top allocation sites by line and by call stack
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILES_DIR = os.path.join("saves", "profiles")
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """Samples every thread's stack every `interval` s while a tick is running."""
+
+    def __init__(self, ticks, bot_thread, interval=0.005, alloc_frames=25):
+        self.ticks_left = ticks
+        self.ticks = ticks
+        self.bot_ident = bot_thread.ident
+        self.interval = interval
+        self.stacks = Counter()
+        self.tick_times = []
+        self.in_tick = threading.Event()
+        self.stopped = threading.Event()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start(alloc_frames)
+        self.baseline = tracemalloc.take_snapshot()
+        self.out_dir = os.path.join(PROFILES_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.sampler = threading.Thread(target=self._sample_loop, daemon=True, name="profiler")
+        self.sampler.start()
+
+    @property
+    def done(self):
+        return self.ticks_left <= 0
+
+    # === TICKS ===
+    def begin_tick(self):
+        tracemalloc.reset_peak()
+        self._mem0 = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        self.in_tick.set()
+
+    def end_tick(self, kind="bar"):
+        self.in_tick.clear()
+        peak_kib = (tracemalloc.get_traced_memory()[1] - self._mem0) / 1024
+        self.tick_times.append((kind, (time.perf_counter() - self._t0) * 1000, peak_kib))
+        self.ticks_left -= 1
+
+    # === SAMPLING ===
+    def _sample_loop(self):
+        me = threading.get_ident()
+        names = {}
+        while not self.stopped.is_set():
+            if not self.in_tick.wait(0.1):
+                continue
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    t = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = "bot" if ident == self.bot_ident else (t.name if t else str(ident))
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names[ident])
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    # === OUTPUT ===
+    def finish(self):
+        """Stop sampling, write the files, return the output directory"""
+        self.stopped.set()
+        self.in_tick.set()
+        self.sampler.join(timeout=2)
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, "stacks.folded"), "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        self._write_summary(os.path.join(self.out_dir, "summary.txt"))
+        if snapshot is not None:
+            self._write_alloc(snapshot, os.path.join(self.out_dir, "alloc.txt"))
+        return self.out_dir
+
+    def _write_summary(self, path):
+        own, total, samples = Counter(), Counter(), 0
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            if frames[0] != "bot":
+                continue
+            samples += n
+            own[frames[-1]] += n
+            for name in set(frames[1:]):
+                total[name] += n
+
+        with open(path, "w") as f:
+            f.write(f"{len(self.tick_times)} ticks profiled, {samples} samples of the bot thread "
+                    f"every {self.interval * 1000:.0f} ms\n\n")
+            for kind, ms, peak_kib in self.tick_times:
+                f.write(f"  {kind:<4} tick {ms:9.1f} ms   peak +{peak_kib:9.1f} KiB allocated\n")
+            f.write("\nTop functions by self samples (where the time is actually spent)\n")
+            for name, n in own.most_common(30):
+                f.write(f"  {n / max(samples, 1) * 100:5.1f}%  {n:6d}  {name}\n")
+            f.write("\nTop functions by total samples (including callees)\n")
+            for name, n in total.most_common(30):
+                f.write(f"  {n / max(samples, 1) * 100:5.1f}%  {n:6d}  {name}\n")
+
+    def _write_alloc(self, snapshot, path):
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        snapshot = snapshot.filter_traces(ignore)
+        with open(path, "w") as f:
+            f.write("Growth by line over the capture (new - freed since the first profiled tick)\n")
+            for stat in snapshot.compare_to(self.baseline.filter_traces(ignore), "lineno")[:30]:
+                frame = stat.traceback[0]
+                f.write(f"  {stat.size_diff / 1024:+10.1f} KiB  {stat.count_diff:+7d} blocks  {frame.filename}:{frame.lineno}\n")
+            f.write("\nTop allocation sites by line (still allocated at the end of the capture)\n")
+            for stat in snapshot.statistics("lineno")[:30]:
+                frame = stat.traceback[0]
+                f.write(f"  {stat.size / 1024:10.1f} KiB  {stat.count:7d} blocks  {frame.filename}:{frame.lineno}\n")
+            f.write("\nTop allocating call stacks\n")
+            for stat in snapshot.statistics("traceback")[:10]:
+                f.write(f"\n  {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(limit=8, most_recent_first=True):
+                    f.write(f"    {line}\n")
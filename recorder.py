@@ -0,0 +1,145 @@
+# recorder.py — capture every Hyperliquid HTTP request/response the bot makes to a compact tape
+#
+# RECORD_API = True (config.py) or BOT_RECORD=1 → saves/recordings/<UTC day>.jsonl.gz, one JSON
+# object per line, gzip sync-flushed per batch so a crash loses at most the last batch:
+#   {"start": ms, "wallet": ..., "symbols": [...], "files": {"saves/state.json": {...}}}   first line of a file
+#   {"t": ms, "p": "/info", "q": {payload}, "r": {response}}                              one per request
+#   {"t": ms, "p": "/exchange", "q": {"action": ...}, "e": "ClientError: ..."}             failed request
+# Signatures are never written. Replay with `python replay.py <tape>`.
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+RECORDINGS_DIR = os.path.join("saves", "recordings")
+STATE_GLOBS = ("saves/*.json", "saves/*/state.json", "saves/*/crosses.json")
+
+def _sanitize(payload):
+    if isinstance(payload, dict) and "signature" in payload:
+        return {k: v for k, v in payload.items() if k != "signature"}
+    return payload
+
+def state_files():
+    """{path: parsed json} of the strategy state a replay has to start from"""
+    files = {}
+    for pattern in STATE_GLOBS:
+        for path in glob.glob(pattern):
+            try:
+                with open(path) as f:
+                    files[path.replace(os.sep, "/")] = json.load(f)
+            except (OSError, ValueError):
+                pass
+    return files
+
+
+class Recorder:
+    """Wraps hyperliquid.api.API.post (every Info/Exchange instance, including the ones
+    the SDK builds internally) and hands records to a writer thread."""
+
+    def __init__(self, out_dir=RECORDINGS_DIR, header=None):
+        self.out_dir = out_dir
+        self.header = header or {}
+        self.q = queue.SimpleQueue()
+        self.file = None
+        self.day = None
+        self.records = 0
+        self.original = None
+        os.makedirs(out_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._write_loop, daemon=True, name="recorder")
+        self.thread.start()
+
+    def install(self):
+        from hyperliquid.api import API
+        if getattr(API.post, "_recorded", False):
+            return self
+        self.original = original = API.post
+        recorder = self
+
+        def recorded_post(api, url_path, payload=None):
+            try:
+                result = original(api, url_path, payload)
+            except Exception as e:
+                recorder.write({"t": int(time.time() * 1000), "p": url_path, "q": _sanitize(payload),
+                                "e": f"{type(e).__name__}: {e}"})
+                raise
+            recorder.write({"t": int(time.time() * 1000), "p": url_path, "q": _sanitize(payload), "r": result})
+            return result
+
+        recorded_post._recorded = True
+        API.post = recorded_post
+        return self
+
+    def write(self, record):
+        self.q.put(record)
+
+    def close(self, timeout=2.0):
+        self.q.put(None)
+        self.thread.join(timeout)
+
+    # === WRITER THREAD ===
+    def _open(self, day):
+        if self.file is not None:
+            self.file.close()
+        self.day = day
+        path = os.path.join(self.out_dir, f"{day}.jsonl.gz")
+        self.file = gzip.open(path, "at", compresslevel=6)
+        header = dict(self.header, start=int(time.time() * 1000), files=state_files())
+        self.file.write(json.dumps(header, separators=(",", ":")) + "\n")
+
+    def _write_loop(self):
+        while True:
+            batch = [self.q.get()]
+            try:
+                while True:
+                    batch.append(self.q.get_nowait())
+            except queue.Empty:
+                pass
+            for record in batch:
+                if record is None:
+                    if self.file is not None:
+                        self.file.close()
+                        self.file = None
+                    return
+                day = datetime.fromtimestamp(record["t"] / 1000, timezone.utc).strftime("%Y%m%d")
+                if day != self.day:
+                    self._open(day)
+                self.file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+                self.records += 1
+            self.file.flush()
+
+
+active = None
+
+def start(header=None):
+    """Record from now on (called by main.setup() before the first request)"""
+    global active
+    import atexit
+    active = Recorder(header=header).install()
+    atexit.register(stop)
+    return active
+
+def stop():
+    """Write out what's queued and close the tape (shutdown; safe to call twice)"""
+    global active
+    if active is not None:
+        rec, active = active, None
+        rec.close()
+
+
+# === READING ===
+def read_tape(path):
+    """Yield records; a file cut short by a crash ends at its last complete line"""
+    try:
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except (EOFError, zlib.error, gzip.BadGzipFile):
+        return
@@ -0,0 +1,292 @@
+# replay.py — run the unchanged bot loop (main.run_bot) against a recorded tape on a simulated clock
+#
+#   python replay.py saves/recordings/20251201.jsonl.gz [more tapes...] [--out saves/replays/x] [--hours 6]
+#
+# The SDK's HTTP layer (hyperliquid.api.API.post) answers from the tape instead of the network,
+# and clock.SimClock jumps straight to the end of every wait, so a recorded day runs in seconds.
+# State files captured at the start of the tape are restored into --out (never into the live saves/).
+#
+# How requests are answered at simulated time `now`:
+#   candles      every bar in the window, as last seen on the tape at or before `now`; a bar that was
+#                only seen later is served as first seen if it is the forming one, final if it closed
+#   user_state   latest recorded at or before `now` (else the first), with positions and PnL replaced
+#                by the ones this replay holds, so changed behaviour still sees its own positions
+#   all_mids     latest recorded, overridden by the close of the newest bar we hold
+#   meta         latest recorded, else the saves/meta_cache.json snapshot in the tape header (warm start)
+#   orders       the next recorded fill for the same asset and side, else filled at the current mid
+#                (--paper / BOT_PAPER=1: a paper.PaperExchange takes orders and user_state instead)
+#   anything else: latest recorded response of the same type
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from bisect import bisect_left, bisect_right
+
+import clock
+from recorder import read_tape
+from candle_buffer import INTERVAL_MS
+
+THROWAWAY_KEY = "0x" + "11" * 32            # orders are still signed by the SDK; nothing leaves the process
+
+def _kind(url_path, payload):
+    payload = payload or {}
+    if url_path == "/exchange":
+        return "exchange:" + str((payload.get("action") or {}).get("type"))
+    return "info:" + str(payload.get("type"))
+
+
+class Tape:
+    """Every record of one or more tape files, indexed for lookups by simulated time"""
+
+    def __init__(self, paths):
+        self.header = None
+        self.records = 0
+        self.start_ms = self.end_ms = None
+        self.by_kind = {}           # kind → [(t, response)], time ordered
+        self.bars = {}              # (coin, interval) → {bar t: [(seen t, bar)]}
+        self.fills = {}             # (asset, is_buy) → [response]
+        for path in paths:
+            for rec in read_tape(path):
+                if "start" in rec:
+                    self.header = self.header or rec
+                    continue
+                self._add(rec)
+        if self.header is None:
+            raise SystemExit(f"no tape header in {paths} — not a recording?")
+        self.start_ms = self.start_ms or self.header["start"]
+        self.bar_keys = {k: sorted(v) for k, v in self.bars.items()}
+        self.seen_at = {k: {t: [s for s, _ in vs] for t, vs in v.items()} for k, v in self.bars.items()}
+
+    def _add(self, rec):
+        if "r" not in rec:
+            return                  # failed request: the bot saw an exception, replay answers normally
+        t, payload, resp = rec["t"], rec.get("q") or {}, rec["r"]
+        self.records += 1
+        self.start_ms = t if self.start_ms is None else min(self.start_ms, t)
+        self.end_ms = t if self.end_ms is None else max(self.end_ms, t)
+        kind = _kind(rec["p"], payload)
+        self.by_kind.setdefault(kind, []).append((t, resp))
+        if kind == "info:candleSnapshot":
+            req = payload["req"]
+            versions = self.bars.setdefault((req["coin"], req["interval"]), {})
+            for bar in resp:
+                versions.setdefault(bar["t"], []).append((t, bar))
+        elif kind == "exchange:order":
+            for wire in payload["action"]["orders"]:
+                self.fills.setdefault((wire["a"], wire["b"]), []).append(resp)
+
+    def cached(self, kind):
+        """meta / spotMeta from the meta_cache.json captured in the header: a bot started with a
+        warm cache never requests them, so the tape has no record of its own"""
+        entry = (self.header.get("files", {}).get("saves/meta_cache.json") or {}).get(kind)
+        return entry.get("data") if isinstance(entry, dict) else None
+
+    def latest(self, kind, now_ms):
+        rows = self.by_kind.get(kind)
+        if not rows:
+            return None
+        i = bisect_right(rows, now_ms, key=lambda r: r[0])
+        return rows[i - 1][1] if i else rows[0][1]
+
+    def candles(self, coin, interval, start_ms, end_ms, now_ms):
+        versions = self.bars.get((coin, interval))
+        if not versions:
+            return []
+        keys, seen, step = self.bar_keys[(coin, interval)], self.seen_at[(coin, interval)], INTERVAL_MS[interval]
+        out = []
+        for t in keys[bisect_left(keys, start_ms):bisect_right(keys, min(end_ms, now_ms))]:
+            i = bisect_right(seen[t], now_ms)
+            if i:
+                out.append(versions[t][i - 1][1])
+            else:
+                out.append(versions[t][-1][1] if t + step <= now_ms else versions[t][0][1])
+        return out
+
+
+class ReplayTransport:
+    """Stands in for API.post; keeps this replay's own positions and fills"""
+
+    def __init__(self, tape):
+        self.tape = tape
+        self.orders = []            # (sim ms, coin, side, size, px, recorded?)
+        meta = tape.latest("info:meta", tape.start_ms) or tape.cached("meta") or {"universe": []}
+        self.coins = [a["name"] for a in meta["universe"]]
+        self.positions = {}         # coin → position dict as user_state reports it
+        first = tape.latest("info:clearinghouseState", tape.start_ms) or {}
+        for p in first.get("assetPositions", []):
+            self.positions[p["position"]["coin"]] = dict(p["position"])
+
+    def now_ms(self):
+        return int(clock.now() * 1000)
+
+    def mid(self, coin):
+        now = self.now_ms()
+        bars = self.tape.candles(coin, "1m", now - 3_600_000, now, now)
+        if bars:
+            return float(bars[-1]["c"])
+        mids = self.tape.latest("info:allMids", now) or {}
+        return float(mids.get(coin, 0.0))
+
+    def post(self, url_path, payload=None):
+        payload = payload or {}
+        kind, now = _kind(url_path, payload), self.now_ms()
+        if kind == "info:candleSnapshot":
+            req = payload["req"]
+            return self.tape.candles(req["coin"], req["interval"], req["startTime"], req["endTime"], now)
+        if kind == "info:clearinghouseState":
+            return self._user_state(now)
+        if kind == "info:allMids":
+            mids = dict(self.tape.latest(kind, now) or {})
+            mids.update({c: str(self.mid(c)) for c in self.coins if self.mid(c)})
+            return mids
+        if kind == "info:spotMeta":
+            return self.tape.latest(kind, now) or self.tape.cached("spotMeta") or {"tokens": [], "universe": []}
+        if kind == "exchange:order":
+            return self._order(payload["action"]["orders"][0], now)
+        if url_path == "/exchange":
+            return {"status": "ok", "response": {"type": "default"}}
+        resp = self.tape.latest(kind, now)
+        if resp is None and kind == "info:meta":
+            resp = self.tape.cached("meta")
+        if resp is None:
+            raise RuntimeError(f"nothing on the tape for {kind}")
+        return resp
+
+    # === SIMULATED ACCOUNT ===
+    def _order(self, wire, now):
+        coin = self.coins[wire["a"]]
+        recorded = self.tape.fills.get((wire["a"], wire["b"]))
+        on_tape = bool(recorded)
+        if on_tape:
+            resp = recorded.pop(0)
+        else:
+            resp = {"status": "ok", "response": {"type": "order", "data": {"statuses": [
+                {"filled": {"totalSz": wire["s"], "avgPx": str(self.mid(coin)), "oid": len(self.orders) + 1}}]}}}
+        status = resp["response"]["data"]["statuses"][0] if resp.get("status") == "ok" else {}
+        fill = status.get("filled")
+        if fill:
+            self._apply_fill(coin, float(fill["totalSz"]) * (1 if wire["b"] else -1), float(fill["avgPx"]))
+            self.orders.append((now, coin, "buy" if wire["b"] else "sell", float(fill["totalSz"]),
+                                float(fill["avgPx"]), on_tape))
+        return resp
+
+    def _apply_fill(self, coin, signed_sz, px):
+        pos = self.positions.get(coin)
+        szi = float(pos["szi"]) if pos else 0.0
+        new = round(szi + signed_sz, 8)
+        if abs(new) < 1e-9:
+            self.positions.pop(coin, None)
+            return
+        entry = px if szi == 0 or (szi > 0) != (new > 0) else float(pos["entryPx"])
+        lev = (pos or {}).get("leverage", {"type": "cross", "value": 10})
+        self.positions[coin] = {"coin": coin, "szi": str(new), "entryPx": str(entry), "leverage": lev}
+
+    def _user_state(self, now):
+        doc = dict(self.tape.latest("info:clearinghouseState", now) or {"withdrawable": "0.0"})
+        rows = []
+        for coin, pos in self.positions.items():
+            szi, entry, mid = float(pos["szi"]), float(pos["entryPx"]), self.mid(coin)
+            pnl = (mid - entry) * szi
+            margin = abs(szi) * entry / max(float(pos["leverage"]["value"]), 1.0)
+            rows.append({"type": "oneWay", "position": dict(pos, unrealizedPnl=str(pnl),
+                                                             returnOnEquity=str(pnl / margin if margin else 0.0))})
+        doc["assetPositions"] = rows
+        return doc
+
+
+def _sim_timestamps(record):
+    record.created = clock.now()
+    record.msecs = (record.created % 1) * 1000
+    return True
+
+def restore_files(files, out_dir):
+    for rel, data in files.items():
+        path = os.path.join(out_dir, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+def run(paths, out_dir, hours=None, seed=0, paper=False):
+    """Replay the tapes through main.run_bot → summary dict (paper=True: orders go to a paper account)"""
+    tape = Tape(paths)
+    end_ms = tape.end_ms if hours is None else min(tape.end_ms, tape.start_ms + int(hours * 3_600_000))
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    restore_files(tape.header.get("files", {}), out_dir)
+    os.chdir(out_dir)                                   # saves/ (state, journal, logs, candles) → out_dir
+    os.environ["BOT_RECORD"] = "0"
+    if paper:
+        os.environ["BOT_PAPER"] = "1"
+    os.environ.setdefault("HL_PRIVATE_KEY", THROWAWAY_KEY)
+    if tape.header.get("wallet"):
+        os.environ["HL_WALLET"] = tape.header["wallet"]
+    random.seed(seed)                                   # scheduler jitter
+
+    sim = clock.use(clock.SimClock(tape.start_ms / 1000, end=end_ms / 1000))
+    transport = ReplayTransport(tape)
+    from hyperliquid.api import API
+    API.post = lambda api, url_path, payload=None: transport.post(url_path, payload)
+
+    import main
+    import persist
+    from logger import logger, stop_logging
+    from config import SYMBOLS, PAPER_TRADING
+    if tape.header.get("symbols") and tape.header["symbols"] != SYMBOLS:
+        print(f"WARNING: tape recorded {tape.header['symbols']}, config trades {SYMBOLS}")
+    main.setup()
+    sim.settle = main.default_executor.drain            # fills land before simulated time moves on
+    logger.addFilter(_sim_timestamps)                   # bot.log lines carry simulated time
+
+    t0 = time.perf_counter()
+    main.run_bot()
+    main.default_executor.drain()
+    persist.flush()
+    wall = time.perf_counter() - t0
+    ticks = main.metrics.TICK_SECONDS.values
+    paper = main.default_executor.exchange if PAPER_TRADING else None
+    if paper is not None:                               # orders went to the paper account, not the tape
+        transport.orders = [(t, c, side, sz, px, False) for t, c, side, sz, px, _fee in paper.fills]
+    summary = {
+        "tape_records": tape.records,
+        "simulated_hours": round((sim.now() * 1000 - tape.start_ms) / 3_600_000, 2),
+        "wall_seconds": round(wall, 2),
+        "bar_ticks": ticks.get(("bar",), [0, 0, 0])[2],
+        "stop_ticks": ticks.get(("stop",), [0, 0, 0])[2],
+        "missed_bars": main.scheduler.missed_bars,
+        "orders": [{"t": t, "coin": c, "side": s, "sz": sz, "px": px, "recorded": r}
+                   for t, c, s, sz, px, r in transport.orders],
+        "paper": paper.stats() if paper is not None else None,
+        "profit": round(main.state.total_profit(), 6),
+        "crosses": {sym: st.cross_history for sym, st in main.state.symbols.items()},
+    }
+    with open(os.path.join(out_dir, "replay_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    stop_logging()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Hyperliquid traffic through the bot")
+    parser.add_argument("tapes", nargs="+", help="tape files (or a directory of them), replayed in order")
+    parser.add_argument("--out", help="where the replay's saves/ go (default saves/replays/<tape name>)")
+    parser.add_argument("--hours", type=float, help="stop after this much simulated time")
+    parser.add_argument("--seed", type=int, default=0, help="scheduler jitter seed")
+    parser.add_argument("--paper", action="store_true", help="fill orders on a paper account (paper.py) instead of the tape")
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.tapes:
+        paths += sorted(glob.glob(os.path.join(p, "*.jsonl.gz"))) if os.path.isdir(p) else [p]
+    paths = [os.path.abspath(p) for p in paths]
+    name = os.path.basename(paths[0]).split(".")[0]
+    out = args.out or os.path.join("saves", "replays", name)
+
+    s = run(paths, out, args.hours, args.seed, args.paper)
+    print(f"\nReplayed {s['simulated_hours']}h ({s['tape_records']} recorded responses) in {s['wall_seconds']}s │ "
+          f"{s['bar_ticks']} bar / {s['stop_ticks']} stop ticks │ {len(s['orders'])} orders │ profit ${s['profit']:+.4f}")
+    for o in s["orders"]:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(o["t"] / 1000))
+        print(f"  {when}  {o['coin']:<5} {o['side']:<4} {o['sz']:g} @ {o['px']:.4f}{'' if o['recorded'] else '  (not on tape)'}")
+    print(f"state, journal and logs → {os.path.abspath(out)}  (replay_summary.json)")
@@ -0,0 +1,97 @@
+# risk.py — position stops evaluated in memory on every price update (WS mid, stop tick, bar close)
+#
+# Per open position we keep the best price and best PnL seen since entry, computed from the entry
+# price and size recorded at the fill, so a check is a few float compares instead of a user_state
+# round trip. Rules (config.py), each on its own toggle:
+#   TRAILING_STOP_*   price moved TRAILING_STOP_PCT % against us from its best since entry
+#   PROFIT_RATCHET_*  PnL reached MIN_PROFIT_TO_ACTIVATE $ at some point and has now dropped below
+#                     PROFIT_PROTECTION_RATIO × that best PnL
+#   TRAILING_PNL_*    PnL % of margin is TRAILING_PNL_PCT below its peak (only once the leverage is known)
+# The peaks live on SymbolState and go into state.json, so a restart keeps protecting the position.
+import threading
+from config import (TRAILING_STOP_ENABLED, TRAILING_STOP_PCT, PROFIT_RATCHET_ENABLED, MIN_PROFIT_TO_ACTIVATE,
+                    PROFIT_PROTECTION_RATIO, TRAILING_PNL_ENABLED, TRAILING_PNL_PCT)
+
+RULES = {
+    "trailing_stop": "TRAILING STOP",
+    "profit_ratchet": "PROFIT RATCHET",
+    "trailing_pnl": "TRAILING PNL STOP",
+}
+
+
+class PositionRisk:
+    """Stop rules for one symbol's position (its SymbolState). update() is O(1) and thread-safe:
+    the WS thread and the bot loop may both feed prices. A rule fires once; the position stays
+    'closing' until the close fills (closed()) or fails (release())."""
+
+    def __init__(self, state):
+        self.state = state
+        self.closing = False
+        self.lock = threading.Lock()
+
+    # === POSITION LIFECYCLE (executor thread, on fills) ===
+    def opened(self, entry_px, size):
+        with self.lock:
+            st = self.state
+            st.position_size = size
+            st.peak_price = entry_px
+            st.peak_pnl_usd = 0.0
+            st.peak_pnl_pct = 0.0
+            self.closing = False
+
+    def closed(self):
+        with self.lock:
+            st = self.state
+            st.position_size = st.peak_price = st.peak_pnl_usd = st.peak_pnl_pct = None
+            self.closing = False
+
+    def release(self):
+        """The close didn't go through → keep watching"""
+        with self.lock:
+            self.closing = False
+
+    def pnl(self, price, leverage=1):
+        """(PnL % of margin, PnL $) at `price`"""
+        st = self.state
+        move = (price - st.last_buy_price) if st.position_side == "long" else (st.last_buy_price - price)
+        return move / st.last_buy_price * (leverage or 1) * 100, move * (st.position_size or 0.0)
+
+    # === EVALUATION ===
+    def update(self, price, leverage=None):
+        """New price → (rule, pnl %, pnl $) if a stop fired, else None. Peaks that moved are saved.
+        leverage None = not known yet (right after a restart): the % of margin can't be compared
+        with the stored peak, so the PnL-% peak and TRAILING_PNL wait until it is."""
+        st = self.state
+        with self.lock:
+            if not st.position_open or self.closing or not st.last_buy_price or price <= 0:
+                return None
+            long = st.position_side == "long"
+            pnl_pct, pnl_usd = self.pnl(price, leverage)
+            moved = False
+            if st.peak_price is None or (price > st.peak_price if long else price < st.peak_price):
+                st.peak_price = price
+                moved = True
+            if st.peak_pnl_usd is None or pnl_usd > st.peak_pnl_usd:
+                st.peak_pnl_usd = pnl_usd
+                moved = True
+            if leverage and (st.peak_pnl_pct is None or pnl_pct > st.peak_pnl_pct):
+                st.peak_pnl_pct = pnl_pct
+                moved = True
+
+            rule = None
+            if TRAILING_STOP_ENABLED:
+                if long and price <= st.peak_price * (1 - TRAILING_STOP_PCT / 100):
+                    rule = "trailing_stop"
+                elif not long and price >= st.peak_price * (1 + TRAILING_STOP_PCT / 100):
+                    rule = "trailing_stop"
+            if rule is None and PROFIT_RATCHET_ENABLED and st.peak_pnl_usd >= MIN_PROFIT_TO_ACTIVATE \
+                    and pnl_usd < st.peak_pnl_usd * PROFIT_PROTECTION_RATIO:
+                rule = "profit_ratchet"
+            if rule is None and TRAILING_PNL_ENABLED and leverage and st.peak_pnl_pct is not None \
+                    and pnl_pct <= st.peak_pnl_pct + TRAILING_PNL_PCT:
+                rule = "trailing_pnl"
+            if rule is not None:
+                self.closing = True
+        if moved:
+            st.save_state()                 # coalesced: written at the end of the tick
+        return None if rule is None else (rule, pnl_pct, pnl_usd)
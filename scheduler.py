@@ -0,0 +1,151 @@
+# scheduler.py — wake just after each candle closes (exchange clock) + intra-bar stop checks
+import random
+import threading
+from collections import deque
+import clock
+
+class Tick:
+    """One wake-up. kind = "bar" (a candle just closed → full strategy pass) or "stop" (risk checks only)"""
+
+    def __init__(self, kind, scheduled, woke, boundary_ms=None):
+        self.kind = kind
+        self.scheduled = scheduled          # local epoch seconds we meant to wake at
+        self.woke = woke
+        self.boundary_ms = boundary_ms      # server-time open of the bar that just started (bar ticks)
+        self.lag_ms = max(0.0, (woke - scheduled) * 1000)
+        self.duration_ms = None
+
+
+class ClockSkew:
+    """Local → exchange clock offset (server_ms ≈ local_ms + offset_ms), bounded by candle timestamps.
+
+    Seeing bar t as the newest bar means the server clock was ≥ t when the reply left
+    (lower bound) and < t + interval when the request arrived (upper bound). The
+    estimate stays where it is (0 at start) unless the recent bounds rule it out,
+    then moves just far enough to sit inside them.
+    """
+
+    def __init__(self, interval_ms, window=30):
+        self.interval_ms = interval_ms
+        self.lows = deque(maxlen=window)
+        self.highs = deque(maxlen=window)
+        self.offset_ms = 0.0
+        self.lock = threading.Lock()
+
+    def observe_bar(self, open_ms, sent_ms=None, recv_ms=None):
+        recv_ms = recv_ms or clock.now() * 1000
+        with self.lock:
+            self.lows.append(open_ms - recv_ms)
+            if sent_ms is not None:
+                self.highs.append(open_ms + self.interval_ms - sent_ms)
+            lo = max(self.lows)
+            hi = min(self.highs) if self.highs else float('inf')
+            if lo > hi:                     # clock jumped / drifted → old bounds are stale
+                self.lows = deque([self.lows[-1]], maxlen=self.lows.maxlen)
+                self.highs = deque(list(self.highs)[-1:], maxlen=self.highs.maxlen)
+                lo = self.lows[0]
+                hi = self.highs[0] if self.highs else float('inf')
+            self.offset_ms = min(max(self.offset_ms, lo), hi)
+
+    def server_now_ms(self):
+        return clock.now() * 1000 + self.offset_ms
+
+
+class BarScheduler:
+    """Replaces the fixed sleep in run_bot().
+
+    - bar ticks fire `close_delay` (+ up to `jitter`) seconds after each bar closes on the
+      exchange clock, or as soon as `bar_event` is set (MarketStream saw the next bar open)
+    - stop ticks fire every `stop_interval` seconds in between (0 = off)
+    - every tick records how late it woke; finish() records how long it ran
+    """
+
+    def __init__(self, interval_ms, close_delay=1.0, jitter=0.5, stop_interval=10, skew=None):
+        self.interval_ms = interval_ms
+        self.close_delay = close_delay
+        self.jitter = jitter
+        self.stop_interval = stop_interval
+        self.skew = skew or ClockSkew(interval_ms)
+        self.last_boundary_ms = None        # newest bar boundary already handled
+        self.next_stop = None
+        self.history = {"bar": deque(maxlen=500), "stop": deque(maxlen=500)}
+        self.missed_bars = 0
+        self.last_tick = None
+        self.lock = threading.Lock()
+
+    # === SCHEDULE ===
+    def _current_boundary_ms(self):
+        now = self.skew.server_now_ms()
+        return int(now // self.interval_ms * self.interval_ms)
+
+    def _bar_wake(self, boundary_ms):
+        """Local time to wake for the bar that opens at boundary_ms (server clock)"""
+        return (boundary_ms - self.skew.offset_ms) / 1000 + self.close_delay + random.uniform(0, self.jitter)
+
+    def wait(self, stop_event, bar_event=None):
+        """Block until the next tick is due. Returns a Tick, or None once stop_event is set."""
+        if self.last_boundary_ms is None:                      # first call: run right away
+            self.last_boundary_ms = self._current_boundary_ms()
+            return self._fire("bar", clock.now(), self.last_boundary_ms)
+
+        next_boundary = self.last_boundary_ms + self.interval_ms
+        bar_at = self._bar_wake(next_boundary)
+        if self.next_stop is None or self.next_stop <= clock.now() - self.stop_interval:
+            self.next_stop = clock.now() + self.stop_interval
+
+        while not stop_event.is_set():
+            now = clock.now()
+            stop_due = self.stop_interval > 0 and self.next_stop < bar_at - 1.0
+            if now >= bar_at:
+                return self._bar_tick(bar_at, now)
+            if stop_due and now >= self.next_stop:
+                scheduled, self.next_stop = self.next_stop, self.next_stop + self.stop_interval
+                return self._fire("stop", scheduled)
+
+            timeout = min(bar_at, self.next_stop) - now if stop_due else bar_at - now
+            timeout = min(max(timeout, 0.0), 1.0)               # stay responsive to stop_event
+            if bar_event is not None:
+                if bar_event.wait(timeout):
+                    bar_event.clear()
+                    if self._current_boundary_ms() > self.last_boundary_ms:
+                        # pushed bar open is the real close signal; lag is measured from the boundary
+                        return self._bar_tick((next_boundary - self.skew.offset_ms) / 1000, clock.now())
+            else:
+                clock.wait(stop_event, timeout)
+        return None
+
+    def _bar_tick(self, scheduled, now):
+        boundary = max(self._current_boundary_ms(), self.last_boundary_ms + self.interval_ms)
+        skipped = (boundary - self.last_boundary_ms) // self.interval_ms - 1
+        if skipped > 0:
+            self.missed_bars += skipped
+        self.last_boundary_ms = boundary
+        self.next_stop = now + self.stop_interval
+        return self._fire("bar", scheduled, boundary, now)
+
+    def _fire(self, kind, scheduled, boundary_ms=None, woke=None):
+        tick = Tick(kind, scheduled, woke or clock.now(), boundary_ms)
+        self.last_tick = tick
+        return tick
+
+    def finish(self, tick):
+        tick.duration_ms = (clock.now() - tick.woke) * 1000
+        with self.lock:
+            self.history[tick.kind].append((tick.lag_ms, tick.duration_ms))
+
+    # === REPORTING ===
+    def summary(self):
+        out = {"clock_offset_ms": round(self.skew.offset_ms, 1), "missed_bars": self.missed_bars}
+        with self.lock:
+            for kind, rows in self.history.items():
+                if not rows:
+                    continue
+                lags = [r[0] for r in rows]
+                out[kind] = {
+                    "count": len(rows),
+                    "lag_last": round(lags[-1], 1),
+                    "lag_mean": round(sum(lags) / len(lags), 1),
+                    "lag_max": round(max(lags), 1),
+                    "took_last": round(rows[-1][1], 1),
+                }
+        return out
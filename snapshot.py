@@ -0,0 +1,109 @@
+# snapshot.py — dashboard data published once per tick (JSON encoded once, shared by every viewer)
+import json
+import threading
+import time
+from datetime import datetime, timezone
+import state
+from config import HEARTBEAT_TIMEOUT
+
+def build():
+    """Plain-dict view of everything the dashboard shows, taken on the bot thread"""
+    symbols = {}
+    for sym in state.symbols.values():
+        side = sym.position_side if sym.position_open else None
+        symbols[sym.symbol] = {
+            "price": sym.dashboard_data.get("price", 0.0),
+            "trend": sym.dashboard_data.get("trend", "Unknown"),
+            "position": sym.dashboard_data.get("position", 0.0),
+            "side": (side or "flat").upper(),
+            "profit": round(sym.total_profit, 4),
+            "signal": sym.last_signal,
+            "last_update": sym.dashboard_data.get("last_update"),
+            "crosses": list(reversed(sym.cross_history)),
+        }
+    return {
+        "last_update": state.dashboard_data.get("last_update"),
+        "usdt_balance": state.dashboard_data.get("usdt_balance", 0.0),
+        "profit": round(state.total_profit(), 4),
+        "latency": state.dashboard_data.get("latency", {}),
+        "scheduler": state.dashboard_data.get("scheduler", {}),
+        "symbols": symbols,
+    }
+
+def diff(old, new):
+    """Changed keys only; nested dicts (symbols → LTC → price) are diffed one level further"""
+    out = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if isinstance(value, dict) and isinstance(before, dict) and key == "symbols":
+            changed = {s: diff(before.get(s, {}), v) for s, v in value.items()}
+            changed = {s: d for s, d in changed.items() if d}
+            if changed:
+                out[key] = changed
+        elif value != before:
+            out[key] = value
+    return out
+
+
+class SnapshotHub:
+    """Latest snapshot + delta, versioned, with a condition viewers block on.
+
+    The bot thread calls publish() once per tick and beat() on every tick; request
+    handlers only ever read pre-encoded bytes, so viewers cost the loop nothing
+    beyond one build + json.dumps per tick.
+    """
+
+    def __init__(self, stale_after=HEARTBEAT_TIMEOUT):
+        self.stale_after = stale_after
+        self.started_at = time.time()
+        self.last_beat = None
+        self.version = 0
+        self.doc = {}
+        self.body = b"{}"           # full snapshot, JSON
+        self.delta_body = b"{}"     # changes since version - 1, JSON
+        self.cond = threading.Condition()
+
+    # === BOT SIDE ===
+    def beat(self):
+        self.last_beat = time.time()
+
+    def publish(self, doc):
+        delta = diff(self.doc, doc)
+        body = json.dumps(doc, default=str).encode()
+        delta_body = json.dumps(delta, default=str).encode()
+        with self.cond:
+            self.doc = doc
+            self.body = body
+            if delta or self.version == 0:
+                self.version += 1
+                self.delta_body = delta_body
+                self.cond.notify_all()
+        self.beat()
+
+    # === VIEWER SIDE ===
+    def alive(self):
+        return self.last_beat is not None and time.time() - self.last_beat < self.stale_after
+
+    def status(self):
+        return {
+            "status": "RUNNING" if self.alive() else "STOPPED",
+            "heartbeat_age": round(time.time() - self.last_beat, 1) if self.last_beat else None,
+            "uptime": int(time.time() - self.started_at),
+            "version": self.version,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def current(self):
+        """(version, full body, delta body) read together"""
+        with self.cond:
+            return self.version, self.body, self.delta_body
+
+    def wait(self, since_version, timeout):
+        """Block until a version newer than since_version is published (or timeout) → current version"""
+        with self.cond:
+            if self.version <= since_version:
+                self.cond.wait(timeout)
+            return self.version
+
+
+hub = SnapshotHub()
@@ -1,47 +1,29 @@
 # state.py
-import json
 import os
-from datetime import datetime
-from config import MAX_CROSSES
+from config import MAX_CROSSES, SYMBOL, SYMBOLS
 from logger import log_print
+from journal import TradeJournal
+import persist
+from persist import atomic_write_json, load_json
 
 SAVES_DIR = "saves"
 STATE_FILE = os.path.join(SAVES_DIR, "state.json")
-TRADES_FILE = os.path.join(SAVES_DIR, "trades.json")
+TRADES_FILE = os.path.join(SAVES_DIR, "trades.json")     # legacy, migrated into TRADES_DB
+TRADES_DB = os.path.join(SAVES_DIR, "trades.db")
 CROSS_FILE = os.path.join(SAVES_DIR, "crosses.json")
 
-os.makedirs(SAVES_DIR, exist_ok=True)
-
-# Load crosses
-cross_history = []
-if os.path.exists(CROSS_FILE):
-    try:
-        with open(CROSS_FILE, 'r') as f:
-            cross_history = json.load(f)
-        print(f"Loaded {len(cross_history)} crosses from {CROSS_FILE}")
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"Corrupt/invalid crosses.json ({e}) — Resetting to empty list.")
-        cross_history = []
-else:
-    print(f"No {CROSS_FILE} found — Starting with empty history.")
-
-def save_crosses():
-    data_to_save = cross_history[-MAX_CROSSES:] if len(cross_history) > MAX_CROSSES else cross_history
-    with open(CROSS_FILE, 'w') as f:
-        json.dump(data_to_save, f, indent=2)
-
-# Load trades
-trades = []
-if os.path.exists(TRADES_FILE):
-    try:
-        with open(TRADES_FILE, 'r') as f:
-            trades = json.load(f)
-        print(f"Loaded {len(trades)} trades from {TRADES_FILE}")
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"Corrupt/invalid trades.json ({e}) — Resetting to empty list.")
-        trades = []
-else:
-    print(f"No {TRADES_FILE} found — Starting with empty trades.")
+# Trade journal (saves/trades.db) — append-only, queried on demand; the old trades.json is imported once.
+# Opened on first use so importing this module touches no files.
+journal = None
+
+def get_journal():
+    global journal
+    if journal is None:
+        os.makedirs(SAVES_DIR, exist_ok=True)
+        journal = TradeJournal(TRADES_DB)
+        journal.migrate_json(TRADES_FILE, default_symbol=SYMBOL)
+        print(f"Trade journal: {journal.count()} trades in {TRADES_DB}")
+    return journal
 
 default_state = {
     "position_open": False,
@@ -50,65 +32,129 @@ default_state = {
     "total_profit": 0.0
 }
 
-# Global vars for defaults
-total_profit = 0.0
-last_buy_price = None
-position_open = False
-position_side = None
-
-if os.path.exists(STATE_FILE):
-    try:
-        with open(STATE_FILE, 'r') as f:
-            data = json.load(f)
-        total_profit = data.get("total_profit", 0.0)
-        last_buy_price = data.get("last_buy_price")
-        position_open = data.get("position_open", False)
-        position_side = data.get("position_side")
-        print(f"Loaded state from {STATE_FILE}")
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"Corrupt/invalid state.json ({e}) — Resetting to defaults.")
-        total_profit = 0.0
-        last_buy_price = None
-        position_open = False
-        position_side = None
-        # Optional: os.remove(STATE_FILE)  # Uncomment to auto-nuke bad file
-else:
-    print(f"No {STATE_FILE} found — Using defaults.")
-
-# Save defaults if new
-if not os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'w') as f:
-        json.dump(default_state, f, indent=2)
-
-def save_state():
-    state = {
-        "position_open": position_open,
-        "position_side": position_side,
-        "last_buy_price": last_buy_price,
-        "total_profit": total_profit
-    }
-    with open(STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=2)
-
-def save_trade(action, qty, price):
-    trade = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "action": action,
-        "ltc": round(qty, 6),
-        "price": round(price, 2),
-        "value_usd": round(qty * price, 2)
-    }
-    trades.append(trade)
-    with open(TRADES_FILE, 'w') as f:
-        json.dump(trades, f, indent=2)
-
-last_signal = "None"
-last_trend = None
 
+class SymbolState:
+    """Everything the strategy remembers about one perp.
+
+    The primary SYMBOL keeps the original saves/state.json + crosses.json so
+    existing installs carry on; extra symbols live under saves/<SYMBOL>/.
+    Built without files (state_file=None) it is purely in-memory (backtests, benchmarks).
+    """
+
+    def __init__(self, symbol, state_file=None, cross_file=None):
+        self.symbol = symbol
+        self.state_file = state_file
+        self.cross_file = cross_file
+
+        self.position_open = False
+        self.position_side = None
+        self.last_buy_price = None
+        self.total_profit = 0.0
+        self.cross_history = []
+        self.last_cross_time = None
+        self.last_signal = "None"
+        self.last_trend = None
+        self.position_size = None       # risk.py: filled size, best price / PnL since entry
+        self.peak_price = None
+        self.peak_pnl_usd = None
+        self.peak_pnl_pct = None
+        self.dashboard_data = {
+            'last_update': None,
+            'price': 0.0,
+            'trend': 'Unknown',
+            'position': 0.0,
+        }
+
+    def load(self):
+        if self.cross_file:
+            data, source = load_json(self.cross_file)
+            if data is not None:
+                self.cross_history = data
+                print(f"Loaded {len(self.cross_history)} crosses from {source}")
+            else:
+                print(f"No {self.cross_file} found — Starting with empty history.")
+
+        if self.state_file:
+            data, source = load_json(self.state_file)
+            if data is not None:
+                self.total_profit = data.get("total_profit", 0.0)
+                self.last_buy_price = data.get("last_buy_price")
+                self.position_open = data.get("position_open", False)
+                self.position_side = data.get("position_side")
+                self.position_size = data.get("position_size")
+                self.peak_price = data.get("peak_price")
+                self.peak_pnl_usd = data.get("peak_pnl_usd")
+                self.peak_pnl_pct = data.get("peak_pnl_pct")
+                print(f"Loaded state from {source}")
+                if source != self.state_file:
+                    log_print(f"{self.symbol} state recovered from {source} (last good snapshot)", "WARNING")
+            elif os.path.exists(self.state_file):
+                # Unreadable and no good copy: don't quietly pretend we're flat
+                log_print(f"{self.symbol} state unrecoverable ({self.state_file}) — starting FLAT, check the exchange for open positions!", "ERROR")
+            else:
+                print(f"No {self.state_file} found — Using defaults.")
+                atomic_write_json(self.state_file, default_state)
+        return self
+
+    # Saves are coalesced: they mark the file dirty and persist.flush() (end of tick,
+    # after fills, on shutdown) writes the latest values once, atomically.
+    def state_doc(self):
+        return {
+            "position_open": self.position_open,
+            "position_side": self.position_side,
+            "last_buy_price": self.last_buy_price,
+            "total_profit": self.total_profit,
+            "position_size": self.position_size,
+            "peak_price": self.peak_price,
+            "peak_pnl_usd": self.peak_pnl_usd,
+            "peak_pnl_pct": self.peak_pnl_pct,
+        }
+
+    def save_state(self):
+        if self.state_file:
+            persist.writer.mark(self.state_file, self.state_doc)
+
+    def save_crosses(self):
+        if self.cross_file:
+            persist.writer.mark(self.cross_file, lambda: self.cross_history[-MAX_CROSSES:])
+
+
+def _symbol_paths(symbol):
+    if symbol == SYMBOL:
+        return STATE_FILE, CROSS_FILE
+    sym_dir = os.path.join(SAVES_DIR, symbol)
+    os.makedirs(sym_dir, exist_ok=True)
+    return os.path.join(sym_dir, "state.json"), os.path.join(sym_dir, "crosses.json")
+
+symbols = {}                    # loaded from disk on first get()
+
+def get(symbol=SYMBOL):
+    st = symbols.get(symbol)
+    if st is None:
+        os.makedirs(SAVES_DIR, exist_ok=True)
+        st = symbols[symbol] = SymbolState(symbol, *_symbol_paths(symbol)).load()
+    return st
+
+def load_all():
+    return [get(sym) for sym in SYMBOLS]
+
+def total_profit():
+    return sum(s.total_profit for s in symbols.values())
+
+def save_trade(action, qty, price, symbol=SYMBOL, pnl=None):
+    get_journal().record(action, qty, price, symbol, pnl)
+
+# Account-wide values (shared by every symbol)
 dashboard_data = {
     'last_update': None,
-    'price': 0.0,
-    'trend': 'Unknown',
     'usdt_balance': 0.0,
-    'ltc_position': 0.0,
+    'latency': {},              # order execution phases → ms stats (execution.LatencyStats)
+    'scheduler': {},            # tick lag / clock offset (scheduler.BarScheduler.summary)
+}
+
+# Profiling mode (profiler.py is only imported once a capture is requested)
+profiling = {
+    'requested': int(os.getenv("BOT_PROFILE_TICKS", "0") or 0),   # ticks to capture; run_bot picks it up
+    'active': False,
+    'last': None,               # output dir of the last capture
 }
@@ -0,0 +1,149 @@
+# sweep.py — parallel parameter sweep over stored candles
+#
+#   python sweep.py --ma-short 20:80:10 --ma-long 100:300:50 --rsi-ob 70,80 --rsi-os 15,20 --lookback 3,5,10
+#   python sweep.py ... --bench                 # same grid with 1, 2, 4, ... workers, prints speedup
+#
+# Candles and every distinct SMA / RSI series are computed once in the parent
+# and placed in shared memory; workers attach to them instead of receiving
+# pickled copies, so a task is just a tuple of parameters.
+import argparse
+import itertools
+import os
+import time
+from multiprocessing import Pool, shared_memory
+import numpy as np
+import pandas as pd
+from config import MA_SHORT, MA_LONG, RSI_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD, TREND_LOOKBACK, ALLOW_SHORTS
+import backtest
+
+SWEEP_DIR = "saves/sweeps"
+PARAM_NAMES = ["ma_short", "ma_long", "rsi_period", "rsi_overbought", "rsi_oversold", "trend_lookback"]
+
+def parse_values(spec, cast=int):
+    """'50' → [50], '20,50' → [20, 50], '10:50:10' → [10, 20, 30, 40, 50]"""
+    if ":" in spec:
+        start, stop, step = (cast(x) for x in spec.split(":"))
+        return [cast(x) for x in np.arange(start, stop + step / 2, step)]
+    return [cast(x) for x in spec.split(",")]
+
+def build_grid(ma_short, ma_long, rsi_period, rsi_ob, rsi_os, lookback):
+    return [combo for combo in itertools.product(ma_short, ma_long, rsi_period, rsi_ob, rsi_os, lookback)
+            if combo[0] < combo[1]]
+
+
+# ====================== SHARED MEMORY ======================
+def _to_shared(arr):
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+_worker = {}
+
+def _attach(spec):
+    name, shape, dtype = spec
+    # Pool workers share the parent's resource tracker, so the parent's unlink() covers this too
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+def _init_worker(close_spec, sma_spec, rsi_spec, sma_windows, rsi_periods, sim_params):
+    _worker["shm"] = []
+    for key, spec in (("close", close_spec), ("sma", sma_spec), ("rsi", rsi_spec)):
+        shm, arr = _attach(spec)
+        _worker["shm"].append(shm)
+        _worker[key] = arr
+    _worker["sma_row"] = {w: i for i, w in enumerate(sma_windows)}
+    _worker["rsi_row"] = {p: i for i, p in enumerate(rsi_periods)}
+    _worker["sim"] = sim_params
+
+def _evaluate(combo):
+    ma_short, ma_long, rsi_period, rsi_ob, rsi_os, lookback = combo
+    w = _worker
+    sig = backtest.compute_signals(
+        w["sma"][w["sma_row"][ma_short]], w["sma"][w["sma_row"][ma_long]], w["rsi"][w["rsi_row"][rsi_period]],
+        trend_lookback=lookback, rsi_overbought=rsi_ob, rsi_oversold=rsi_os, allow_shorts=w["sim"]["allow_shorts"],
+    )
+    sim = {k: v for k, v in w["sim"].items() if k != "allow_shorts"}
+    trades = backtest.simulate(w["close"], sig, **sim)
+    stats = backtest.summarize(trades, backtest.equity_curve(w["close"], trades))
+    return dict(zip(PARAM_NAMES, combo), **stats)
+
+def _evaluate_chunk(chunk):
+    return [_evaluate(combo) for combo in chunk]
+
+
+# ====================== DRIVER ======================
+def run_sweep(close, grid, workers=None, chunk_size=None, **sim_params):
+    """Evaluate every parameter combo; returns a DataFrame ranked by total_pnl"""
+    workers = workers or os.cpu_count()
+    sim_params.setdefault("allow_shorts", ALLOW_SHORTS)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+
+    # Every rolling mean / RSI series is computed exactly once, here
+    sma_windows = sorted({c[0] for c in grid} | {c[1] for c in grid})
+    rsi_periods = sorted({c[2] for c in grid})
+    sma_matrix = np.vstack([backtest.sma(close, win) for win in sma_windows])
+    rsi_matrix = np.vstack([backtest.rsi(close, p) for p in rsi_periods])
+
+    blocks = [_to_shared(a) for a in (close, sma_matrix, rsi_matrix)]
+    try:
+        init_args = (blocks[0][1], blocks[1][1], blocks[2][1], sma_windows, rsi_periods, sim_params)
+        chunk_size = chunk_size or max(1, len(grid) // (workers * 8))
+        chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+        with Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+            rows = [row for part in pool.imap_unordered(_evaluate_chunk, chunks) for row in part]
+    finally:
+        for shm, _ in blocks:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(rows).sort_values("total_pnl", ascending=False).reset_index(drop=True)
+
+def bench_scaling(close, grid, max_workers=None):
+    max_workers = max_workers or os.cpu_count()
+    counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < max_workers], max_workers})
+    base = None
+    print(f"{len(grid)} combos × {len(close)} bars")
+    for n in counts:
+        t0 = time.perf_counter()
+        run_sweep(close, grid, workers=n)
+        elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        print(f"  {n:3d} workers: {elapsed:7.2f}s  speedup {base / elapsed:5.2f}×  efficiency {base / elapsed / n:5.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweep for the SMA cross strategy")
+    parser.add_argument("--file", help="binary candle store (default saves/logs/<symbol>_1m.bin)")
+    parser.add_argument("--csv", help="read a CSV export instead")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--ma-short", default=str(MA_SHORT))
+    parser.add_argument("--ma-long", default=str(MA_LONG))
+    parser.add_argument("--rsi-period", default=str(RSI_PERIOD))
+    parser.add_argument("--rsi-ob", default=str(RSI_OVERBOUGHT))
+    parser.add_argument("--rsi-os", default=str(RSI_OVERSOLD))
+    parser.add_argument("--lookback", default=str(TREND_LOOKBACK))
+    parser.add_argument("--leverage", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--bench", action="store_true", help="measure scaling with worker count instead")
+    args = parser.parse_args()
+
+    df = backtest.load_candles(args.file, args.csv, args.start, args.end)
+    close = df['close'].to_numpy(dtype=np.float64)
+    grid = build_grid(parse_values(args.ma_short), parse_values(args.ma_long), parse_values(args.rsi_period),
+                      parse_values(args.rsi_ob, float), parse_values(args.rsi_os, float), parse_values(args.lookback))
+
+    if args.bench:
+        bench_scaling(close, grid, args.workers)
+        raise SystemExit(0)
+
+    t0 = time.perf_counter()
+    results = run_sweep(close, grid, workers=args.workers, leverage=args.leverage)
+    print(f"{len(grid)} combos over {len(close)} bars in {time.perf_counter() - t0:.2f}s with {args.workers} workers")
+
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    out = os.path.join(SWEEP_DIR, f"sweep_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+    results.to_csv(out, index=False)
+    print(results.head(args.top).to_string(index=False))
+    print(f"Saved ranked results to {out}")
@@ -0,0 +1,250 @@
+# trader.py — per-symbol strategy: signals, risk checks and order placement for one perp
+import time
+from datetime import timedelta
+
+from config import TRADE_USDT, FEE_BUFFER_PCT, MA_LONG, PRICE_LOG_INTERVAL
+import state
+import persist
+import clock
+from exchange import get_balance, get_position, exchange, get_unrealized_pnl, get_current_leverage, account
+from execution import Executor, Order
+from indicators import detect_cross, StreamingIndicators
+from data_collector import collect_all_candles
+from logger import log_print
+from metrics import stage, STOP_TRIGGER_SECONDS
+from risk import PositionRisk, RULES
+from transport import ApiError
+
+def load_asset_meta(meta, symbols):
+    """{symbol: (szDecimals, minSize)} from the perp meta document (meta_cache)"""
+    universe = {a['name']: a for a in meta['universe']}
+    meta = {}
+    for sym in symbols:
+        asset_info = universe[sym]
+        meta[sym] = (int(asset_info['szDecimals']),             # e.g. 2 for LTC, 5 for BTC
+                     float(asset_info.get('minSize', 0.001)))
+    return meta
+
+default_executor = Executor(exchange)
+
+# === CONSERVATIVE MARGIN CHECK (assumes website leverage will handle) ===
+def enough_usdt(required_notional):
+    """Conservative check: Proceed if balance covers min for max leverage (20×); exchange enforces actual"""
+    free = get_balance()
+    min_margin = required_notional / 20 * (1 + FEE_BUFFER_PCT)  # Conservative threshold (~$3 for $60)
+    enough = free >= min_margin
+    if not enough:
+        log_print(f"Insufficient min balance: need ~${min_margin:.2f}, have ${free:.2f} (website leverage will use actual margin)", "WARNING")
+    return enough, free
+
+
+class SymbolTrader:
+    """Isolated strategy instance for one symbol: own state, indicators, pending trade, logs."""
+
+    def __init__(self, symbol, sz_decimals, min_size, executor=None):
+        self.symbol = symbol
+        self.executor = executor or default_executor
+        self.sz_decimals = sz_decimals
+        self.min_size = min_size
+        self.state = state.get(symbol)
+        self.engine = StreamingIndicators()       # O(1) per tick instead of full rolling recompute
+        self.pending_trade = None
+        self.last_price_log = clock.utcnow()
+        self.current_leverage = None              # filled in off the startup path
+        self.executor.defer(self._refresh_leverage, "Detected")
+        self.risk = PositionRisk(self.state)      # stops on every price update, from entry price and size
+        if self.state.position_open and self.state.position_size is None:
+            self.executor.defer(self._refresh_size)     # state.json from before sizes were saved
+
+    def calculate_dynamic_qty(self, current_price):
+        """Round quantity to correct decimals using asset metadata (from test)"""
+        if current_price <= 0:
+            return self.min_size
+        raw_qty = TRADE_USDT / current_price
+        qty = round(raw_qty, self.sz_decimals)
+        return max(self.min_size, qty)
+
+    # === ORDERS ===
+    # Submitted to the executor and return its Future straight away; the fill callbacks
+    # below only touch memory, persistence and the leverage refresh run as follow-ups.
+    def _open(self, qty, is_buy, signal_at=None, after=None):
+        kind = "long" if is_buy else "short"
+        return self.executor.submit(Order(self.symbol, kind, qty, signal_at, on_fill=self._on_open_fill, after=after))
+
+    def place_long(self, qty, signal_at=None, after=None):
+        return self._open(qty, True, signal_at, after)
+
+    def place_short(self, qty, signal_at=None, after=None):
+        return self._open(qty, False, signal_at, after)
+
+    def close_position(self, signal_at=None):
+        return self.executor.submit(Order(self.symbol, "close", signal_at=signal_at, on_fill=self._on_close_fill))
+
+    def _on_open_fill(self, order):
+        st = self.state
+        entry_px, qty = order.avg_px, order.filled_sz or order.qty      # a partial fill is journaled as such
+        log_print(f"{order.kind.upper()} OPENED ✅ {qty} {self.symbol} @ ${entry_px:.3f}", "INFO")
+        st.last_buy_price = entry_px
+        st.position_open = True
+        st.position_side = order.kind
+        self.risk.opened(entry_px, qty)
+        account.invalidate()
+        self.executor.defer(self._refresh_leverage)
+        st.save_state()
+        self.executor.defer(persist.flush)          # position changes hit disk right away, not at end of tick
+        self.executor.defer(state.save_trade, "buy" if order.kind == "long" else "short", qty, entry_px, self.symbol)
+
+    def _on_close_fill(self, order):
+        exit_px, qty = order.avg_px, order.filled_sz
+        pnl = self._realize(exit_px, qty)
+        if pnl > 0:
+            log_print(f"POSITION CLOSED ✅ {qty} {self.symbol} @ ${exit_px:.3f} → PROFIT ${pnl:+.2f} 🎉", "INFO")
+        else:
+            log_print(f"POSITION CLOSED ❌ {qty} {self.symbol} @ ${exit_px:.3f} → ${pnl:+.2f}", "INFO")
+        account.invalidate()
+        self._flat(exit_px, qty, pnl)
+
+    def on_liquidated(self, qty, px):
+        """The (paper) exchange closed the position itself. Called from inside its user_state, i.e.
+        while the account snapshot is being fetched — that snapshot is already flat, no invalidate."""
+        if not self.state.position_open:
+            return
+        pnl = self._realize(px, qty)
+        log_print(f"POSITION LIQUIDATED 💥 {qty} {self.symbol} @ ${px:.3f} → ${pnl:+.2f}", "WARNING")
+        self._flat(px, qty, pnl)
+
+    def _realize(self, exit_px, qty):
+        st = self.state
+        return (exit_px - st.last_buy_price) * qty if st.position_side == "long" else (st.last_buy_price - exit_px) * qty
+
+    def _flat(self, exit_px, qty, pnl):
+        st = self.state
+        st.total_profit += pnl
+        st.position_open = False
+        st.position_side = None
+        self.risk.closed()
+        st.save_state()
+        self.executor.defer(persist.flush)
+        self.executor.defer(state.save_trade, "close", qty, exit_px, self.symbol, pnl)
+
+    def _refresh_leverage(self, reason="Updated"):
+        # Update leverage post-open (website value now visible)
+        self.current_leverage = get_current_leverage(self.symbol)
+        log_print(f"{reason} leverage: {self.symbol} {self.current_leverage}× (from Hyperliquid)", "INFO")
+
+    def _refresh_size(self):
+        self.state.position_size = get_position(self.symbol)
+        self.state.save_state()
+
+    # === RISK ===
+    def on_price(self, price, received_at=None):
+        """Run the stops (risk.py) at a new price → close Future if one fired, else None.
+        Memory only: the close is queued on the executor, nothing here waits on the network."""
+        received_at = received_at or time.perf_counter()
+        if self.executor.busy(self.symbol):         # an order in flight: the position is about to change
+            return None
+        hit = self.risk.update(price, self.current_leverage)
+        if hit is None:
+            return None
+        rule, pnl_pct, pnl_usd = hit
+        closing = self.close_position(received_at)
+        closing.add_done_callback(lambda f: f.result() or self.risk.release())
+        STOP_TRIGGER_SECONDS.observe(time.perf_counter() - received_at, rule)
+        log_print(f"{self.symbol} {RULES[rule]} HIT @ ${price:.3f} │ PnL {pnl_pct:+.1f}% (${pnl_usd:+.2f})", "INFO")
+        return closing
+
+    def check_stops(self, price, received_at=None):
+        """Intra-bar pass: stops only, no candles or indicators"""
+        with stage("risk"):
+            self.on_price(price, received_at)
+
+    def _act_on_signal(self, signal, current_price, signal_at, closing):
+        st = self.state
+        sym = self.symbol
+
+        # Close on opposite signal
+        if closing is None and st.position_open:
+            if (st.position_side == "long" and signal == "short") or \
+               (st.position_side == "short" and signal == "buy"):
+                closing = self.close_position(signal_at)
+
+        # Open new position (a reversal queues right behind its close)
+        if (not st.position_open or closing is not None) and signal in ("buy", "short"):
+            qty = self.calculate_dynamic_qty(current_price)
+            side = "long" if signal == "buy" else "short"
+            self.pending_trade = {
+                "type": side,
+                "qty": qty,
+                "signal_at": signal_at,
+                "expires": clock.utcnow() + timedelta(minutes=2)
+            }
+            log_print(f"GOLDEN/DEATH CROSS — PENDING {side.upper()} {qty} {sym}", "INFO")
+
+        # Execute pending trade instantly if possible
+        pending = self.pending_trade
+        if pending and clock.utcnow() < pending["expires"]:
+            qty = pending["qty"]
+            if pending["type"] == "long" and enough_usdt(TRADE_USDT)[0]:
+                self.place_long(qty, pending["signal_at"], after=closing)
+                self.pending_trade = None
+            elif pending["type"] == "short" and enough_usdt(TRADE_USDT)[0]:
+                self.place_short(qty, pending["signal_at"], after=closing)
+                self.pending_trade = None
+        elif pending:
+            log_print(f"{sym} PENDING TRADE EXPIRED", "WARNING")
+            self.pending_trade = None
+
+    # === ONE TICK ===
+    def tick(self, bars):
+        """One bar tick on this symbol's Candles (a view of its CandleBuffer, not a copy)"""
+        st = self.state
+        sym = self.symbol
+        if bars is None or len(bars) < MA_LONG + 20:
+            return
+
+        with stage("candle_persist"):
+            collect_all_candles(one_m=bars, symbol=sym)
+        current_price = float(bars.close[-1])
+        with stage("indicators"):
+            signal, trend_str, cross_type = detect_cross(bars, st, self.engine)
+
+        if st.last_trend != trend_str:
+            log_print(f"{sym} TREND → {trend_str}", "INFO", event="trend", symbol=sym, trend=trend_str)
+            st.last_trend = trend_str
+
+        # Price log
+        if PRICE_LOG_INTERVAL > 0 and (clock.utcnow() - self.last_price_log).total_seconds() >= PRICE_LOG_INTERVAL:
+            self._log_price(current_price, trend_str)
+
+        # Nothing new goes out while an order for this symbol is still queued or running
+        if not self.executor.busy(sym):
+            signal_at = time.perf_counter()
+            with stage("risk"):
+                closing = self.on_price(current_price, signal_at)   # trailing stop / ratchet at the bar close
+            with stage("execution"):
+                self._act_on_signal(signal, current_price, signal_at, closing)
+
+        # Dashboard update
+        st.dashboard_data.update({
+            "last_update": clock.utcnow().strftime("%H:%M:%S"),
+            "price": current_price,
+            "trend": trend_str,
+        })
+        st.last_signal = signal or "None"
+        st.dashboard_data["position"] = get_position(sym)
+
+    def _log_price(self, current_price, trend_str):
+        st = self.state
+        sym = self.symbol
+        rsi_val = self.engine.rsi
+        try:
+            pnl_pct, pnl_usd = get_unrealized_pnl(sym) if st.position_open else (0.0, 0.0)
+            balance, pos = get_balance(), get_position(sym)
+        except ApiError as e:
+            log_print(f"{sym} Price ${current_price:.3f} │ RSI {rsi_val:.1f} │ account unavailable ({type(e).__name__}) │ {trend_str}",
+                      event="price", symbol=sym, price=float(current_price), rsi=rsi_val, trend=trend_str)
+        else:
+            log_print(f"{sym} Price ${current_price:.3f} │ RSI {rsi_val:.1f} │ Balance: ${balance:.2f} │ Pos: {pos:.4f} {sym} │ PnL: {pnl_pct:+.1f}% │ {trend_str}",
+                      event="price", symbol=sym, price=float(current_price), rsi=rsi_val, balance=balance, position=pos,
+                      position_open=st.position_open, pnl_pct=pnl_pct, pnl_usd=pnl_usd, trend=trend_str)
+        self.last_price_log = clock.utcnow()
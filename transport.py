@@ -0,0 +1,213 @@
+# transport.py — one pooled, rate-limited HTTP session behind every Hyperliquid Info/Exchange client
+#
+# attach(client) swaps the SDK client's requests.Session for the shared Transport, so the
+# SDK (and recorder.py, which wraps API.post above it) work unchanged. Per request:
+#   1. weight from Hyperliquid's table (orders 1, account/mids 2, most info 20, + candles per 60 rows)
+#   2. wait for that weight in a token bucket (API_WEIGHT_PER_MIN); orders are served first,
+#      then account lookups, then metadata, then candles
+#   3. POST over a keep-alive connection (API_POOL_SIZE)
+#   4. 429 / 5xx / timeouts → jittered exponential backoff and retry; what's left is raised
+#      as a typed ApiError instead of the caller seeing an empty reply
+import heapq
+import itertools
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from config import (API_WEIGHT_PER_MIN, API_WEIGHT_BURST, API_POOL_SIZE, API_TIMEOUT, API_MAX_RETRIES,
+                    API_BACKOFF_BASE, API_BACKOFF_MAX)
+from metrics import API_RETRIES, API_THROTTLE_SECONDS
+
+# === ERRORS ===
+class ApiError(Exception):
+    """A Hyperliquid request that failed for good (after whatever retries were safe)"""
+
+    def __init__(self, endpoint, reason, status=None):
+        super().__init__(f"{endpoint} {reason}")
+        self.endpoint = endpoint
+        self.status = status
+        self.attempts = 1
+
+class RateLimited(ApiError):
+    """HTTP 429 on every attempt"""
+
+class ApiUnavailable(ApiError):
+    """Timeouts, refused / dropped connections, 5xx"""
+
+class ApiRejected(ApiError):
+    """4xx other than 429 — the request itself is wrong, retrying won't help"""
+
+class BadResponse(ApiError):
+    """The API answered, but not with what we expected"""
+
+
+# === WEIGHTS / PRIORITY ===
+PRIORITY = {"order": 0, "account": 1, "meta": 2, "candles": 3}
+PRIORITY_NAMES = {v: k for k, v in PRIORITY.items()}
+ACCOUNT_TYPES = {"clearinghouseState", "spotClearinghouseState", "allMids", "l2Book", "orderStatus",
+                 "openOrders", "exchangeStatus"}
+LIGHT_TYPES = {"clearinghouseState", "spotClearinghouseState", "allMids", "l2Book", "orderStatus",
+               "exchangeStatus"}           # weight 2 in Hyperliquid's table; other info requests are 20
+
+def classify(url_path, payload):
+    """(endpoint label, weight, priority) of one request"""
+    payload = payload or {}
+    if url_path == "/exchange":
+        action = payload.get("action") or {}
+        kind = action.get("type", "action")
+        return f"/exchange:{kind}", 1 + len(action.get("orders") or ()) // 40, PRIORITY["order"]
+    kind = payload.get("type", "?")
+    weight = 60 if kind == "userRole" else 2 if kind in LIGHT_TYPES else 20
+    if kind == "candleSnapshot":
+        priority = PRIORITY["candles"]
+    elif kind in ACCOUNT_TYPES:
+        priority = PRIORITY["account"]
+    else:
+        priority = PRIORITY["meta"]
+    return f"{url_path}:{kind}", weight, priority
+
+
+class TokenBucket:
+    """Weight budget refilled at `rate`/s up to `capacity`. Waiters are served strictly in
+    (priority, arrival) order, so a queued order never waits behind a later candle fetch."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waiting = []                   # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, weight, priority=0):
+        """Block until `weight` is available and it's our turn; returns seconds waited"""
+        weight = min(weight, self.capacity)
+        ticket = (priority, next(self.seq))
+        t0 = time.monotonic()
+        with self.cond:
+            heapq.heappush(self.waiting, ticket)
+            self.cond.notify_all()          # the current head re-checks: it may no longer be first
+            try:
+                while True:
+                    self._refill()
+                    if self.waiting[0] == ticket:
+                        if self.tokens >= weight:
+                            break
+                        self.cond.wait((weight - self.tokens) / self.rate)
+                    else:
+                        self.cond.wait()
+            except BaseException:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+                raise
+            heapq.heappop(self.waiting)
+            self.tokens -= weight
+            self.cond.notify_all()
+        return time.monotonic() - t0
+
+    def charge(self, weight):
+        """Spend weight we only learn about after the reply (may go below zero)"""
+        with self.cond:
+            self._refill()
+            self.tokens -= weight
+
+    def empty(self):
+        """The server says we're over budget → nobody sends until the bucket refills"""
+        with self.cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class Transport:
+    """requests.Session stand-in: post(url, json=..., timeout=...) → requests.Response (status < 400)"""
+
+    def __init__(self, pool_size=API_POOL_SIZE, weight_per_min=API_WEIGHT_PER_MIN, burst=API_WEIGHT_BURST,
+                 timeout=API_TIMEOUT, retries=API_MAX_RETRIES, backoff_base=API_BACKOFF_BASE,
+                 backoff_max=API_BACKOFF_MAX):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.headers = self.session.headers
+        self.headers.update({"Content-Type": "application/json"})
+        self.bucket = TokenBucket(weight_per_min / 60.0, burst)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rng = random.Random()          # own generator: replays seed the global one
+
+    def backoff(self, attempt, retry_after=None):
+        delay = self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def post(self, url, json=None, timeout=None, **kwargs):
+        exceptions = self.requests.exceptions
+        url_path = urlsplit(url).path
+        endpoint, weight, priority = classify(url_path, json)
+        is_order = priority == PRIORITY["order"]
+        for attempt in range(self.retries + 1):
+            API_THROTTLE_SECONDS.observe(self.bucket.acquire(weight, priority), PRIORITY_NAMES[priority])
+            retry_after = None
+            try:
+                resp = self.session.post(url, json=json, timeout=timeout or self.timeout, **kwargs)
+            except exceptions.ConnectTimeout:
+                error, retry, why = ApiUnavailable(endpoint, "connect timeout"), True, "timeout"
+            except exceptions.Timeout:          # sent, no answer: an order may have gone through
+                error, retry, why = ApiUnavailable(endpoint, "read timeout"), not is_order, "timeout"
+            except exceptions.ConnectionError as e:
+                sent = "NewConnectionError" not in repr(e)      # refused / DNS → never reached the API
+                reason = "connection dropped" if sent else "connection refused"
+                error, retry, why = ApiUnavailable(endpoint, reason), not (sent and is_order), "connect"
+            else:
+                status = resp.status_code
+                if status < 400:
+                    if url_path == "/info" and json and json.get("type") == "candleSnapshot":
+                        self.bucket.charge(resp.content.count(b'"t":') // 60)   # +1 weight per 60 bars returned
+                    return resp
+                if status == 429:
+                    self.bucket.empty()
+                    try:
+                        retry_after = float(resp.headers.get("Retry-After", ""))
+                    except ValueError:
+                        pass
+                    error, retry, why = RateLimited(endpoint, "HTTP 429", status), True, "429"
+                elif status >= 500:
+                    error, retry, why = ApiUnavailable(endpoint, f"HTTP {status}", status), not is_order, "5xx"
+                else:
+                    error, retry, why = ApiRejected(endpoint, f"HTTP {status}: {resp.text[:200]}", status), False, ""
+            error.attempts = attempt + 1
+            if not retry or attempt == self.retries:
+                if attempt:
+                    error.args = (f"{error.args[0]} after {attempt + 1} attempts",)
+                raise error
+            API_RETRIES.inc(why)
+            time.sleep(self.backoff(attempt, retry_after))
+
+
+_shared = None
+_lock = threading.Lock()
+
+def shared():
+    """The process-wide Transport (built on first use)"""
+    global _shared
+    if _shared is None:
+        with _lock:
+            if _shared is None:
+                _shared = Transport()
+    return _shared
+
+def attach(client, transport=None):
+    """Route an SDK client's (Info, Exchange, API) requests through the shared transport"""
+    client.session = transport or shared()
+    return client
@@ -1,10 +1,3 @@
-import state
-from logger import log_print
-import sys
-
-
-
-# At top of main.py, after imports
 def color_text(text, color):
     """ANSI colors for terminal—light green/red for trends."""
     colors = {